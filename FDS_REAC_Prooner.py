@@ -1,14 +1,122 @@
 import sys
+import time
 import traceback
-import re
 import os
-import time
+import threading
+
+# Начало загрузки модуля (для --profile-startup)
+_START_TIME = time.perf_counter()
+
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QLineEdit, 
                             QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, 
                             QTextEdit, QMessageBox, QGroupBox, QStatusBar, QFileDialog, QFormLayout,
-                            QSpacerItem, QSizePolicy, QFrame, QScrollArea)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QPalette, QColor, QDoubleValidator, QFont, QIcon
+                            QSpacerItem, QSizePolicy, QFrame, QScrollArea, QComboBox, QProgressBar,
+                            QInputDialog)
+from PyQt6.QtCore import Qt, QSize, QEvent, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QPalette, QColor, QDoubleValidator, QFont, QIcon, QTextCursor
+
+_QT_LOADED_TIME = time.perf_counter()
+
+# Ядро расчета (frp с NumPy) загружается после первой отрисовки окна или
+# при первом обращении к нему, см. load_core
+cache = fdsio = library = live = mesh = stoich = trace = None
+
+# Целевое время до первой отрисовки формы (мс) для --profile-startup
+STARTUP_TARGET_MS = 300
+
+
+def load_core():
+    """Загружает ядро расчета frp, если оно еще не загружено"""
+    global cache, fdsio, library, live, mesh, stoich, trace
+    if fdsio is None:
+        from frp import cache, fdsio, library, live, mesh, stoich, trace
+
+
+# Стиль кнопки, временно показываемый после успешного действия
+SUCCESS_BUTTON_STYLE = """
+    background-color: #4ade80;
+    color: #064e3b;
+    border: none;
+    border-radius: 5px;
+    padding: 10px 15px;
+    font-weight: bold;
+    min-width: 120px;
+"""
+
+
+# Подсветка поля с неверным значением
+ERROR_FIELD_STYLE = "background-color: rgba(254, 202, 202, 150);"
+
+# Оформление области результатов
+RESULTS_GROUP_STYLE = """
+    QGroupBox {
+        font-weight: bold;
+        border: 1px solid #bfdbfe;
+        border-radius: 8px;
+        margin-top: 1ex;
+        background-color: rgba(255, 255, 255, 200);
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px;
+    }
+    QTextEdit {
+        background-color: white;
+        border: 1px solid #e2e8f0;
+        border-radius: 5px;
+        padding: 10px;
+        color: #334155;
+    }
+"""
+
+
+class OperationCancelled(Exception):
+    """Операция с файлом отменена пользователем"""
+
+
+class TaskSignals(QObject):
+    """Сигналы фоновой задачи (QRunnable не является QObject)"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+
+
+class FileTask(QRunnable):
+    """Фоновая операция с файлом в пуле потоков.
+
+    fn вызывается с функцией progress(done, total); после отмены эта
+    функция выбрасывает OperationCancelled, прерывая разбор или запись.
+    Результат и ошибки передаются в поток GUI через сигналы.
+    """
+
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+        self._percent = -1
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _progress(self, done, total):
+        if self._cancelled.is_set():
+            raise OperationCancelled()
+        percent = int(done * 100 / total) if total else 100
+        # Сигнал отправляется только при изменении процента
+        if percent != self._percent:
+            self._percent = percent
+            self.signals.progress.emit(percent)
+
+    def run(self):
+        try:
+            result = self.fn(self._progress)
+        except Exception as e:
+            self.signals.failed.emit(e, traceback.format_exc())
+        else:
+            self.signals.finished.emit(result)
+
 
 class FDSReacCalculator(QMainWindow):
     def __init__(self):
@@ -21,25 +129,72 @@ class FDSReacCalculator(QMainWindow):
         self.setWindowTitle("FRP v1.1")
         self.setMinimumSize(1280, 720)  # Устанавливаем минимальный размер окна
         
-        # Держим путь к импортированному файлу
+        # Держим путь к импортированному файлу и результат его разбора
         self.imported_file_path = None
+        self.imported_summary = None
+        
+        # Кэш разбора файлов FDS открывается при первом импорте
+        self.reac_cache = None
+        
+        # Импорт и сохранение выполняются в отдельном потоке, чтобы окно не
+        # зависало на больших файлах; одновременно выполняется одна задача
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.current_task = None
+        self.pending_path = None
+        self.save_enabled = False
+        
+        # Библиотека топлив открывается при первом обращении к поиску
+        self.fuel_library = None
+        self.flash_styles = {}
         
         # Храним ID топлива (по умолчанию "Fuel")
         self.fuel_id = "Fuel"
         
-        # Константы для молярных масс
-        self.W_O2 = 32.0
-        self.W_CO2 = 44.0
-        self.W_CO = 28.0
-        self.W_H2O = 18.0
-        self.W_SOOT = 12.0
-        self.W_HCl = 36.5
-        self.W_N2 = 28.0
+        # Реакции импортированного файла с несколькими REAC: значения полей
+        # формы для каждой из них и параметры последнего расчета
+        self.reactions = []
+        self.reaction_texts = []
+        self.current_reaction = 0
+        self.reaction_params = None
+        
+        # Пошаговый пересчет при редактировании полей: после первого расчета
+        # правка поля пересчитывает только зависящие от него строки блока.
+        # Стиль поля меняется только при появлении или исправлении ошибки
+        self.live_block = None
+        self.live_active = False
+        self.dirty_fields = set()
+        self.field_errors = set()
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(0)
+        self.live_timer.timeout.connect(self._live_update)
+        
+        # Моменты запуска: первая отрисовка формы и завершение отложенной
+        # загрузки (ядро расчета, справка, оформление результатов)
+        self.first_paint_time = None
+        self.startup_done_time = None
         
         self._setup_palette()
         self._setup_ui()
+        self.installEventFilter(self)
         self.statusBar.showMessage("Готово") # Показываем начальное сообщение после настройки UI
     
+    def eventFilter(self, obj, event):
+        """Запускает отложенную загрузку после первой отрисовки окна"""
+        if obj is self and event.type() == QEvent.Type.Paint and self.first_paint_time is None:
+            self.first_paint_time = time.perf_counter()
+            self.removeEventFilter(self)
+            QTimer.singleShot(0, self._finish_startup)
+        return super().eventFilter(obj, event)
+    
+    def _finish_startup(self):
+        """Загружает ядро расчета и строит второстепенные панели формы"""
+        load_core()
+        self.help_layout.addWidget(self._create_help_label())
+        self.results_group.setStyleSheet(RESULTS_GROUP_STYLE)
+        self.startup_done_time = time.perf_counter()
+    
     def _setup_palette(self):
         """Устанавливает цветовую палитру приложения."""
         palette = QPalette()
@@ -68,6 +223,18 @@ class FDSReacCalculator(QMainWindow):
         self.statusBar.setStyleSheet("QStatusBar { background-color: rgb(241, 245, 249); color: rgb(30, 41, 59); }")
         self.setStatusBar(self.statusBar)
         
+        # Индикатор и отмена фоновых операций с файлами (скрыты без задачи)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.setVisible(False)
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.setToolTip("Прервать чтение или запись файла")
+        self.cancel_button.clicked.connect(self.cancel_task)
+        self.cancel_button.setVisible(False)
+        self.statusBar.addPermanentWidget(self.progress_bar)
+        self.statusBar.addPermanentWidget(self.cancel_button)
+        
         # Создаем область прокрутки для обработки изменения размера
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
@@ -116,10 +283,9 @@ class FDSReacCalculator(QMainWindow):
                 padding: 0 5px;
             }
         """)
-        help_layout = QVBoxLayout(help_group)
-        help_layout.setContentsMargins(15, 15, 15, 15)
-        help_label = self._create_help_label()
-        help_layout.addWidget(help_label)
+        # Текст справки добавляется после первой отрисовки (_finish_startup)
+        self.help_layout = QVBoxLayout(help_group)
+        self.help_layout.setContentsMargins(15, 15, 15, 15)
         input_help_layout.addWidget(help_group, 4)  # 40% of width
         
         main_layout.addLayout(input_help_layout)
@@ -136,8 +302,8 @@ class FDSReacCalculator(QMainWindow):
         main_layout.addLayout(buttons_layout)
         
         # Область результатов
-        results_group = self._create_results_area()
-        main_layout.addWidget(results_group)
+        self.results_group = self._create_results_area()
+        main_layout.addWidget(self.results_group)
     
     def _create_input_group(self):
         """Создает группу полей ввода."""
@@ -229,7 +395,19 @@ class FDSReacCalculator(QMainWindow):
             # Устанавливаем значения по умолчанию
             if input_name in default_values:
                 self.inputs[input_name].setText(default_values[input_name])
+            # Правки пользователя (не программная установка текста) пересчитывают результат
+            self.inputs[input_name].textEdited.connect(lambda text, name=input_name: self._field_edited(name))
             input_layout.addRow(label, self.inputs[input_name])
+        
+        # Необязательная брутто-формула топлива: с ней баланс атомов замыкается
+        self.formula_input = QLineEdit()
+        self.formula_input.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        self.formula_input.setPlaceholderText("Например, C3H8 (необязательно)")
+        self.formula_input.setToolTip("Брутто-формула топлива из элементов C, H, O, N, Cl. С ней выход H₂O и "
+                                      "потребление кислорода подбираются по балансу атомов, молярная масса берется по "
+                                      "формуле, а REAC записывается без отключения проверки баланса в FDS")
+        self.formula_input.textEdited.connect(lambda text: self._field_edited("formula"))
+        input_layout.addRow(QLabel("Брутто-формула топлива:"), self.formula_input)
             
         # Добавляем заметку о ID топлива
         fuel_id_layout = QHBoxLayout()
@@ -239,14 +417,54 @@ class FDSReacCalculator(QMainWindow):
         self.fuel_id_value.setStyleSheet("font-weight: bold; color: #0369a1;")
         fuel_id_layout.addWidget(fuel_id_label)
         fuel_id_layout.addWidget(self.fuel_id_value)
+        
+        # Выбор реакции для файлов с несколькими REAC (скрыт для одной реакции)
+        self.reaction_combo = QComboBox()
+        self.reaction_combo.setToolTip("Реакция файла FDS, параметры которой показаны в форме")
+        self.reaction_combo.setVisible(False)
+        self.reaction_combo.currentIndexChanged.connect(self.select_reaction)
+        fuel_id_layout.addWidget(self.reaction_combo)
         fuel_id_layout.addStretch()
         
         input_layout.addRow("", QWidget())  # Добавляем некоторое пространство
         input_layout.addRow("", fuel_id_layout)
+        input_layout.addRow("Библиотека топлив:", self._create_library_row())
         
         input_group.setLayout(input_layout)
         return input_group
     
+    def _create_library_row(self):
+        """Создает строку поиска и применения топлив из библиотеки."""
+        library_layout = QHBoxLayout()
+        
+        self.library_search = QLineEdit()
+        self.library_search.setPlaceholderText("Поиск по имени")
+        self.library_search.setToolTip("Часть имени топлива из библиотеки")
+        self.library_results = QComboBox()
+        self.library_results.setMinimumWidth(200)
+        self.library_results.setToolTip("Найденные топлива")
+        
+        # Поиск запускается после паузы в наборе, а не на каждую букву
+        self.library_timer = QTimer(self)
+        self.library_timer.setSingleShot(True)
+        self.library_timer.setInterval(200)
+        self.library_timer.timeout.connect(self.search_library)
+        self.library_search.textEdited.connect(self.library_timer.start)
+        self.library_search.returnPressed.connect(self.search_library)
+        
+        apply_button = QPushButton("Применить")
+        apply_button.setToolTip("Заполнить поля параметрами выбранного топлива")
+        apply_button.clicked.connect(self.apply_library_fuel)
+        add_button = QPushButton("В библиотеку")
+        add_button.setToolTip("Сохранить текущие параметры в библиотеку топлив")
+        add_button.clicked.connect(self.add_to_library)
+        
+        library_layout.addWidget(self.library_search)
+        library_layout.addWidget(self.library_results)
+        library_layout.addWidget(apply_button)
+        library_layout.addWidget(add_button)
+        return library_layout
+    
     def _create_help_label(self):
         """Creates the help text label."""
         help_text = """
@@ -372,27 +590,7 @@ class FDSReacCalculator(QMainWindow):
         """Создает область отображения результатов."""
         results_group = QGroupBox("Сгенерированная реакция")
         results_group.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        results_group.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                border: 1px solid #bfdbfe;
-                border-radius: 8px;
-                margin-top: 1ex;
-                background-color: rgba(255, 255, 255, 200);
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px;
-            }
-            QTextEdit {
-                background-color: white;
-                border: 1px solid #e2e8f0;
-                border-radius: 5px;
-                padding: 10px;
-                color: #334155;
-            }
-        """)
+        # Оформление (RESULTS_GROUP_STYLE) применяется после первой отрисовки
         
         results_layout = QVBoxLayout()
         results_layout.setContentsMargins(15, 15, 15, 15)
@@ -413,7 +611,7 @@ class FDSReacCalculator(QMainWindow):
         
         for name, input_field in self.inputs.items():
             # Сбросить цвет фона
-            input_field.setStyleSheet("")
+            self._mark_field(name, False)
             
             input_text = input_field.text().strip().replace(',', '.') # Заменить запятую на точку для локалей
             
@@ -430,14 +628,14 @@ class FDSReacCalculator(QMainWindow):
                     if not silent:
                         self.statusBar.showMessage(f"Ошибка: Значение для {name} должно быть неотрицательным")
                         # Подсветка ошибочного поля
-                        input_field.setStyleSheet("background-color: rgba(254, 202, 202, 150);")
+                        self._mark_field(name, True)
                     return None
                 # Дополнительная проверка для молярной массы (должна быть > 0)
                 if name == "molar_mass" and float_value <= 0:
                     if not silent:
                         self.statusBar.showMessage(f"Ошибка: Значение для молярной массы должно быть положительным")
                         # Подсветка ошибочного поля
-                        input_field.setStyleSheet("background-color: rgba(254, 202, 202, 150);")
+                        self._mark_field(name, True)
                         QMessageBox.warning(self, "Неверный ввод", 
                                           f"Значение для молярной массы должно быть положительным.")
                     return None
@@ -447,7 +645,7 @@ class FDSReacCalculator(QMainWindow):
                 if not silent:
                     self.statusBar.showMessage(f"Ошибка: Значение для {name} должно быть допустимым числом")
                     # Подсветка ошибочного поля
-                    input_field.setStyleSheet("background-color: rgba(254, 202, 202, 150);")
+                    self._mark_field(name, True)
                     QMessageBox.warning(self, "Неверный ввод", 
                                       f"Значение для {name} должно быть допустимым числом.")
                 return None
@@ -457,101 +655,193 @@ class FDSReacCalculator(QMainWindow):
     def calculate_parameters(self, silent=False):
         """Рассчитывает параметры REAC FDS на основе ввода пользователя"""
         try:
+            load_core()
             if not silent:
                 self.statusBar.showMessage("Рассчитываются параметры...")
             
-            valid_inputs = self.validate_inputs(silent)
+            with trace.span("calculate.validate"):
+                valid_inputs = self.validate_inputs(silent)
             if not valid_inputs:
                 return
             
-            # Сбросить все стили полей ввода в нормальное состояние
-            for input_field in self.inputs.values():
-                input_field.setStyleSheet("")
-                
-            # Извлечь проверенные входные данные
-            heat_release = valid_inputs["heat_release"]
-            soot_yield = valid_inputs["soot_yield"] / 9500.0  # Convert as per requirement
-            o2_consumption = valid_inputs["o2_consumption"]
-            co2_yield = valid_inputs["co2_yield"]
-            co_yield = valid_inputs["co_yield"]
-            hcl_yield = valid_inputs["hcl_yield"]
-            molar_mass = valid_inputs["molar_mass"]
-            
-            # Рассчитать объемные доли, используя формулы
-            V_O2 = (molar_mass / self.W_O2) * o2_consumption
-            V_CO2 = (molar_mass / self.W_CO2) * co2_yield
-            V_CO = (molar_mass / self.W_CO) * co_yield
-            V_SOOT = (molar_mass / self.W_SOOT) * soot_yield
-            V_HCl = (molar_mass / self.W_HCl) * hcl_yield
-            
-            # Рассчитать V_H2O используя формулу (26) из изображения
-            # Примечание: Нам нужно использовать выходы, а не объемные доли
-            Y_H2O = 1 + o2_consumption - co2_yield - co_yield - soot_yield - hcl_yield
-            V_H2O = (molar_mass / self.W_H2O) * Y_H2O
+            # Для файла с несколькими REAC проверить параметры всех реакций
+            params_list = None
+            if len(self.reactions) > 1:
+                with trace.span("calculate.validate", reactions=len(self.reactions)):
+                    params_list = self._reactions_params(silent)
+                if params_list is None:
+                    return
             
-            # Рассчитать V_N2 используя формулу (24) из изображения
-            V_N2 = 3.7619 * V_O2
-            
-            # Рассчитать массу реагентов: -(Fuel + O2 + N2)
-            # Это представляет собой общую массу топлива (-1) и воздуха (-V_O2 * [1 + 3.7619*(W_N2/W_O2)])
-            mass_reactants = -(1 + V_O2 * (1 + 3.7619 * (self.W_N2 / self.W_O2)))
-
-            # Определить компоненты и объемные доли для PRODUCTS на основе того, является ли HCl > 0
-            product_spec_ids = ['SOOT', 'CARBON DIOXIDE', 'CARBON MONOXIDE']
-            product_volume_fractions = [V_SOOT, V_CO2, V_CO]
-
-            if hcl_yield > 1e-9: # Использовать небольшой допуск для сравнения с плавающей запятой
-                product_spec_ids.append('HYDROGEN CHLORIDE')
-                product_volume_fractions.append(V_HCl)
-                final_product_index = 6
+            # Сбросить стили полей ввода с ошибками в нормальное состояние
+            for name in list(self.field_errors):
+                self._mark_field(name, False)
+                
+            # Сгенерировать REAC строки (все реакции файла рассчитываются одним вызовом)
+            formula = self.formula_input.text().strip() if params_list is None else ""
+            message = "Расчет завершен. REAC строки сгенерированы."
+            if params_list is not None:
+                reac_lines = fdsio.format_reactions(self.reactions, params_list)
+            elif formula:
+                try:
+                    reac_lines = fdsio.format_reac_block(self.fuel_id, valid_inputs, formula=formula)
+                except ValueError as e:
+                    self._mark_field("formula", True)
+                    self.statusBar.showMessage(f"Ошибка: {e}")
+                    return
+                message = self._balance_message(valid_inputs, formula)
             else:
-                final_product_index = 5 # Опустить HCl
-
-            product_spec_ids.extend(['WATER VAPOR', 'NITROGEN'])
-            product_volume_fractions.extend([V_H2O, V_N2])
-
-            # Отформатировать строки для SPEC
-            product_spec_id_str = ",".join([f"'{s}'" for s in product_spec_ids])
-            product_vf_str = ",".join([f"{v:.15f}" for v in product_volume_fractions])
-
-            # Сгенерировать REAC строки
-            reac_lines = f"""&SPEC ID='OXYGEN' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='NITROGEN' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='CARBON DIOXIDE' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='CARBON MONOXIDE' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='HYDROGEN CHLORIDE' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='WATER VAPOR' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='SOOT' LUMPED_COMPONENT_ONLY=.True./
-&SPEC ID='{self.fuel_id}' MW={molar_mass}/ 
-&SPEC ID='AIR' BACKGROUND=.True. SPEC_ID(1:2)='OXYGEN','NITROGEN' VOLUME_FRACTION(1:2)=1,3.7619/
-&SPEC ID='PRODUCTS' SPEC_ID(1:{final_product_index})={product_spec_id_str} VOLUME_FRACTION(1:{final_product_index})={product_vf_str}/
-&REAC FUEL='{self.fuel_id}' HEAT_OF_COMBUSTION={heat_release} SPEC_ID_NU(1:3)='{self.fuel_id}','AIR','PRODUCTS' NU(1:3)=-1,{mass_reactants:.4f},1 REAC_ATOM_ERROR=1E5 REAC_MASS_ERROR=1E4 CHECK_ATOM_BALANCE=.False./
-"""
+                live_block = self._live_block()
+                live_block.reset(self.fuel_id, valid_inputs)
+                live_block.update()
+                reac_lines = live_block.text()
+            self.reaction_params = params_list
 
-            self.results_text.setText(reac_lines)
+            with trace.span("calculate.display"):
+                self.results_text.setText(reac_lines)
+            self.live_active = True
             self.copy_button.setEnabled(True)
             self.save_fds_button.setEnabled(self.imported_file_path is not None)
             
             if not silent:
                 # Показать сообщение об успешном завершении с эффектом затухания
-                self.statusBar.showMessage("Расчет завершен. REAC строки сгенерированы.")
+                self.statusBar.showMessage(message)
                 
                 # Подсветка области результатов на короткое время для привлечения внимания
-                orig_style = self.results_text.styleSheet()
-                self.results_text.setStyleSheet("background-color: rgba(187, 247, 208, 150); border: 1px solid #4ade80;")
-                
-                # Сбросить после задержки
-                QApplication.processEvents()
-                time.sleep(0.5)
-                self.results_text.setStyleSheet(orig_style)
+                self._flash(self.results_text,
+                            "background-color: rgba(187, 247, 208, 150); border: 1px solid #4ade80;", 500)
             else:
-                self.statusBar.showMessage("Расчет завершен. REAC строки сгенерированы.")
+                self.statusBar.showMessage(message)
             
         except Exception as e:
             self.statusBar.showMessage(f"Ошибка: {str(e)}")
             QMessageBox.critical(self, "Ошибка расчета", 
                               f"Произошла ошибка при расчете:\n{str(e)}\n\n{traceback.format_exc()}")
     
+    def _balance_message(self, params, formula):
+        """Сообщение о невязках баланса атомов, оставшихся после замыкания"""
+        residuals = stoich.close_balance(params, stoich.parse_formula(formula))["residuals"]
+        left = [f"{element} {value:.4g}" for element, value in zip(stoich.ELEMENTS, residuals) if abs(value) > 1e-9]
+        if not left:
+            return "Расчет завершен. Баланс атомов замкнут."
+        return ("Расчет завершен. H₂O и O₂ подобраны по балансу атомов; невязки заданных выходов "
+                f"(моль на моль топлива): {', '.join(left)}")
+    
+    def _live_block(self):
+        """Модель блока для пошагового пересчета (создается при первом расчете)"""
+        if self.live_block is None:
+            load_core()
+            self.live_block = live.LiveBlock(self.fuel_id)
+        return self.live_block
+    
+    def _mark_field(self, name, error):
+        """Подсвечивает поле с ошибкой; стиль меняется только при смене состояния"""
+        if error == (name in self.field_errors):
+            return
+        field = self.formula_input if name == "formula" else self.inputs[name]
+        if error:
+            self.field_errors.add(name)
+            field.setStyleSheet(ERROR_FIELD_STYLE)
+        else:
+            self.field_errors.discard(name)
+            field.setStyleSheet("")
+    
+    def _field_edited(self, name):
+        """Отмечает поле измененным; пересчет выполняется после обработки текущих событий"""
+        self.dirty_fields.add(name)
+        self.live_timer.start()
+    
+    def _live_update(self):
+        """Проверяет измененные поля и обновляет только затронутые строки результата"""
+        load_core()
+        names, self.dirty_fields = self.dirty_fields, set()
+        live_block = self._live_block()
+        for name in names - {"formula"}:
+            try:
+                value = stoich.validate_value(name, self.inputs[name].text())
+            except ValueError as e:
+                self._mark_field(name, True)
+                self.statusBar.showMessage(f"Ошибка: {e}")
+                continue
+            self._mark_field(name, False)
+            live_block.set_param(name, value)
+        if "formula" in names:
+            self._mark_field("formula", False)
+        if self.field_errors - {"formula"} or not self.live_active:
+            return
+        if self.reactions or "formula" in names or self.formula_input.text().strip():
+            # В файле с несколькими REAC блок содержит все реакции, а с
+            # формулой топлива баланс замыкается для всего блока сразу
+            self.calculate_parameters(silent=True)
+            return
+        updates = live_block.update()
+        if not updates:
+            return
+        # Замена только измененных строк, без повторной отрисовки всего текста
+        document = self.results_text.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for index, text in updates.items():
+            cursor.setPosition(document.findBlockByNumber(index).position())
+            cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(text)
+        cursor.endEditBlock()
+    
+    def _reactions_params(self, silent=False):
+        """Проверенные параметры всех реакций файла или None при ошибке"""
+        self._store_reaction_texts()
+        params_list = []
+        for index, texts in enumerate(self.reaction_texts):
+            try:
+                params_list.append(stoich.validate_params(texts))
+            except ValueError as e:
+                if not silent:
+                    # Показать реакцию с ошибкой, чтобы ее можно было исправить
+                    self.reaction_combo.setCurrentIndex(index)
+                    self.validate_inputs(silent)
+                    self.statusBar.showMessage(f"Ошибка в реакции {self.reaction_combo.itemText(index)}: {e}")
+                return None
+        return params_list
+    
+    def _store_reaction_texts(self):
+        """Запоминает значения полей формы для текущей реакции"""
+        if self.reactions:
+            self.reaction_texts[self.current_reaction] = {
+                name: field.text() for name, field in self.inputs.items()
+            }
+    
+    def select_reaction(self, index):
+        """Переключает форму на другую реакцию импортированного файла"""
+        if index < 0 or index >= len(self.reactions) or index == self.current_reaction:
+            return
+        self._store_reaction_texts()
+        self.current_reaction = index
+        for name, field in self.inputs.items():
+            self._mark_field(name, False)
+            field.setText(self.reaction_texts[index].get(name, ""))
+        self.fuel_id = self.reactions[index]["fuel_id"]
+        self.fuel_id_value.setText(self.fuel_id)
+    
+    def _set_reactions(self, reactions):
+        """Заполняет выбор реакций; для одной реакции он скрыт"""
+        self.reactions = reactions if len(reactions) > 1 else []
+        self.reaction_texts = [
+            {name: str(round(value, 6)) for name, value in reaction["params"].items() if name in self.inputs}
+            for reaction in self.reactions
+        ]
+        self.current_reaction = 0
+        self.reaction_params = None
+        self.reaction_combo.blockSignals(True)
+        self.reaction_combo.clear()
+        for reaction in self.reactions:
+            label = reaction["fuel_id"]
+            if reaction.get("reac_id"):
+                label = f"{reaction['reac_id']} ({label})"
+            self.reaction_combo.addItem(label)
+        self.reaction_combo.blockSignals(False)
+        self.reaction_combo.setVisible(bool(self.reactions))
+        # В файле с несколькими REAC реакции сохраняют формулы своих топлив из файла
+        self.formula_input.setEnabled(not self.reactions)
+    
     def copy_to_clipboard(self):
         """Копирует сгенерированные REAC строки в буфер обмена"""
         try:
@@ -562,38 +852,164 @@ class FDSReacCalculator(QMainWindow):
             self.statusBar.showMessage("REAC строки скопированы в буфер обмена!")
             
             # Визуальная обратная связь - подсветка кнопки копирования на короткое время
-            orig_style = self.copy_button.styleSheet()
-            self.copy_button.setStyleSheet("""
-                background-color: #4ade80;
-                color: #064e3b;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-weight: bold;
-                min-width: 120px;
-            """)
-            
-            # Сбросить после задержки
-            QApplication.processEvents()
-            time.sleep(0.3)
-            self.copy_button.setStyleSheet(orig_style)
+            self._flash(self.copy_button, SUCCESS_BUTTON_STYLE, 300)
             
         except Exception as e:
             self.statusBar.showMessage(f"Ошибка копирования в буфер обмена: {str(e)}")
             QMessageBox.warning(self, "Ошибка копирования", f"Ошибка копирования в буфер обмена: {str(e)}")
     
+    def _library(self):
+        """Библиотека топлив (открывается при первом обращении) или None"""
+        if self.fuel_library is None:
+            load_core()
+            self.fuel_library = library.open_default_library()
+            if self.fuel_library is None:
+                self.statusBar.showMessage("Ошибка: Не удалось открыть библиотеку топлив.")
+        return self.fuel_library
+    
+    def search_library(self):
+        """Заполняет список топлив, найденных по строке поиска"""
+        self.library_timer.stop()
+        fuel_library = self._library()
+        if fuel_library is None:
+            return
+        self.library_results.clear()
+        for name, category in fuel_library.search(self.library_search.text()):
+            self.library_results.addItem(f"{name} [{category}]" if category else name, name)
+        if not self.library_results.count():
+            self.statusBar.showMessage("В библиотеке не найдено подходящих топлив.")
+    
+    def apply_library_fuel(self):
+        """Заполняет форму параметрами выбранного топлива из библиотеки"""
+        if not self.library_results.count():
+            self.search_library()
+        name = self.library_results.currentData()
+        fuel_library = self._library()
+        if not name or fuel_library is None:
+            return
+        fuel = fuel_library.get(name)
+        if fuel is None:
+            self.statusBar.showMessage(f"Топливо '{name}' не найдено в библиотеке.")
+            return
+        for param, value in fuel["params"].items():
+            self._mark_field(param, False)
+            self.inputs[param].setText(str(round(value, 6)))
+        # Топливо библиотеки задано без брутто-формулы
+        self._mark_field("formula", False)
+        self.formula_input.clear()
+        
+        if self.imported_file_path is None:
+            # Без импортированного файла ID топлива берется из библиотеки,
+            # а заранее рассчитанный блок показывается без пересчета
+            self.fuel_id = fuel["name"]
+            self.fuel_id_value.setText(self.fuel_id)
+            self.results_text.setText(fuel["block"])
+            self.copy_button.setEnabled(True)
+            self.reaction_params = None
+            # Дальнейшие правки полей пересчитывают показанный блок по строкам
+            self._live_block().reset(self.fuel_id, fuel["params"], fuel["block"])
+            self.live_active = True
+        else:
+            # В импортированном файле сохраняется его ID топлива
+            self.calculate_parameters(silent=True)
+        self.statusBar.showMessage(f"Применены параметры топлива '{fuel['name']}' из библиотеки.")
+    
+    def add_to_library(self):
+        """Сохраняет текущие параметры формы в библиотеку топлив"""
+        valid_inputs = self.validate_inputs()
+        fuel_library = self._library()
+        if not valid_inputs or fuel_library is None:
+            return
+        name, ok = QInputDialog.getText(self, "Библиотека топлив", "Имя топлива:", text=self.fuel_id)
+        if not ok or not name.strip():
+            return
+        category, ok = QInputDialog.getItem(self, "Библиотека топлив", "Категория:",
+                                            [""] + fuel_library.categories(), 0, True)
+        if not ok:
+            return
+        if fuel_library.get(name) is not None:
+            answer = QMessageBox.question(self, "Библиотека топлив",
+                                          f"Топливо '{name.strip()}' уже есть в библиотеке. Заменить?")
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+        try:
+            fuel_library.add(name, valid_inputs, category)
+        except ValueError as e:
+            QMessageBox.warning(self, "Библиотека топлив", str(e))
+            return
+        self.statusBar.showMessage(f"Топливо '{name.strip()}' сохранено в библиотеке.")
+        self.search_library()
+    
     def clear_inputs(self):
         """Очищает все поля ввода и результаты"""
         for input_field in self.inputs.values():
             input_field.clear()
+        self.formula_input.clear()
         self.results_text.clear()
+        self.live_active = False
         self.copy_button.setEnabled(False)
         self.save_fds_button.setEnabled(False)
         self.imported_file_path = None
+        self.imported_summary = None
         self.fuel_id = "Fuel"  # Сбросить ID топлива на значение по умолчанию
         self.fuel_id_value.setText(self.fuel_id)  # Обновить отображение ID топлива
+        self._set_reactions([])
         self.statusBar.showMessage("Входные данные и результаты очищены.")
         
+    def _flash(self, widget, style, msec):
+        """Временно меняет стиль виджета; исходный возвращается таймером, не блокируя окно"""
+        # При повторной подсветке до срабатывания таймера сохраняется самый первый стиль
+        self.flash_styles.setdefault(widget, widget.styleSheet())
+        widget.setStyleSheet(style)
+        QTimer.singleShot(msec, lambda: self._restore_style(widget))
+    
+    def _restore_style(self, widget):
+        if widget in self.flash_styles:
+            widget.setStyleSheet(self.flash_styles.pop(widget))
+    
+    def _start_task(self, fn, on_finished, on_failed, message):
+        """Запускает операцию с файлом в пуле потоков.
+
+        on_finished и on_failed должны быть методами окна: тогда сигналы
+        задачи доставляются в поток GUI через очередь событий.
+        """
+        if self.current_task is not None:
+            self.statusBar.showMessage("Дождитесь завершения текущей операции с файлом.")
+            return False
+        task = FileTask(fn)
+        task.signals.progress.connect(self.progress_bar.setValue)
+        # Интерфейс восстанавливается до обработчиков, показывающих диалоги
+        task.signals.finished.connect(self._task_done)
+        task.signals.failed.connect(self._task_done)
+        task.signals.finished.connect(on_finished)
+        task.signals.failed.connect(on_failed)
+        self.current_task = task
+        self.save_enabled = self.save_fds_button.isEnabled()
+        for button in (self.import_button, self.save_fds_button, self.calculate_button, self.clear_button):
+            button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.cancel_button.setVisible(True)
+        self.statusBar.showMessage(message)
+        self.thread_pool.start(task)
+        return True
+    
+    def _task_done(self, *args):
+        """Возвращает интерфейс в обычное состояние после фоновой операции"""
+        self.current_task = None
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        self.import_button.setEnabled(True)
+        self.calculate_button.setEnabled(True)
+        self.clear_button.setEnabled(True)
+        self.save_fds_button.setEnabled(self.save_enabled)
+    
+    def cancel_task(self):
+        """Прерывает текущую операцию с файлом"""
+        if self.current_task is not None:
+            self.current_task.cancel()
+            self.statusBar.showMessage("Отмена операции...")
+    
     def import_fds_file(self):
         """Импортирует параметры из файла FDS"""
         try:
@@ -605,152 +1021,82 @@ class FDSReacCalculator(QMainWindow):
             if not file_path:
                 return  # Пользователь отменил
                 
-            self.statusBar.showMessage(f"Загрузка файла FDS: {file_path}")
-            self.imported_file_path = file_path  # Сохранить путь к импортированному файлу
-            
-            # Читать файл FDS
-            with open(file_path, 'r') as file:
-                fds_content = file.read()
-            
-            # Инициализировать словарь параметров
-            params = {}
+            # Разобрать файл FDS за один проход (или взять разбор из кэша) в фоновом потоке
+            load_core()
+            if self.reac_cache is None:
+                self.reac_cache = cache.open_default_cache()
+            reac_cache = self.reac_cache
+            self.pending_path = file_path
+            self._start_task(
+                lambda progress: fdsio.load_fds(file_path, cache=reac_cache, progress=progress),
+                self._import_finished, self._import_failed, f"Загрузка файла FDS: {file_path}",
+            )
+                
+        except Exception as e:
+            self.statusBar.showMessage(f"Ошибка при импорте файла FDS: {str(e)}")
+            QMessageBox.critical(self, "Ошибка при импорте", 
+                              f"Ошибка при импорте файла FDS:\n{str(e)}\n\n{traceback.format_exc()}")
+    
+    def _import_failed(self, error, details):
+        """Обрабатывает ошибку или отмену разбора импортируемого файла"""
+        if isinstance(error, OperationCancelled):
+            self.statusBar.showMessage("Импорт файла FDS отменен.")
+            return
+        self.imported_file_path = self.pending_path  # Сохранить путь к импортированному файлу
+        if isinstance(error, fdsio.FDSParseError):
+            # Не можем продолжить без молярной массы
+            self.statusBar.showMessage(f"Ошибка: {error}")
+            QMessageBox.warning(self, "Предупреждение при импорте", str(error))
+            return
+        self.statusBar.showMessage(f"Ошибка при импорте файла FDS: {str(error)}")
+        QMessageBox.critical(self, "Ошибка при импорте", 
+                          f"Ошибка при импорте файла FDS:\n{str(error)}\n\n{details}")
+    
+    def _import_finished(self, parsed):
+        """Заполняет форму по результату разбора импортированного файла"""
+        try:
+            self.imported_file_path = self.pending_path  # Сохранить путь к импортированному файлу
             
-            # Сначала извлечь ID топлива из REAC строки
-            fuel_id_match = re.search(r'&REAC\s+FUEL=[\'"]([^\'"]+)[\'"]', fds_content, re.DOTALL | re.IGNORECASE)
-            fuel_id = "Fuel"  # Значение по умолчанию
-            if fuel_id_match:
-                fuel_id = fuel_id_match.group(1)
+            # Сохранить разбор файла для последующего сохранения
+            self.imported_summary = parsed
+            # Показывается исходный блок файла; пересчет - по кнопке расчета
+            self.live_active = False
+            self._set_reactions(parsed["reactions"])
             
-            # Сохранить ID топлива в классе
-            self.fuel_id = fuel_id
-            # Обновить отображение ID топлива
+            # Сохранить ID топлива в классе и обновить его отображение
+            self.fuel_id = parsed["fuel_id"]
             self.fuel_id_value.setText(self.fuel_id)
+            for warning in parsed["warnings"]:
+                self.statusBar.showMessage(warning)
+            if self.reactions:
+                self.statusBar.showMessage(f"В файле {len(self.reactions)} реакций REAC; "
+                                           "реакция для редактирования выбирается рядом с ID топлива.")
             
-            # Извлечь HEAT_OF_COMBUSTION из REAC
-            heat_match = re.search(r'&REAC.*?HEAT_OF_COMBUSTION\s*=\s*(\d+\.?\d*)', fds_content, re.DOTALL | re.IGNORECASE)
-            if heat_match:
-                params['heat_release'] = heat_match.group(1)
-            
-            # Escape the fuel_id for use in regex
-            escaped_fuel_id = re.escape(fuel_id)
-            # Извлечь MW из Fuel SPEC используя извлеченный ID топлива
-            mw_match = re.search(rf"&SPEC\s+ID=['\"]({escaped_fuel_id})['\"].*?MW\s*=\s*(\d+\.?\d*)", fds_content, re.DOTALL | re.IGNORECASE)
-            if mw_match:
-                params['molar_mass'] = mw_match.group(2)
-                molar_mass = float(params['molar_mass'])
-                self.statusBar.showMessage(f"Found molar mass {molar_mass} for fuel ID '{fuel_id}'")
-            else:
-                # Не можем продолжить без молярной массы
-                self.statusBar.showMessage(f"Ошибка: Не удалось найти молярную массу для ID топлива '{fuel_id}' в файле FDS.")
-                QMessageBox.warning(self, "Предупреждение при импорте", f"Не удалось найти молярную массу для ID топлива '{fuel_id}' в файле FDS.")
-                return
-            
-            # Извлечь VOLUME_FRACTION значения из PRODUCTS SPEC
-            # Regex to match 5 or 6 species, making HCl optional
-            products_pattern = r"&SPEC ID=['\"]PRODUCTS['\"]\s*.*?SPEC_ID\s*\(\s*1\s*:\s*(?P<count>[56])\s*\)\s*=\s*(?P<ids>.*?)\s*VOLUME_FRACTION\s*\(\s*1\s*:\s*(?P=count)\s*\)\s*=\s*(?P<vfs>[\d\.\s,E\-]+)/"
-            products_match = re.search(products_pattern, fds_content, re.DOTALL | re.IGNORECASE)
-
-            # Initialize V_ variables to None
-            V_SOOT, V_CO2, V_CO, V_HCl, V_H2O, V_N2 = None, None, None, None, None, None
-
-            if products_match:
-                count = int(products_match.group('count'))
-                ids_str = products_match.group('ids').strip()
-                vfs_str = products_match.group('vfs').strip()
-                
-                # Extract IDs and VFs
-                ids = [i.strip("' ") for i in ids_str.split(',')]
-                vfs = [float(v.strip()) for v in vfs_str.split(',')]
-                
-                if len(ids) == count and len(vfs) == count:
-                    products_dict = dict(zip(ids, vfs))
-                    
-                    # Assign V_ variables based on found IDs
-                    V_SOOT = products_dict.get('SOOT')
-                    V_CO2 = products_dict.get('CARBON DIOXIDE')
-                    V_CO = products_dict.get('CARBON MONOXIDE')
-                    V_HCl = products_dict.get('HYDROGEN CHLORIDE') # Will be None if not present
-                    V_H2O = products_dict.get('WATER VAPOR')
-                    V_N2 = products_dict.get('NITROGEN')
-                    
-                    # Calculate yields if V_ variables are not None
-                    try:
-                        if V_SOOT is not None: params['soot_yield'] = str(round(V_SOOT * self.W_SOOT / molar_mass * 9500.0, 6))
-                        if V_CO2 is not None: params['co2_yield'] = str(round(V_CO2 * self.W_CO2 / molar_mass, 6))
-                        if V_CO is not None: params['co_yield'] = str(round(V_CO * self.W_CO / molar_mass, 6))
-                        if V_HCl is not None: # Only calculate if HCl was present
-                             params['hcl_yield'] = str(round(V_HCl * self.W_HCl / molar_mass, 6))
-                        else: # Explicitly set to 0 if HCl was not in PRODUCTS
-                             params['hcl_yield'] = "0.0"
-                             
-                        # Calculate O2 consumption from N2 if possible
-                        if V_N2 is not None:
-                            V_O2 = V_N2 / 3.7619
-                            params['o2_consumption'] = str(round(V_O2 * self.W_O2 / molar_mass, 6))
-                        # else: Attempt to calculate from NU values later
-                            
-                    except (ValueError, TypeError, ZeroDivisionError) as e:
-                        self.statusBar.showMessage(f"Warning: Error calculating yields from PRODUCTS - {e}")
-                else:
-                     self.statusBar.showMessage("Warning: Mismatch between count, IDs, and VFs in PRODUCTS line.")
-            
-            # Attempt to get O2 consumption from REAC NU values if not found from PRODUCTS
-            if 'o2_consumption' not in params:
-                nu_match = re.search(r'&REAC.*?NU\s*\(\s*1\s*:\s*3\s*\)\s*=\s*-1\s*,\s*([\-\d\.]+)', fds_content, re.DOTALL | re.IGNORECASE)
-                if nu_match:
-                    try:
-                        mass_reactants = float(nu_match.group(1))
-                        # mass_reactants = -(1 + V_O2 * (1 + 3.7619 * (W_N2/W_O2)))
-                        V_O2 = -1 * (mass_reactants + 1) / (1 + 3.7619 * (self.W_N2/self.W_O2))
-                        params['o2_consumption'] = str(round(V_O2 * self.W_O2 / molar_mass, 6))
-                    except (ValueError, TypeError, ZeroDivisionError) as e:
-                         self.statusBar.showMessage(f"Warning: Could not parse/calculate O2 from REAC NU values - {e}")
-
-            # Default any missing yields (especially HCl if PRODUCTS wasn't parsed)
-            if 'hcl_yield' not in params: 
-                 params['hcl_yield'] = "0.0"
-            # Add defaults for others if needed, although they should ideally come from PRODUCTS
-            # if 'soot_yield' not in params: params['soot_yield'] = "0.0" # Or handle as error?
-            # ... etc for co2, co
-
             # Обновить поля ввода с извлеченными/установленными по умолчанию данными
+            self._mark_field("formula", False)
+            self.formula_input.setText(parsed.get("formula") or "")
             updated_params = False
-            for param, value in params.items():
+            for param, value in parsed["params"].items():
                 if param in self.inputs:
-                    self.inputs[param].setText(value)
+                    self.inputs[param].setText(str(round(value, 6)))
                     updated_params = True
             
-            # Найти и извлечь оригинальный блок SPEC/REAC из файла
-            original_reac_block = ""
-            try:
-                # Найти все релевантные строки SPEC и REAC
-                spec_pattern = r"&SPEC ID='(?:OXYGEN|NITROGEN|CARBON DIOXIDE|CARBON MONOXIDE|HYDROGEN CHLORIDE|WATER VAPOR|SOOT|AIR|PRODUCTS|{})'.*?/\n".format(re.escape(self.fuel_id))
-                reac_pattern = r'&REAC.*?/\n'
-                
-                all_matches = []
-                for pattern in [spec_pattern, reac_pattern]:
-                    all_matches.extend(list(re.finditer(pattern, fds_content, re.DOTALL | re.IGNORECASE)))
-                
-                if all_matches:
-                    all_matches.sort(key=lambda m: m.start())
-                    start_pos = all_matches[0].start()
-                    end_pos = all_matches[-1].end()
-                    original_reac_block = fds_content[start_pos:end_pos].strip()
-                else:
-                     original_reac_block = "# Не удалось извлечь оригинальный блок SPEC/REAC."
-                     
-            except Exception as find_err:
-                original_reac_block = f"# Ошибка при извлечении оригинального блока: {find_err}"
+            original_reac_block = parsed["block"]
+            # Профиль файла (сетки и разбиение по MPI) получен тем же разбором
+            profile = parsed.get("profile")
+            profile_text = mesh.format_profile(profile) if profile else ""
+            if profile and profile["imbalance"] is not None and profile["imbalance"] > mesh.IMBALANCE_WARNING:
+                profile_text += " - нагрузка процессов MPI неравномерна"
 
             if updated_params:
                 # НЕ пересчитывать, просто показать оригинальный блок
-                # self.calculate_parameters(silent=True) # УДАЛИТЬ ЭТУ СТРОКУ
                 self.results_text.setText(original_reac_block)
                 self.copy_button.setEnabled(bool(original_reac_block)) # Включить копирование, если блок извлечен
                 self.save_fds_button.setEnabled(self.imported_file_path is not None) # Включить сохранение
                 
-                self.statusBar.showMessage("Параметры импортированы. Оригинальный блок REAC показан.")
-                QMessageBox.information(self, "Успешный импорт", "Параметры успешно импортированы из файла FDS.\nОригинальный блок SPEC/REAC показан в области результатов.")
+                self.statusBar.showMessage(f"Параметры импортированы. Оригинальный блок REAC показан. {profile_text}")
+                QMessageBox.information(self, "Успешный импорт", "Параметры успешно импортированы из файла FDS.\nОригинальный блок SPEC/REAC показан в области результатов."
+                                        + (f"\n\n{profile_text}" if profile_text else ""))
             else:
                 self.results_text.clear() # Очистить результаты, если параметры не найдены
                 self.copy_button.setEnabled(False)
@@ -771,59 +1117,6 @@ class FDSReacCalculator(QMainWindow):
                 QMessageBox.warning(self, "Ошибка при сохранении", "Нет импортированного файла или рассчитанных результатов.")
                 return
 
-            # Читать исходный файл FDS
-            with open(self.imported_file_path, 'r') as file:
-                fds_content = file.read()
-                
-            # Получить новые REAC строки
-            new_reac_lines = self.results_text.toPlainText()
-            
-            # Найти все существующие блоки SPEC и REAC в файле
-            spec_reac_pattern = r'(&SPEC ID=\'OXYGEN\'.*?&REAC.*?/\n)'
-            
-            match = re.search(spec_reac_pattern, fds_content, re.DOTALL | re.IGNORECASE)
-            if match:
-                # Заменить совпавший блок с новыми REAC строками в том же положении
-                modified_content = fds_content[:match.start()] + new_reac_lines + fds_content[match.end():]
-            else:
-                # Если не найден существующий блок, найти отдельные строки SPEC и REAC
-                # Создать шаблоны для сопоставления всех отдельных строк SPEC и REAC
-                spec_pattern = r'&SPEC ID=\'(?:OXYGEN|NITROGEN|CARBON DIOXIDE|CARBON MONOXIDE|HYDROGEN CHLORIDE|WATER VAPOR|SOOT|Fuel|AIR|PRODUCTS)\'.*?/\n'
-                reac_pattern = r'&REAC.*?/\n'
-                
-                # Найти все вхождения
-                spec_matches = list(re.finditer(spec_pattern, fds_content, re.DOTALL | re.IGNORECASE))
-                reac_matches = list(re.finditer(reac_pattern, fds_content, re.DOTALL | re.IGNORECASE))
-                
-                if spec_matches or reac_matches:
-                    # Получить все совпадения и отсортировать по их начальным позициям
-                    all_matches = spec_matches + reac_matches
-                    all_matches.sort(key=lambda x: x.start())
-                    
-                    if all_matches:
-                        # Получить начальную позицию первого совпадения и конечную позицию последнего совпадения
-                        start_pos = all_matches[0].start()
-                        end_pos = all_matches[-1].end()
-                        
-                        # Заменить все совпадения с новым содержимым
-                        modified_content = fds_content[:start_pos] + new_reac_lines + fds_content[end_pos:]
-                    else:
-                        # Не найдены совпадения, добавить в начало
-                        modified_content = new_reac_lines + "\n" + fds_content
-                else:
-                    # Не найдены существующие строки, добавить после &HEAD или &MESH или в начало
-                    insert_after_patterns = [r'(&HEAD.*?/\n)', r'(&MESH.*?/\n)']
-                    insertion_point = 0
-                    
-                    for p in insert_after_patterns:
-                        match = re.search(p, fds_content, re.DOTALL | re.IGNORECASE)
-                        if match:
-                            insertion_point = match.end()
-                            break
-                    
-                    # Вставить новые REAC строки
-                    modified_content = fds_content[:insertion_point] + "\n" + new_reac_lines + "\n" + fds_content[insertion_point:]
-            
             # Спросить пользователя, где сохранить измененный файл
             save_path, _ = QFileDialog.getSaveFileName(
                 self, "Сохранить измененный файл FDS", "", "FDS файлы (*.fds);;Все файлы (*)"
@@ -836,44 +1129,110 @@ class FDSReacCalculator(QMainWindow):
             if not save_path.lower().endswith('.fds'):
                 save_path += '.fds'
                 
-            # Сохранить измененное содержимое
-            with open(save_path, 'w') as file:
-                file.write(modified_content)
-                
-            # Визуальная обратная связь
-            self.statusBar.showMessage(f"Файл FDS успешно сохранен в: {save_path}")
-            
-            # Подсветка кнопки сохранения на короткое время
-            orig_style = self.save_fds_button.styleSheet()
-            self.save_fds_button.setStyleSheet("""
-                background-color: #4ade80;
-                color: #064e3b;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-weight: bold;
-                min-width: 120px;
-            """)
-            
-            # Сбросить после задержки
-            QApplication.processEvents()
-            import time
-            time.sleep(0.3)
-            self.save_fds_button.setStyleSheet(orig_style)
-            
-            QMessageBox.information(self, "Успешное сохранение", f"Измененный файл FDS успешно сохранен в:\n{save_path}")
+            # Заменить блок SPEC/REAC в исходном файле новыми строками;
+            # разбор при импорте используется, если файл с тех пор не менялся
+            load_core()
+            file_path = self.imported_file_path
+            summary = None
+            if self.imported_summary and fdsio.file_stat(file_path) == self.imported_summary["stat"]:
+                summary = self.imported_summary
+            if self.reactions:
+                # Несколько REAC: группы каждой реакции заменяются на своих местах;
+                # без расчета - по значениям формы (показан исходный блок всех реакций)
+                params_list = self.reaction_params
+                if params_list is None:
+                    params_list = self._reactions_params()
+                    if params_list is None:
+                        return
+                write = lambda progress: fdsio.write_reactions(file_path, params_list, save_path, summary,
+                                                               progress=progress)
+            else:
+                reac_lines = self.results_text.toPlainText()
+                write = lambda progress: fdsio.write_reac_block(file_path, reac_lines, save_path, summary,
+                                                                progress=progress)
+            self.pending_path = save_path
+            self._start_task(write, self._save_finished, self._save_failed, f"Сохранение файла FDS: {save_path}")
             
         except Exception as e:
             self.statusBar.showMessage(f"Ошибка при сохранении файла FDS: {str(e)}")
             QMessageBox.critical(self, "Ошибка при сохранении", 
                               f"Ошибка при сохранении файла FDS:\n{str(e)}\n\n{traceback.format_exc()}")
+    
+    def _save_failed(self, error, details):
+        """Обрабатывает ошибку или отмену записи файла"""
+        if isinstance(error, OperationCancelled):
+            self.statusBar.showMessage("Сохранение файла FDS отменено, файл не изменен.")
+            return
+        self.statusBar.showMessage(f"Ошибка при сохранении файла FDS: {str(error)}")
+        QMessageBox.critical(self, "Ошибка при сохранении", 
+                          f"Ошибка при сохранении файла FDS:\n{str(error)}\n\n{details}")
+    
+    def _save_finished(self, result):
+        """Показывает результат успешной записи файла"""
+        save_path = self.pending_path
+        # Визуальная обратная связь
+        self.statusBar.showMessage(f"Файл FDS успешно сохранен в: {save_path}")
+        
+        # Подсветка кнопки сохранения на короткое время
+        self._flash(self.save_fds_button, SUCCESS_BUTTON_STYLE, 300)
+        
+        QMessageBox.information(self, "Успешное сохранение", f"Измененный файл FDS успешно сохранен в:\n{save_path}")
+
+    def closeEvent(self, event):
+        """Прерывает фоновую операцию и закрывает кэш и библиотеку при закрытии окна"""
+        self.cancel_task()
+        self.thread_pool.waitForDone()
+        if self.reac_cache is not None:
+            self.reac_cache.close()
+            self.reac_cache = None
+        if self.fuel_library is not None:
+            self.fuel_library.close()
+            self.fuel_library = None
+        super().closeEvent(event)
+
+
+def profile_startup(app_time, window_time, window):
+    """Дожидается завершения запуска окна и печатает время этапов (мс).
+
+    Возвращает код выхода: 1, если первая отрисовка формы не уложилась в
+    STARTUP_TARGET_MS.
+    """
+    app = QApplication.instance()
+    deadline = time.perf_counter() + 30
+    while window.startup_done_time is None and time.perf_counter() < deadline:
+        app.processEvents()
+    if window.startup_done_time is None:
+        print("Ошибка: окно не было отрисовано", file=sys.stderr)
+        return 1
+    ms = lambda start, end: (end - start) * 1000
+    stages = [
+        ("Загрузка PyQt6", _START_TIME, _QT_LOADED_TIME),
+        ("Создание QApplication", _QT_LOADED_TIME, app_time),
+        ("Построение формы", app_time, window_time),
+        ("Показ и первая отрисовка", window_time, window.first_paint_time),
+        ("Отложенная загрузка (ядро, справка)", window.first_paint_time, window.startup_done_time),
+    ]
+    for name, start, end in stages:
+        print(f"{name:<40}{ms(start, end):8.1f}")
+    visible = ms(_START_TIME, window.first_paint_time)
+    print(f"{'Форма отрисована':<40}{visible:8.1f} (цель {STARTUP_TARGET_MS})")
+    print(f"{'Запуск завершен':<40}{ms(_START_TIME, window.startup_done_time):8.1f}")
+    return 0 if visible <= STARTUP_TARGET_MS else 1
 
 
 def main():
     try:
-        app = QApplication(sys.argv)
+        profile = "--profile-startup" in sys.argv
+        argv = [arg for arg in sys.argv if arg != "--profile-startup"]
+        app = QApplication(argv)
+        app_time = time.perf_counter()
         window = FDSReacCalculator()
+        window_time = time.perf_counter()
         window.show()
+        if profile:
+            code = profile_startup(app_time, window_time, window)
+            window.close()
+            sys.exit(code)
         sys.exit(app.exec())
     except Exception as e:
         print(f"Ошибка: {str(e)}")
@@ -0,0 +1,8 @@
+"""Ядро калькулятора параметров REAC для FDS 6 без зависимостей от GUI."""
+
+from .fdsio import (FDSParseError, format_reac_block, format_reactions, load_fds, parse_reac_params,
+                    parse_reactions, write_reac_block, write_reactions)
+from .model import Reac, Reaction, Spec
+from .stoich import compute_reaction, fit_inverse, forward, inverse, validate_params
+
+__version__ = "1.1"
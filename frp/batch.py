@@ -0,0 +1,248 @@
+"""Пакетный пересчет блоков SPEC/REAC в файлах FDS без GUI.
+
+Файлы обрабатываются пулом процессов по числу ядер. Параметры топлива
+задаются в командной строке либо пересчитываются из собственной строки
+PRODUCTS каждого файла (--from-file), либо берутся из библиотеки топлив
+(--library-fuel) вместе с заранее рассчитанным блоком. В файлах с несколькими реакциями
+группы SPEC/REAC каждой реакции заменяются на своих местах. Файлы, блок
+которых уже совпадает с рассчитанным, на месте не перезаписываются;
+--dry-run вместо записи выводит набор замен (см. patchset).
+"""
+
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import cache, fdsio, library, patchset, splice, stoich
+
+FDS_EXTENSIONS = ('.fds',)
+
+
+def collect_files(patterns):
+    """Раскрывает каталоги и glob-шаблоны в отсортированный список файлов FDS"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(FDS_EXTENSIONS))
+        else:
+            files.extend(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(set(files))
+
+
+def rewrite_patches(file_path, summary, params=None, fuel_id=None, reac_lines=None, formula=None):
+    """Участки замены (см. splice) для пересчета блока SPEC/REAC файла.
+
+    Параметры как у rewrite_file; summary обязательна. В файлах с
+    несколькими REAC каждая реакция (или, при заданных params, реакция с
+    топливом fuel_id) заменяется на месте.
+    """
+    newline = fdsio.detect_newline(file_path)
+    reactions = summary["reactions"]
+    if len(reactions) > 1:
+        if params is None:
+            params_list = []
+            for reaction in reactions:
+                if reaction.get("error"):
+                    raise fdsio.FDSParseError(reaction["error"])
+                params_list.append(stoich.validate_params(reaction["params"]))
+        else:
+            # Заданные параметры относятся к одной реакции, остальные не меняются;
+            # без --formula реакция сохраняет брутто-формулу своего топлива
+            reaction = fdsio.select_reaction(reactions, fuel_id)
+            reactions = [dict(reaction, formula=formula if formula is not None else reaction.get("formula"))]
+            params_list = [params]
+        return fdsio.reactions_patches(dict(summary, reactions=reactions), params_list, newline)
+    if params is None:
+        if summary.get("error"):
+            raise fdsio.FDSParseError(summary["error"])
+        params = stoich.validate_params(summary["params"])
+    if formula is None:
+        # Без --formula топливо файла сохраняет свою брутто-формулу
+        formula = summary.get("formula")
+    if reac_lines is None or formula:
+        reac_lines = fdsio.format_reac_block(fuel_id or summary["fuel_id"], params, formula=formula)
+    return [fdsio.reac_block_patch(summary, reac_lines, newline)]
+
+
+def rewrite_file(file_path, params=None, fuel_id=None, output_dir=None, summary=None, reac_lines=None,
+                 formula=None):
+    """Пересчитывает и записывает блок SPEC/REAC одного файла.
+
+    Если params не заданы, параметры берутся из самого файла; summary -
+    готовая сводка файла из кэша, без нее файл разбирается. В файлах с
+    несколькими REAC пересчитываются все реакции (или, при заданных
+    params, реакция с топливом fuel_id), а их группы заменяются на месте.
+    reac_lines - готовый блок SPEC/REAC для params и fuel_id (из
+    библиотеки топлив), используемый в файлах с одной реакцией без пересчета.
+    formula - брутто-формула топлива для params: с ней баланс атомов
+    замыкается (при пересчете из файла берется формула самого файла).
+    Возвращает кортеж (путь, успех, сообщение, сводка) и не выбрасывает
+    исключений, чтобы ошибка одного файла не останавливала пакет. Сводка
+    возвращается только если файл пришлось разобрать.
+    """
+    parsed = None
+    try:
+        if summary is None:
+            summary = parsed = fdsio.summarize_fds(file_path)
+        target = file_path if output_dir is None else os.path.join(output_dir, os.path.basename(file_path))
+        patches = rewrite_patches(file_path, summary, params, fuel_id, reac_lines, formula)
+        # Неизменяемый файл на месте не перезаписывается
+        if target != file_path or not splice.unchanged(file_path, patches):
+            splice.splice_file(file_path, patches, target)
+        return file_path, True, target, parsed
+    except Exception as e:
+        return file_path, False, str(e), parsed
+
+
+def _rewrite_task(task):
+    return rewrite_file(*task)
+
+
+def run_batch(files, params=None, fuel_id=None, output_dir=None, workers=None, cache=None, reac_lines=None,
+              formula=None):
+    """Обрабатывает файлы пулом процессов и возвращает итоговую статистику.
+
+    cache (ReacCache) избавляет от повторного разбора неизмененных файлов;
+    новые сводки сохраняются в него, только если исходные файлы не
+    перезаписываются.
+    """
+    workers = workers or os.cpu_count() or 1
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    summaries = [cache.get(path) if cache is not None else None for path in files]
+    tasks = [(path, params, fuel_id, output_dir, summary, reac_lines, formula)
+             for path, summary in zip(files, summaries)]
+    failures = []
+
+    def collect(results):
+        for path, ok, message, parsed in results:
+            if not ok:
+                failures.append((path, message))
+            if parsed is not None and cache is not None and output_dir:
+                cache.put(path, parsed)
+
+    if workers == 1 or len(tasks) <= 1:
+        collect(map(_rewrite_task, tasks))
+    else:
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(_rewrite_task, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    return {
+        "files": len(tasks),
+        "failed": failures,
+        "cached": sum(summary is not None for summary in summaries),
+        "elapsed": elapsed,
+        "files_per_second": len(tasks) / elapsed if elapsed > 0 else float("inf"),
+        "workers": workers,
+    }
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду batch"""
+    parser = subparsers.add_parser("batch", help="Пересчитать блоки REAC во множестве файлов FDS")
+    parser.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-file", action="store_true",
+                        help="Пересчитать по собственной строке PRODUCTS каждого файла")
+    source.add_argument("--fuel", nargs=7, type=float, metavar=tuple(stoich.INPUT_NAMES),
+                        help="Параметры топлива в порядке полей формы")
+    source.add_argument("--library-fuel", metavar="NAME",
+                        help="Топливо из библиотеки (его имя становится ID топлива, если не задан --fuel-id)")
+    parser.add_argument("--fuel-id", help="ID топлива (по умолчанию из файла); в файлах с несколькими REAC - "
+                                          "топливо пересчитываемой реакции")
+    parser.add_argument("--formula", help="Брутто-формула топлива для --fuel или --library-fuel (например, C3H8): "
+                                          "баланс атомов замыкается подбором H2O и потребления кислорода")
+    parser.add_argument("--output-dir", help="Каталог для результатов (по умолчанию файлы перезаписываются)")
+    parser.add_argument("--dry-run", metavar="PATCHES",
+                        help="Ничего не записывать, а вывести замены в файл JSON Lines (- для стандартного вывода), "
+                             "применяемый позже командой apply")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Число процессов (по умолчанию число ядер)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def library_fuel(name, fuel_id=None):
+    """Параметры топлива из библиотеки и его готовый блок SPEC/REAC"""
+    fuel = library.load_fuel(name)
+    # Готовый блок содержит имя топлива из библиотеки в качестве ID
+    reac_lines = fuel["block"] if fuel_id in (None, fuel["name"]) else None
+    return fuel["params"], fuel_id or fuel["name"], reac_lines
+
+
+def format_balance(params, formula):
+    """Таблица невязок баланса атомов топлива до и после замыкания (моль на моль топлива)"""
+    result = stoich.close_balance(params, stoich.parse_formula(formula))
+    lines = ["\t".join(("balance",) + stoich.ELEMENTS + ("mass",))]
+    for name in ("residuals_before", "residuals"):
+        residuals = result[name]
+        values = [f"{value:.6g}" for value in residuals] + [f"{residuals @ stoich.ATOMIC_MASSES:.6g}"]
+        lines.append("\t".join(["before" if name == "residuals_before" else "after"] + values))
+    return "\n".join(lines)
+
+
+def main(args):
+    params = None
+    fuel_id = args.fuel_id
+    reac_lines = None
+    try:
+        if args.fuel:
+            params = stoich.validate_params(dict(zip(stoich.INPUT_NAMES, args.fuel)))
+        elif args.library_fuel:
+            params, fuel_id, reac_lines = library_fuel(args.library_fuel, fuel_id)
+        if args.formula:
+            if params is None:
+                raise ValueError("--formula задается вместе с --fuel или --library-fuel")
+            print(format_balance(params, args.formula), file=sys.stderr if args.dry_run == "-" else sys.stdout)
+        if args.dry_run and args.output_dir:
+            raise ValueError("--dry-run и --output-dir несовместимы")
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        return 2
+    files = collect_files(args.paths)
+    if not files:
+        print("Ошибка: Не найдено ни одного файла FDS.")
+        return 1
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    if args.dry_run:
+        try:
+            return _dry_run(args, files, params, fuel_id, reac_cache, reac_lines)
+        finally:
+            if reac_cache is not None:
+                reac_cache.close()
+    try:
+        stats = run_batch(files, params, fuel_id, args.output_dir, args.workers, reac_cache, reac_lines, args.formula)
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    for path, message in stats["failed"]:
+        print(f"Ошибка: {path}: {message}")
+    print(f"Обработано файлов: {stats['files']}, ошибок: {len(stats['failed'])}, "
+          f"из кэша: {stats['cached']}, время: {stats['elapsed']:.2f} с, {stats['files_per_second']:.1f} файл/с "
+          f"({stats['workers']} проц.)")
+    return 1 if stats["failed"] else 0
+
+
+def _dry_run(args, files, params, fuel_id, reac_cache, reac_lines):
+    try:
+        out = sys.stdout if args.dry_run == "-" else open(args.dry_run, "w", encoding="utf-8")
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    try:
+        stats = patchset.plan_batch(files, out, params, fuel_id, args.workers, reac_cache, reac_lines, args.formula)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    for path, message in stats["failed"]:
+        print(f"Ошибка: {path}: {message}", file=sys.stderr)
+    print(f"Файлов: {stats['files']}, изменятся: {stats['changed']}, без изменений: {stats['unchanged']}, "
+          f"ошибок: {len(stats['failed'])}, объем замен: {stats['bytes']} байт, из кэша: {stats['cached']}, "
+          f"время: {stats['elapsed']:.2f} с", file=sys.stderr)
+    return 1 if stats["failed"] else 0
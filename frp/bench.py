@@ -0,0 +1,260 @@
+"""Воспроизводимые замеры производительности импорта, расчета и сохранения.
+
+Входные файлы FDS синтезируются детерминированно в нескольких масштабах
+(от файла-примера до 10^6 групп &OBST, 1-64 &MESH, одна и несколько REAC),
+после чего без GUI замеряются те же операции, что выполняют кнопки формы:
+разбор при импорте (fdsio.load_fds), расчет блока (format_reac_block или
+format_reactions) и запись (write_reac_block или write_reactions).
+Результат выводится в JSON: время, пропускная способность и пиковая память
+(tracemalloc, отдельным прогоном, чтобы не искажать время). Сравнение с
+сохраненным результатом (--compare) выявляет регрессии.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import __version__, fdsio, model, stoich
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Файл-пример рядом с GUI
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "4e187527.fds.txt")
+
+# Масштабы: число групп OBST, MESH и REAC
+SCALES = {
+    "small": {"obst": 1000, "meshes": 1, "reactions": 1},
+    "medium": {"obst": 100000, "meshes": 16, "reactions": 1},
+    "multi": {"obst": 100000, "meshes": 16, "reactions": 4},
+    "large": {"obst": 1000000, "meshes": 64, "reactions": 1},
+}
+DEFAULT_SCALES = ("sample", "small", "medium", "multi", "large")
+
+# Параметры топлива для расчета (значения формы по умолчанию)
+BENCH_PARAMS = {
+    "heat_release": 31700.0,
+    "soot_yield": 0.1,
+    "o2_consumption": 1.5,
+    "co2_yield": 2.5,
+    "co_yield": 0.05,
+    "hcl_yield": 0.01,
+    "molar_mass": 104.3233,
+}
+CALC_CALLS = 2000
+
+
+def synthesize(file_path, obst, meshes, reactions):
+    """Записывает синтетический файл FDS заданного масштаба.
+
+    Содержимое определяется только параметрами, так что повторные запуски
+    замеряют одинаковые файлы.
+    """
+    with open(file_path, "w", encoding="ascii", newline="\n") as file:
+        file.write("&HEAD CHID='bench' TITLE='FRP benchmark'/\n&TIME T_END=60/\n")
+        for i in range(meshes):
+            x = i * 10
+            file.write(f"&MESH IJK=50,50,25 XB={x},{x + 10},0,10,0,5 MPI_PROCESS={i}/\n")
+        file.write("\n".join(fdsio.SHARED_SPEC_LINES) + "\n")
+        for r in range(reactions):
+            suffix = f"_{r + 1}" if reactions > 1 else ""
+            fuel, products = f"FUEL{suffix}", f"PRODUCTS{suffix}"
+            params = dict(BENCH_PARAMS, molar_mass=BENCH_PARAMS["molar_mass"] + r)
+            reaction = model.Reaction.new(fuel, products).set_params(params)
+            file.write("\n".join(reaction.lines()) + "\n")
+        file.write("&SURF ID='WALL' COLOR='GRAY'/\n")
+        lines = []
+        for i in range(obst):
+            x, y = (i % 1000) * 0.1, (i // 1000) * 0.1
+            lines.append(f"&OBST XB={x:.1f},{x + 0.1:.1f},{y:.1f},{y + 0.1:.1f},0,1 SURF_ID='WALL'/\n")
+            if len(lines) == 10000:
+                file.write("".join(lines))
+                lines.clear()
+        file.write("".join(lines))
+        file.write("&TAIL /\n")
+
+
+def _timed(fn, repeat):
+    """Медиана и минимум времени вызова fn за repeat прогонов"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times)
+
+
+def _peak_memory(fn):
+    """Пик памяти Python-объектов (байт) за один вызов fn"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(fn, repeat, size=None, records=None, calls=1):
+    median, best = _timed(fn, repeat)
+    result = {"seconds": median, "best_seconds": best, "peak_memory_bytes": _peak_memory(fn)}
+    if size is not None:
+        result["mb_per_second"] = size / median / 1e6 if median > 0 else None
+    if records is not None:
+        result["records_per_second"] = records / median if median > 0 else None
+    if calls > 1:
+        result["calls_per_second"] = calls / median if median > 0 else None
+    return result
+
+
+def bench_file(name, file_path, out_dir, repeat):
+    """Замеры импорта, расчета и сохранения для одного файла"""
+    size = os.path.getsize(file_path)
+    records = fdsio.scan_fds(file_path)
+    summary = fdsio.summarize(records)
+    reactions = summary["reactions"]
+    out_path = os.path.join(out_dir, name + ".out.fds")
+    case = {
+        "name": name,
+        "size_bytes": size,
+        "records": len(records),
+        "meshes": sum(r.name == "MESH" for r in records),
+        "obst": sum(r.name == "OBST" for r in records),
+        "reactions": len(reactions),
+    }
+    del records
+
+    case["import"] = _measure(lambda: fdsio.load_fds(file_path), repeat, size, case["records"])
+
+    if len(reactions) > 1:
+        params_list = [dict(BENCH_PARAMS, molar_mass=BENCH_PARAMS["molar_mass"] + i) for i in range(len(reactions))]
+
+        def calculate():
+            for _ in range(CALC_CALLS):
+                fdsio.format_reactions(reactions, params_list)
+
+        def save():
+            fdsio.write_reactions(file_path, params_list, out_path, summary)
+    else:
+        fuel_id = summary["fuel_id"]
+        block = fdsio.format_reac_block(fuel_id, BENCH_PARAMS)
+
+        def calculate():
+            for _ in range(CALC_CALLS):
+                fdsio.format_reac_block(fuel_id, BENCH_PARAMS)
+
+        def save():
+            fdsio.write_reac_block(file_path, block, out_path, summary)
+
+    case["calculate"] = _measure(calculate, repeat, calls=CALC_CALLS)
+    case["save"] = _measure(save, repeat, size)
+    os.unlink(out_path)
+    return case
+
+
+def bench_vectorized(repeat, rows=1000000):
+    """Замер векторного расчета stoich.forward для rows наборов параметров"""
+    rng = np.random.default_rng(0)
+    params = {name: np.full(rows, value) for name, value in BENCH_PARAMS.items()}
+    params["molar_mass"] = rng.uniform(50, 150, rows)
+    result = _measure(lambda: stoich.forward(params), repeat)
+    result["rows"] = rows
+    result["rows_per_second"] = rows / result["seconds"] if result["seconds"] > 0 else None
+    return result
+
+
+def run(scales=DEFAULT_SCALES, repeat=3, work_dir=None, progress=None):
+    """Выполняет замеры для заданных масштабов и возвращает результат (словарь для JSON)"""
+    report = {
+        "frp_version": __version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="frp-bench.") as tmp_dir:
+        for name in scales:
+            if progress is not None:
+                progress(name)
+            if name == "sample":
+                if not os.path.exists(SAMPLE_PATH):
+                    continue
+                file_path = SAMPLE_PATH
+            else:
+                file_path = os.path.join(tmp_dir, name + ".fds")
+                synthesize(file_path, **SCALES[name])
+            report["cases"].append(bench_file(name, file_path, tmp_dir, repeat))
+            if file_path != SAMPLE_PATH:
+                os.unlink(file_path)
+    if progress is not None:
+        progress("vectorized")
+    report["vectorized"] = bench_vectorized(repeat)
+    if resource is not None:
+        # ru_maxrss - в КБ в Linux и в байтах в macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["max_rss_bytes"] = max_rss if sys.platform == "darwin" else max_rss * 1024
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Список регрессий: операции, ставшие медленнее базового замера более чем на tolerance"""
+    regressions = []
+    base_cases = {case["name"]: case for case in baseline.get("cases", [])}
+    for case in report["cases"]:
+        base = base_cases.get(case["name"])
+        if base is None:
+            continue
+        for phase in ("import", "calculate", "save"):
+            old, new = base[phase]["best_seconds"], case[phase]["best_seconds"]
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(f"{case['name']}/{phase}: {old:.4f} с -> {new:.4f} с (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду bench"""
+    parser = subparsers.add_parser("bench", help="Замерить производительность импорта, расчета и сохранения")
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES),
+                        help=f"Масштабы через запятую (из: sample, {', '.join(SCALES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Число прогонов каждой операции")
+    parser.add_argument("-o", "--output", help="Файл JSON для результата (по умолчанию стандартный вывод)")
+    parser.add_argument("--compare", metavar="JSON", help="Сравнить с ранее сохраненным результатом")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Допустимое замедление при сравнении (доля, по умолчанию 0.2)")
+    parser.add_argument("--work-dir", help="Каталог для синтетических файлов (по умолчанию временный)")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    scales = [name.strip() for name in args.scales.split(",") if name.strip()]
+    unknown = [name for name in scales if name != "sample" and name not in SCALES]
+    if unknown:
+        print(f"Ошибка: Неизвестные масштабы: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    report = run(scales, max(1, args.repeat), args.work_dir,
+                 progress=lambda name: print(f"Замер: {name}", file=sys.stderr))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,173 @@
+"""Постоянный кэш результатов разбора файлов FDS.
+
+Для каждого файла хранится сводка разбора (см. fdsio.summarize): ID
+топлива, MW, HEAT_OF_COMBUSTION, выходы и смещения блока SPEC/REAC.
+Запись действительна, пока совпадают размер и время изменения файла; при
+их изменении сравнивается хэш содержимого, так что простое касание файла
+не вызывает повторного разбора. Число и общий объем записей ограничены,
+лишние вытесняются по давности последнего обращения (LRU).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from . import fdsio, trace
+
+# Версия формата сводки; при ее изменении кэш очищается
+CACHE_VERSION = 6
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Проверка ограничений выполняется не чаще, чем раз в столько добавлений
+_EVICT_INTERVAL = 256
+
+_HASH_CHUNK = 1 << 20
+
+
+def default_cache_path():
+    """Путь к файлу кэша: $FRP_CACHE_DIR, $XDG_CACHE_HOME/frp или ~/.cache/frp"""
+    directory = os.environ.get("FRP_CACHE_DIR")
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(base, "frp")
+    return os.path.join(directory, "reac_cache.sqlite3")
+
+
+def file_digest(file_path):
+    """Хэш содержимого файла (BLAKE2b), читаемого блоками"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReacCache:
+    """Кэш сводок разбора в базе SQLite"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Соединение может использоваться из рабочего потока GUI, но не
+        # из нескольких потоков одновременно
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        # Время обращения к записям обновляется пачкой, чтобы проверка
+        # тысяч неизмененных файлов не превращалась в тысячи транзакций
+        self._touched = {}
+        self._puts = 0
+
+    def _init_schema(self):
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or int(row[0]) != CACHE_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT,"
+                " data TEXT, nbytes INTEGER, last_access REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+
+    def get(self, file_path):
+        """Возвращает сохраненную сводку файла или None, если ее нет или она устарела"""
+        key = os.path.abspath(file_path)
+        row = self._db.execute(
+            "SELECT size, mtime_ns, digest, data FROM entries WHERE path = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, digest, data = row
+        if (size, mtime_ns) != fdsio.file_stat(file_path):
+            # Файл мог быть только перезаписан тем же содержимым
+            if file_digest(file_path) != digest:
+                return None
+            size, mtime_ns = fdsio.file_stat(file_path)
+            with self._db:
+                self._db.execute("UPDATE entries SET size = ?, mtime_ns = ? WHERE path = ?",
+                                 (size, mtime_ns, key))
+        self._touched[key] = time.time()
+        return json.loads(data)
+
+    def put(self, file_path, summary):
+        """Сохраняет сводку файла в его текущем состоянии"""
+        key = os.path.abspath(file_path)
+        size, mtime_ns = fdsio.file_stat(file_path)
+        # JSON в ASCII: суррогаты недекодируемых байтов (см. namelist.ERRORS)
+        # не записываются в SQLite как текст UTF-8
+        data = json.dumps(summary)
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, size, mtime_ns, file_digest(file_path), data, len(data), time.time()),
+            )
+        self._puts += 1
+        if self._puts >= _EVICT_INTERVAL:
+            self.flush()
+
+    def load(self, file_path, encoding=None, progress=None):
+        """Сводка файла из кэша, а при промахе - после разбора файла"""
+        with trace.span("cache.get"):
+            summary = self.get(file_path)
+        if summary is None:
+            trace.count("cache.misses")
+            summary = fdsio.summarize_fds(file_path, encoding, progress)
+            with trace.span("cache.put"):
+                self.put(file_path, summary)
+        else:
+            trace.count("cache.hits")
+        return summary
+
+    def flush(self):
+        """Записывает накопленные обращения и вытесняет лишние записи"""
+        with self._db:
+            if self._touched:
+                self._db.executemany("UPDATE entries SET last_access = ? WHERE path = ?",
+                                     [(stamp, key) for key, stamp in self._touched.items()])
+                self._touched.clear()
+            self._puts = 0
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM entries").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+            evict_count = max(0, count - self.max_entries)
+            evict_bytes = total - self.max_bytes
+            victims = []
+            for path, nbytes in self._db.execute("SELECT path, nbytes FROM entries ORDER BY last_access"):
+                if evict_count <= 0 and evict_bytes <= 0:
+                    break
+                victims.append((path,))
+                evict_count -= 1
+                evict_bytes -= nbytes
+            self._db.executemany("DELETE FROM entries WHERE path = ?", victims)
+
+    def clear(self):
+        """Удаляет все записи кэша"""
+        with self._db:
+            self._db.execute("DELETE FROM entries")
+        self._touched.clear()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_default_cache():
+    """Открывает кэш по умолчанию или возвращает None, если это невозможно"""
+    try:
+        return ReacCache()
+    except (OSError, sqlite3.Error):
+        return None
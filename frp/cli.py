@@ -0,0 +1,42 @@
+"""Консольный интерфейс FRP без зависимостей от PyQt6.
+
+Запуск: python -m frp <команда> [параметры]
+"""
+
+import argparse
+import sys
+
+from . import batch, bench, export, fanout, fit, library, mesh, patchset, scan, serve, sweep, trace, verify, watch
+
+
+def build_parser():
+    """Создает парсер аргументов со всеми подкомандами"""
+    parser = argparse.ArgumentParser(
+        prog="python -m frp",
+        description="Калькулятор параметров REAC для FDS 6 (консольный режим)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    batch.add_parser(subparsers)
+    patchset.add_parser(subparsers)
+    scan.add_parser(subparsers)
+    library.add_parser(subparsers)
+    sweep.add_parser(subparsers)
+    fanout.add_parser(subparsers)
+    bench.add_parser(subparsers)
+    watch.add_parser(subparsers)
+    verify.add_parser(subparsers)
+    mesh.add_parser(subparsers)
+    export.add_parser(subparsers)
+    fit.add_parser(subparsers)
+    serve.add_parser(subparsers)
+    trace.add_parser(subparsers)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
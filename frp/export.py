@@ -0,0 +1,218 @@
+"""Выгрузка параметров реакций множества файлов FDS в таблицу CSV, JSON или Parquet.
+
+Для каждой реакции каждого файла выводится строка: ID топлива, MW,
+теплота сгорания, объемные доли всех компонентов PRODUCTS, коэффициенты
+NU и восстановленные по ним выходы (как в форме). Файлы обрабатываются
+по одному, а строки записываются сразу (в Parquet - группами по
+PARQUET_ROW_GROUP строк), так что память не зависит от числа файлов.
+Неизмененные файлы берутся из кэша разбора.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+
+from . import batch, cache, scan, stoich
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet недоступен без pyarrow
+    pyarrow = None
+
+FRACTION_COLUMNS = tuple("volume_fraction_" + spec_id.lower().replace(" ", "_") for spec_id in stoich.PRODUCT_IDS)
+YIELD_COLUMNS = tuple(name for name in stoich.INPUT_NAMES if name not in ("heat_release", "molar_mass"))
+COLUMNS = (("path", "reac_id", "fuel_id", "products_id", "formula", "molar_mass", "heat_release")
+           + FRACTION_COLUMNS + ("nu_fuel", "nu_air", "nu_products") + YIELD_COLUMNS + ("balanced", "error"))
+# Типы столбцов: строковые, логический, остальные - числа
+TEXT_COLUMNS = {"path", "reac_id", "fuel_id", "products_id", "formula", "error"}
+FORMATS = ("csv", "json", "jsonl", "parquet")
+PARQUET_ROW_GROUP = 65536
+
+
+def reaction_rows(path, summary):
+    """Строки таблицы (словари по COLUMNS) для всех реакций файла.
+
+    Отсутствующие значения - None; для файла без реакций выдается одна
+    строка с сообщением об ошибке.
+    """
+    reactions = summary.get("reactions") or []
+    if not reactions:
+        row = dict.fromkeys(COLUMNS)
+        row.update(path=path, fuel_id=summary.get("fuel_id"), error=summary.get("error") or "Не найдена группа REAC")
+        yield row
+        return
+    for reaction in reactions:
+        params = reaction.get("params") or {}
+        products = reaction.get("products") or {}
+        balanced = bool(reaction.get("balanced"))
+        row = {
+            "path": path,
+            "reac_id": reaction.get("reac_id"),
+            "fuel_id": reaction["fuel_id"],
+            "products_id": reaction["products_id"],
+            "formula": reaction.get("formula"),
+            "molar_mass": params.get("molar_mass"),
+            "heat_release": params.get("heat_release"),
+            "nu_fuel": -1.0,
+            "nu_air": reaction.get("nu_air"),
+            # В прежней записи NU смеси продуктов равен 1
+            "nu_products": sum(products.values()) if balanced else 1.0,
+            "balanced": balanced,
+            "error": reaction.get("error"),
+        }
+        for column, spec_id in zip(FRACTION_COLUMNS, stoich.PRODUCT_IDS):
+            row[column] = products.get(spec_id)
+        for name in YIELD_COLUMNS:
+            row[name] = params.get(name)
+        yield row
+
+
+class CsvWriter:
+    """Строки CSV с заголовком; отсутствующие значения - пустые ячейки"""
+
+    def __init__(self, file):
+        self._writer = csv.writer(file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, row):
+        self._writer.writerow(["" if row[name] is None else row[name] for name in COLUMNS])
+
+    def close(self):
+        pass
+
+
+class JsonWriter:
+    """Массив JSON (lines=False) или JSON Lines; строки пишутся по одной"""
+
+    def __init__(self, file, lines=False):
+        self._file = file
+        self._lines = lines
+        self._count = 0
+        if not lines:
+            file.write("[")
+
+    def write(self, row):
+        text = json.dumps(row, ensure_ascii=False, allow_nan=False)
+        if self._lines:
+            self._file.write(text + "\n")
+        else:
+            self._file.write(("," if self._count else "") + "\n  " + text)
+        self._count += 1
+
+    def close(self):
+        if not self._lines:
+            self._file.write("\n]\n" if self._count else "]\n")
+
+
+class ParquetWriter:
+    """Файл Parquet, записываемый группами строк по PARQUET_ROW_GROUP (требует pyarrow)"""
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise ValueError("Для выгрузки в Parquet требуется пакет pyarrow (pip install pyarrow)")
+        fields = []
+        for name in COLUMNS:
+            if name in TEXT_COLUMNS:
+                fields.append(pyarrow.field(name, pyarrow.string()))
+            elif name == "balanced":
+                fields.append(pyarrow.field(name, pyarrow.bool_()))
+            else:
+                fields.append(pyarrow.field(name, pyarrow.float64()))
+        self._schema = pyarrow.schema(fields)
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._columns = {name: [] for name in COLUMNS}
+        self._count = 0
+
+    def write(self, row):
+        for name in COLUMNS:
+            self._columns[name].append(row[name])
+        self._count += 1
+        if self._count == PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._count:
+            self._writer.write_table(pyarrow.Table.from_pydict(self._columns, schema=self._schema))
+            for values in self._columns.values():
+                values.clear()
+            self._count = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def detect_format(path, fmt=None):
+    """Формат выгрузки: заданный явно или по расширению файла (по умолчанию csv)"""
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path or "")[1].lower().lstrip(".")
+    if extension == "pq":
+        return "parquet"
+    return extension if extension in FORMATS else "csv"
+
+
+def export_files(files, output=None, fmt=None, reac_cache=None):
+    """Выгружает реакции файлов в output (путь или None - стандартный вывод).
+
+    Возвращает словарь со статистикой: files, rows, errors (строки с
+    ошибкой разбора) и elapsed.
+    """
+    fmt = detect_format(output, fmt)
+    if fmt == "parquet" and not output:
+        raise ValueError("Для Parquet нужно указать файл (-o)")
+    start = time.perf_counter()
+    stats = {"files": 0, "rows": 0, "errors": 0}
+    file = None
+    if fmt == "parquet":
+        writer = ParquetWriter(output)
+    else:
+        file = open(output, "w", encoding="utf-8", errors="backslashreplace", newline="") if output else sys.stdout
+        writer = CsvWriter(file) if fmt == "csv" else JsonWriter(file, lines=fmt == "jsonl")
+    try:
+        for path, summary in scan.scan_files(files, reac_cache):
+            stats["files"] += 1
+            for row in reaction_rows(path, summary):
+                writer.write(row)
+                stats["rows"] += 1
+                stats["errors"] += row["error"] is not None
+        writer.close()
+    finally:
+        if file is not None and file is not sys.stdout:
+            file.close()
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду export"""
+    parser = subparsers.add_parser("export", help="Выгрузить параметры реакций файлов FDS в CSV, JSON или Parquet")
+    parser.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    parser.add_argument("-o", "--output", help="Файл результата (по умолчанию стандартный вывод)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Формат (по умолчанию по расширению файла результата, иначе csv)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    files = batch.collect_files(args.paths)
+    if not files:
+        print("Ошибка: Не найдено ни одного файла FDS.", file=sys.stderr)
+        return 1
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    try:
+        stats = export_files(files, args.output, args.format, reac_cache)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    print(f"Файлов: {stats['files']}, строк: {stats['rows']}, с ошибками: {stats['errors']}, "
+          f"время: {stats['elapsed']:.2f} с", file=sys.stderr)
+    return 0
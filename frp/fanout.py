@@ -0,0 +1,232 @@
+"""Генерация сценариев: один исходный файл FDS, много вариантов топлива.
+
+Исходный файл разбирается один раз; для каждой строки таблицы параметров
+строятся только участки замены (HEAD с уникальным CHID и блок SPEC/REAC), а
+неизменные диапазоны исходного файла копируются в каждый вариант средствами
+ядра (см. splice). Запись идет пулом потоков с ограниченным числом
+ожидающих задач, так что память не растет с числом вариантов, а скорость
+определяется диском.
+"""
+
+import csv
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import fdsio, namelist, splice, stoich
+
+# Вариантов, блоки которых рассчитываются одним векторным вызовом
+BLOCK_CHUNK = 256
+
+_CHID_RE = re.compile(r"""(\bCHID\s*=\s*)('[^']*'|"[^"]*")""", re.IGNORECASE)
+_HEAD_RE = re.compile(r"^(\s*&HEAD)", re.IGNORECASE)
+_CHID_UNSAFE = re.compile(r"[^A-Za-z0-9_\-]+")
+
+
+def safe_chid(text):
+    """CHID, пригодный для имени файла: без пробелов, точек и кавычек"""
+    return _CHID_UNSAFE.sub("_", text.strip()).strip("_") or "case"
+
+
+def set_chid(head_text, chid):
+    """Текст группы HEAD с новым CHID (добавляется, если его не было)"""
+    if _CHID_RE.search(head_text):
+        return _CHID_RE.sub(lambda m: f"{m.group(1)}'{chid}'", head_text, count=1)
+    return _HEAD_RE.sub(lambda m: f"{m.group(1)} CHID='{chid}'", head_text, count=1)
+
+
+class BaseFile:
+    """Исходный файл сценария, разобранный один раз.
+
+    Хранит сводку, перевод строки и группу HEAD; patches() строит участки
+    замены для варианта, не обращаясь к файлу.
+    """
+
+    def __init__(self, file_path, fuel_id=None, encoding=None):
+        self.path = file_path
+        self.encoding = encoding or namelist.detect_encoding(file_path)
+        records = fdsio.scan_fds(file_path, self.encoding)
+        self.summary = fdsio.summarize(records)
+        self.summary["encoding"] = self.encoding
+        self.newline = fdsio.detect_newline(file_path)
+        self.size = os.path.getsize(file_path)
+        self.head = next((r for r in records if r.name == 'HEAD'), None)
+        chid = None
+        if self.head is not None:
+            chid = namelist.parse_params(self.head.text).get('CHID')
+        self.chid = safe_chid(chid[0] if chid else os.path.splitext(os.path.basename(file_path))[0])
+
+        reactions = self.summary["reactions"]
+        # В файле с несколькими REAC варианты меняют одну реакцию на месте
+        self.reaction = fdsio.select_reaction(reactions, fuel_id) if len(reactions) > 1 else None
+        self.fuel_id = fuel_id or self.summary["fuel_id"]
+        # Топливо с брутто-формулой сохраняет ее во всех вариантах
+        self.formula = self.summary.get("formula")
+
+    def _head_patch(self, chid):
+        if self.head is None:
+            text = f"&HEAD CHID='{chid}'/\n"
+            return 0, 0, text.encode(self.encoding, namelist.ERRORS).replace(b'\n', self.newline)
+        return self.head.start, self.head.end, set_chid(self.head.text, chid).encode(self.encoding, namelist.ERRORS)
+
+    def blocks(self, params_list, fuel_ids=None):
+        """Новые блоки SPEC/REAC для вариантов.
+
+        Для файлов с несколькими REAC и топлива с брутто-формулой
+        возвращает None: блок варианта строит patches(), а ошибка баланса
+        атомов относится к одному варианту.
+        """
+        if self.reaction is not None or self.formula:
+            return [None] * len(params_list)
+        fuel_ids = fuel_ids or [self.fuel_id] * len(params_list)
+        return fdsio.format_reac_blocks(fuel_ids, params_list)
+
+    def patches(self, chid, params, block=None, fuel_id=None):
+        """Участки замены варианта: CHID в HEAD и блок SPEC/REAC"""
+        patches = [self._head_patch(chid)]
+        if self.reaction is not None:
+            summary = dict(self.summary, reactions=[self.reaction])
+            patches.extend(fdsio.reactions_patches(summary, [params], self.newline, self.encoding))
+        else:
+            if block is None:
+                block = fdsio.format_reac_block(fuel_id or self.fuel_id, params, formula=self.formula)
+            patches.append(fdsio.reac_block_patch(self.summary, block, self.newline, self.encoding))
+        return patches
+
+
+def read_table(file_path, limit=None):
+    """Варианты из таблицы: кортежи (метка, параметры, CHID или None, ID топлива или None).
+
+    CSV содержит столбцы stoich.INPUT_NAMES (hcl_yield необязателен) и
+    необязательные name, chid, fuel_id. Из результатов sweep (.npz)
+    берутся допустимые варианты; меткой служит номер строки.
+    """
+    if file_path.lower().endswith(".npz"):
+        with np.load(file_path) as data:
+            rows = np.flatnonzero(data["valid"])[:limit]
+            inputs = data["inputs"]
+            for start in range(0, len(rows), BLOCK_CHUNK):
+                chunk = rows[start:start + BLOCK_CHUNK]
+                for index, values in zip(chunk, inputs[chunk]):
+                    yield str(index), dict(zip(stoich.INPUT_NAMES, values.tolist())), None, None
+        return
+    with open(file_path, newline="", encoding="utf-8-sig") as file:
+        for number, row in enumerate(csv.DictReader(file), 1):
+            if limit is not None and number > limit:
+                break
+            yield (row.get("name") or str(number)), row, row.get("chid") or None, row.get("fuel_id") or None
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def fan_out(base_path, variants, output_dir, fuel_id=None, workers=None, max_pending=None, encoding=None):
+    """Записывает по файлу FDS на каждый вариант в output_dir.
+
+    variants - последовательность кортежей как у read_table. CHID варианта
+    берется из таблицы или строится из CHID исходного файла и метки;
+    повторы получают числовой суффикс. Одновременно в очереди пула не
+    более max_pending вариантов. Возвращает итоговую статистику; ошибки
+    отдельных вариантов не прерывают генерацию.
+    """
+    base = BaseFile(base_path, fuel_id, encoding)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    max_pending = max_pending or workers * 2
+    os.makedirs(output_dir, exist_ok=True)
+    slots = threading.BoundedSemaphore(max_pending)
+    failures = []
+    written = []
+    used = set()
+    start = time.perf_counter()
+
+    def done(future, target):
+        error = future.exception()
+        if error is not None:
+            failures.append((target, str(error)))
+        else:
+            written.append(target)
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(variants, BLOCK_CHUNK):
+            valid = []
+            for label, params, chid, row_fuel_id in chunk:
+                try:
+                    valid.append((label, stoich.validate_params(params), chid, row_fuel_id))
+                except ValueError as e:
+                    failures.append((label, str(e)))
+            fuel_ids = [row_fuel_id or base.fuel_id for _, _, _, row_fuel_id in valid]
+            blocks = base.blocks([params for _, params, _, _ in valid], fuel_ids)
+            for (label, params, chid, row_fuel_id), block in zip(valid, blocks):
+                chid = safe_chid(chid or f"{base.chid}_{label}")
+                unique, suffix = chid, 1
+                while unique.lower() in used:
+                    suffix += 1
+                    unique = f"{chid}_{suffix}"
+                used.add(unique.lower())
+                target = os.path.join(output_dir, unique + ".fds")
+                try:
+                    patches = base.patches(unique, params, block, row_fuel_id)
+                except (ValueError, fdsio.FDSParseError) as e:
+                    failures.append((label, str(e)))
+                    continue
+                # Не ставить в очередь больше max_pending вариантов
+                slots.acquire()
+                future = pool.submit(splice.splice_file, base.path, patches, target)
+                future.add_done_callback(lambda f, target=target: done(f, target))
+
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(os.path.getsize(path) for path in written)
+    return {
+        "files": len(written),
+        "failed": failures,
+        "bytes": total_bytes,
+        "elapsed": elapsed,
+        "files_per_second": len(written) / elapsed if elapsed > 0 else float("inf"),
+        "mb_per_second": total_bytes / elapsed / 1e6 if elapsed > 0 else float("inf"),
+        "workers": workers,
+    }
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду fanout"""
+    parser = subparsers.add_parser("fanout", help="Сгенерировать сценарии FDS по таблице вариантов топлива")
+    parser.add_argument("base", help="Исходный файл FDS")
+    parser.add_argument("table", help="Таблица вариантов: CSV (столбцы параметров формы, name, chid, fuel_id) "
+                                      "или результат sweep (.npz)")
+    parser.add_argument("-o", "--output-dir", required=True, help="Каталог для сгенерированных файлов")
+    parser.add_argument("--fuel-id", help="ID топлива (по умолчанию из исходного файла); в файлах с "
+                                          "несколькими REAC - топливо изменяемой реакции")
+    parser.add_argument("--limit", type=int, default=None, help="Наибольшее число вариантов")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Число потоков записи")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Наибольшее число вариантов в очереди записи (по умолчанию 2 на поток)")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    try:
+        stats = fan_out(args.base, read_table(args.table, args.limit), args.output_dir,
+                        args.fuel_id, args.workers, args.max_pending)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    for label, message in stats["failed"]:
+        print(f"Ошибка: {label}: {message}")
+    print(f"Создано файлов: {stats['files']}, ошибок: {len(stats['failed'])}, время: {stats['elapsed']:.2f} с, "
+          f"{stats['files_per_second']:.1f} файл/с, {stats['mb_per_second']:.0f} МБ/с ({stats['workers']} потоков)")
+    return 1 if stats["failed"] else 0
@@ -0,0 +1,462 @@
+"""Чтение и запись блока SPEC/REAC в файлах FDS без зависимостей от GUI.
+
+Файл разбирается один раз (см. namelist), найденные группы и их смещения
+используются и для импорта параметров, и для замены блока при сохранении.
+Текст групп SPEC/REAC строится из объектов модели (см. model).
+"""
+
+import os
+
+from . import mesh, namelist, splice, stoich, trace
+from .model import DEFAULT_PRODUCTS_ID, SHARED_SPEC_LINES, Reaction
+
+# Частота вызова обратного вызова progress при разборе (в группах)
+PROGRESS_INTERVAL = 4096
+# Группы, текст которых нужен для сводки (остальные только подсчитываются)
+SUMMARY_NAMES = frozenset(('HEAD', 'MESH', 'MULT', 'SPEC', 'REAC'))
+
+# ID служебных SPEC, входящих в генерируемый блок (кроме SPEC топлива)
+BLOCK_SPEC_IDS = (
+    'OXYGEN',
+    'NITROGEN',
+    'CARBON DIOXIDE',
+    'CARBON MONOXIDE',
+    'HYDROGEN CHLORIDE',
+    'WATER VAPOR',
+    'SOOT',
+    'AIR',
+    'PRODUCTS',
+)
+# ID общих SPEC блока (в порядке SHARED_SPEC_LINES)
+SHARED_SPEC_IDS = BLOCK_SPEC_IDS[:-1]
+
+
+class FDSParseError(ValueError):
+    """В файле FDS нет данных, необходимых для импорта REAC"""
+
+
+def file_stat(file_path):
+    """Размер и время изменения файла для проверки актуальности разбора"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def scan_fds(file_path, encoding=None, progress=None):
+    """Разбирает файл FDS за один проход и возвращает список групп.
+
+    progress(done, total) периодически получает число разобранных байт и
+    размер файла; исключение из него прерывает разбор.
+    """
+    if progress is None:
+        return list(namelist.scan_file(file_path, encoding))
+    total = os.path.getsize(file_path)
+    records = []
+    for record in namelist.scan_file(file_path, encoding):
+        records.append(record)
+        if len(records) % PROGRESS_INTERVAL == 0:
+            progress(record.end, total)
+    progress(total, total)
+    return records
+
+
+def format_reac_block(fuel_id, params, products_id=DEFAULT_PRODUCTS_ID, formula=None):
+    """Формирует строки SPEC/REAC для проверенных параметров топлива.
+
+    С брутто-формулой топлива баланс атомов замыкается (см.
+    model.Reaction.set_params).
+    """
+    with trace.span("calculate.math"):
+        reaction = Reaction.new(fuel_id, products_id, formula=formula).set_params(params)
+    trace.count("calculate.reactions")
+    with trace.span("calculate.format"):
+        return reaction.block_text()
+
+
+def compute_reactions(params_list):
+    """Рассчитывает несколько реакций одним векторным вызовом.
+
+    Возвращает для каждого набора параметров кортеж (ID компонентов
+    PRODUCTS, их объемные доли, NU воздуха).
+    """
+    if not params_list:
+        return []
+    with trace.span("calculate.math", reactions=len(params_list)):
+        arrays = {name: [params[name] for params in params_list] for name in stoich.INPUT_NAMES}
+        result = stoich.compute_reaction(arrays)
+        computed = []
+        for i, params in enumerate(params_list):
+            row = {key: float(values[i]) for key, values in result.items()}
+            spec_ids, fractions = stoich.products_composition(params, row)
+            computed.append((spec_ids, fractions, row["mass_reactants"]))
+    trace.count("calculate.reactions", len(params_list))
+    return computed
+
+
+def format_reac_blocks(fuel_ids, params_list, computed=None):
+    """Блоки SPEC/REAC для нескольких видов топлива, рассчитанных одним векторным вызовом.
+
+    computed - готовый результат compute_reactions(params_list).
+    """
+    if computed is None:
+        computed = compute_reactions(params_list)
+    return [Reaction.new(fuel_id).set_params(params, result).block_text()
+            for fuel_id, params, result in zip(fuel_ids, params_list, computed)]
+
+
+def format_reactions(reactions, params_list):
+    """Формирует общий блок SPEC/REAC для нескольких реакций файла"""
+    lines = list(SHARED_SPEC_LINES)
+    computed_list = compute_reactions(params_list)
+    with trace.span("calculate.format", reactions=len(params_list)):
+        for reaction, params, computed in zip(reactions, params_list, computed_list):
+            lines.extend(Reaction.from_summary(reaction).set_params(params, computed).lines())
+        return "\n".join(lines) + "\n"
+
+
+def index_records(records):
+    """Индекс групп за один проход: SPEC по ID (верхний регистр) и список REAC.
+
+    Возвращает (specs, reacs), где specs[ID] = (record, params) первой
+    группы SPEC с этим ID, а reacs - список (record, params) в порядке файла.
+    """
+    specs = {}
+    reacs = []
+    for record in records:
+        if record.name == 'SPEC':
+            params = namelist.parse_params(record.text)
+            if params.get('ID'):
+                specs.setdefault(params['ID'][0].upper(), (record, params))
+        elif record.name == 'REAC':
+            reacs.append((record, namelist.parse_params(record.text)))
+    return specs, reacs
+
+
+def _spec_id(record):
+    ids = namelist.parse_params(record.text).get('ID')
+    return ids[0] if ids else None
+
+
+def parse_reaction(reac, specs):
+    """Извлекает параметры формы одной реакции.
+
+    reac - пара (record, params) группы REAC или None (файл без REAC,
+    тогда используются ID по умолчанию), specs - индекс SPEC из
+    index_records. Возвращает словарь с ключами fuel_id, products_id,
+    params, warnings, смещениями групп reac, fuel_spec, products_spec и
+    ключом error, если без молярной массы параметры не извлекаются. Ключ
+    reac_id - собственный ID группы REAC или None, products - записанный
+    состав смеси (ID -> доля), nu_air - записанный NU воздуха или None
+    (нужны для проверки обратного расчета, см. verify), formula -
+    брутто-формула топлива или None, balanced - записана ли реакция с
+    замкнутым балансом атомов. Словарь пригоден для
+    JSON; объекты модели восстанавливаются по нему (model.Reaction.from_summary).
+    """
+    warnings = []
+    reaction = Reaction.from_index(reac, specs, warnings)
+    params = reaction.fuel_params(warnings)
+    summary = {
+        "fuel_id": reaction.fuel_id,
+        "products_id": reaction.products_id,
+        "reac_id": reaction.reac.reac_id,
+        "params": params if params is not None else {},
+        "warnings": warnings,
+        "reac": reaction.reac.span,
+        "fuel_spec": reaction.fuel_spec.span,
+        "products_spec": reaction.products_spec.span,
+        "products": reaction.products_spec.composition(),
+        "nu_air": reaction.reac.nu_air,
+        "formula": reaction.fuel_spec.formula,
+        "balanced": reaction.balanced,
+    }
+    if params is None:
+        # Не можем продолжить без молярной массы
+        summary["error"] = f"Не удалось найти молярную массу для ID топлива '{reaction.fuel_id}' в файле FDS."
+    return summary
+
+
+def parse_reactions(records, index=None):
+    """Параметры всех реакций файла в порядке групп REAC"""
+    specs, reacs = index or index_records(records)
+    return [parse_reaction(reac, specs) for reac in reacs]
+
+
+def select_reaction(reactions, fuel_id=None):
+    """Реакция с заданным ID топлива (без учета регистра), по умолчанию первая"""
+    if not fuel_id:
+        return reactions[0]
+    for reaction in reactions:
+        if reaction["fuel_id"].upper() == fuel_id.upper():
+            return reaction
+    raise FDSParseError(f"В файле нет реакции с топливом '{fuel_id}'.")
+
+
+def parse_reac_params(records):
+    """Извлекает ID топлива и параметры формы первой реакции файла.
+
+    Возвращает словарь с ключами fuel_id, params (значения float) и
+    warnings (список предупреждений). Без молярной массы топлива
+    выбрасывает FDSParseError.
+    """
+    specs, reacs = index_records(records)
+    reaction = parse_reaction(reacs[0] if reacs else None, specs)
+    if "error" in reaction:
+        raise FDSParseError(reaction["error"])
+    return {key: reaction[key] for key in ("fuel_id", "params", "warnings")}
+
+
+def _block_records(records, spec_ids):
+    """Группы SPEC/REAC, относящиеся к блоку реакций"""
+    spec_ids = set(BLOCK_SPEC_IDS) | {spec_id.upper() for spec_id in spec_ids}
+    return [r for r in records
+            if r.name == 'REAC' or (r.name == 'SPEC' and (_spec_id(r) or '').upper() in spec_ids)]
+
+
+def reac_block_span(records, fuel_id):
+    """Байтовый диапазон блока SPEC/REAC, заменяемого при сохранении.
+
+    Сначала ищется непрерывный блок от SPEC OXYGEN до следующей REAC, иначе
+    диапазон от первой до последней группы блока. Возвращает None, если
+    таких групп в файле нет.
+    """
+    oxygen = None
+    for record in records:
+        if oxygen is None:
+            if record.name == 'SPEC' and (_spec_id(record) or '').upper() == 'OXYGEN':
+                oxygen = record
+        elif record.name == 'REAC':
+            return oxygen.start, record.line_end
+
+    block = _block_records(records, [fuel_id])
+    if not block:
+        return None
+    return block[0].start, max(r.line_end for r in block)
+
+
+def insertion_offset(records):
+    """Смещение для вставки нового блока: после &HEAD, &MESH или в начало"""
+    for name in ('HEAD', 'MESH'):
+        record = next((r for r in records if r.name == name), None)
+        if record is not None:
+            return record.line_end
+    return 0
+
+
+def read_span(file_path, start, end, encoding=None):
+    """Читает участок файла по байтовым смещениям как текст для показа"""
+    encoding = encoding or namelist.detect_encoding(file_path)
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return data.decode(encoding, errors='replace')
+
+
+def summarize(records, counts=None):
+    """Сводка разбора файла, пригодная для сохранения в JSON.
+
+    Содержит параметры первой реакции (fuel_id, params, warnings или ключ
+    error, если параметры не извлекаются, и formula), список всех реакций файла
+    reactions (см. parse_reaction), ID имеющихся SPEC spec_ids, а также
+    смещения блока: span - заменяемый при сохранении диапазон или None,
+    insert_at - место вставки нового блока, block_span - диапазон
+    исходного блока для показа или None, profile - профиль файла (группы,
+    сетки, разбиение по MPI, см. mesh.profile_records).
+    summarize_fds добавляет encoding - кодировку файла. counts - число
+    групп каждого имени, если records содержит не все группы файла (см.
+    namelist.scan_index).
+    """
+    with trace.span("parse.index", records=len(records)):
+        specs, reacs = index_records(records)
+    trace.count("parse.lookups", len(specs) + len(reacs))
+    with trace.span("parse.invert", reactions=len(reacs)):
+        reactions = [parse_reaction(reac, specs) for reac in reacs]
+        first = reactions[0] if reactions else parse_reaction(None, specs)
+    if "error" in first:
+        summary = {"fuel_id": first["fuel_id"], "params": {}, "warnings": [], "error": first["error"]}
+    else:
+        summary = {key: first[key] for key in ("fuel_id", "params", "warnings")}
+    summary["formula"] = first["formula"]
+    summary["reactions"] = reactions
+    summary["spec_ids"] = sorted(specs)
+    spec_ids = [first["fuel_id"]]
+    for reaction in reactions:
+        spec_ids.extend((reaction["fuel_id"], reaction["products_id"]))
+    with trace.span("parse.layout"):
+        span = reac_block_span(records, summary["fuel_id"])
+        block = _block_records(records, spec_ids)
+        summary["span"] = list(span) if span else None
+        summary["insert_at"] = insertion_offset(records)
+        summary["profile"] = mesh.profile_records(records, counts)
+        summary["block_span"] = [block[0].start, max(r.end for r in block)] if block else None
+    return summary
+
+
+def summarize_fds(file_path, encoding=None, progress=None):
+    """Разбирает файл FDS и возвращает его сводку.
+
+    Текст извлекается только из групп SUMMARY_NAMES; большие файлы
+    разбираются по участкам пулом процессов (см. namelist.scan_index).
+    progress - см. scan_fds.
+    """
+    with trace.span("parse", path=file_path):
+        with trace.span("parse.read") as read:
+            encoding = encoding or namelist.detect_encoding(file_path)
+            records, counts = namelist.scan_index(file_path, encoding, SUMMARY_NAMES, progress=progress)
+            read.set(encoding=encoding, records=len(records))
+        if trace.enabled():
+            trace.count("parse.bytes", os.path.getsize(file_path))
+            trace.count("parse.groups", sum(counts.values()))
+            trace.count("parse.decoded", len(records))
+        summary = summarize(records, counts)
+    summary["encoding"] = encoding
+    return summary
+
+
+def load_fds(file_path, encoding=None, cache=None, progress=None):
+    """Разбирает файл FDS для импорта в форму.
+
+    К сводке (см. summarize) добавляются block - текст исходного блока
+    SPEC/REAC для показа и stat - состояние файла на момент разбора. Если
+    передан cache (ReacCache), неизмененные файлы не разбираются повторно.
+    progress - см. scan_fds. Без молярной массы топлива выбрасывает
+    FDSParseError.
+    """
+    with trace.span("import", path=file_path):
+        stat = file_stat(file_path)
+        if cache is not None:
+            summary = cache.load(file_path, encoding, progress)
+        else:
+            summary = summarize_fds(file_path, encoding, progress)
+        if summary.get("error"):
+            raise FDSParseError(summary["error"])
+
+        with trace.span("import.block"):
+            if summary["block_span"]:
+                summary["block"] = read_span(file_path, *summary["block_span"],
+                                             encoding or summary.get("encoding")).strip()
+            else:
+                summary["block"] = "# Не удалось извлечь оригинальный блок SPEC/REAC."
+        summary["stat"] = stat
+        return summary
+
+
+def detect_newline(file_path, limit=65536):
+    """Перевод строки, используемый в файле (по его началу)"""
+    with open(file_path, 'rb') as file:
+        head = file.read(limit)
+    return b'\r\n' if b'\r\n' in head else b'\n'
+
+
+def _encoding(summary, encoding):
+    """Кодировка записи: заданная, определенная при разборе или по умолчанию"""
+    return encoding or summary.get("encoding") or namelist.default_encoding()
+
+
+def reac_block_patch(summary, new_reac_lines, newline=b'\n', encoding=None):
+    """Участок замены (start, end, bytes) для нового блока SPEC/REAC.
+
+    Текст кодируется в кодировке файла (см. _encoding); символы, полученные
+    при разборе из недекодируемых байтов, записываются исходными байтами.
+    """
+    replacement = new_reac_lines.encode(_encoding(summary, encoding), namelist.ERRORS).replace(b'\n', newline)
+    if summary["span"] is None:
+        offset = summary["insert_at"]
+        return offset, offset, newline + replacement + newline
+    start, end = summary["span"]
+    return start, end, replacement
+
+
+def _splice(file_path, patches, save_path, progress):
+    """Записывает замены; файл, который они не меняют, на месте не перезаписывается"""
+    with trace.span("save.splice", patches=len(patches)):
+        if (save_path or file_path) == file_path and splice.unchanged(file_path, patches):
+            return
+        splice.splice_file(file_path, patches, save_path or file_path, progress)
+
+
+def write_reac_block(file_path, new_reac_lines, save_path=None, summary=None, encoding=None, progress=None):
+    """Заменяет блок SPEC/REAC файла новыми строками и сохраняет результат.
+
+    summary - сводка предыдущего разбора этого файла; если не задана,
+    файл разбирается заново. Переводы строк нового блока приводятся к
+    используемым в файле. Остальная часть файла копируется потоком, а
+    результат атомарно заменяет save_path (см. splice); progress - см.
+    splice.splice_file. Если блок не изменился, файл на месте не
+    перезаписывается. Файл с несколькими REAC сохраняется через
+    write_reactions: заменяемый диапазон доходит только до первой REAC.
+    """
+    with trace.span("save", path=file_path):
+        with trace.span("save.read", parsed=summary is None):
+            if summary is None:
+                summary = summarize_fds(file_path, encoding)
+            newline = detect_newline(file_path)
+        if len(summary["reactions"]) > 1:
+            raise FDSParseError("В файле FDS несколько групп REAC; используйте write_reactions.")
+        with trace.span("save.match"):
+            patch = reac_block_patch(summary, new_reac_lines, newline, encoding)
+        _splice(file_path, [patch], save_path, progress)
+
+
+def reactions_patches(summary, params_list, newline=b'\n', encoding=None):
+    """Участки замены для пересчета каждой реакции файла на месте.
+
+    params_list - проверенные параметры для каждой реакции из
+    summary["reactions"] в том же порядке. Группы SPEC топлива и смеси
+    продуктов и сама REAC заменяются по своим смещениям, недостающие
+    вставляются перед REAC, а недостающие общие SPEC - перед первой
+    реакцией. Выбрасывает FDSParseError, если общая для нескольких
+    реакций группа SPEC должна получить разное содержимое.
+    """
+    reactions = summary["reactions"]
+    if len(params_list) != len(reactions):
+        raise ValueError("Число наборов параметров не совпадает с числом реакций в файле.")
+    encoding = _encoding(summary, encoding)
+    replaced = {}
+    inserts = {}
+
+    def replace(span, text, spec_id):
+        key = tuple(span)
+        if replaced.setdefault(key, text) != text:
+            raise FDSParseError(f"Группа SPEC '{spec_id}' используется несколькими реакциями с разными параметрами.")
+
+    first_start = min(reaction["reac"][0] for reaction in reactions)
+    existing = set(summary["spec_ids"])
+    missing = [line for spec_id, line in zip(SHARED_SPEC_IDS, SHARED_SPEC_LINES) if spec_id not in existing]
+    if missing:
+        inserts[first_start] = missing
+
+    inserted = set()
+    for summary_reaction, params, computed in zip(reactions, params_list, compute_reactions(params_list)):
+        # Группы модели получают новые значения и записываются по своим смещениям
+        reaction = Reaction.from_summary(summary_reaction).set_params(params, computed)
+        for spec in (reaction.fuel_spec, reaction.products_spec):
+            if spec.span is not None:
+                replace(spec.span, spec.to_text(), spec.id)
+            elif spec.id.upper() not in inserted:
+                inserted.add(spec.id.upper())
+                inserts.setdefault(reaction.reac.span[0], []).append(spec.to_text())
+        replace(reaction.reac.span, reaction.reac.to_text(), reaction.fuel_id)
+
+    patches = [(start, end, text.encode(encoding, namelist.ERRORS))
+               for (start, end), text in replaced.items()]
+    for offset, lines in inserts.items():
+        text = "".join(line + "\n" for line in lines)
+        patches.append((offset, offset, text.encode(encoding, namelist.ERRORS).replace(b'\n', newline)))
+    return patches
+
+
+def write_reactions(file_path, params_list, save_path=None, summary=None, encoding=None, progress=None):
+    """Пересчитывает все реакции файла на месте и сохраняет результат.
+
+    В отличие от write_reac_block сохраняет порядок групп файла и
+    подходит для файлов с несколькими REAC и видами топлива.
+    """
+    with trace.span("save", path=file_path):
+        with trace.span("save.read", parsed=summary is None):
+            if summary is None:
+                summary = summarize_fds(file_path, encoding)
+            newline = detect_newline(file_path)
+        if not summary["reactions"]:
+            raise FDSParseError("В файле FDS нет групп REAC.")
+        with trace.span("save.match", reactions=len(params_list)):
+            patches = reactions_patches(summary, params_list, newline, encoding)
+        _splice(file_path, patches, save_path, progress)
@@ -0,0 +1,125 @@
+"""Восстановление параметров топлива по записанным PRODUCTS, NU и MW множества файлов.
+
+В отличие от импорта (model.Reaction.fuel_params), который пересчитывает
+полную строку PRODUCTS покомпонентно, подбор методом наименьших
+квадратов (stoich.fit_inverse) использует любой имеющийся набор долей,
+NU воздуха и молярной массы: потребление кислорода без NITROGEN и NU
+восстанавливается по доле WATER VAPOR, молярная масса без MW - по всем
+долям, а несогласованные значения дают наилучшее приближение с
+погрешностью residual. Реакции всех файлов подбираются одним векторным
+вызовом.
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from . import batch, cache, scan, stoich
+
+COLUMNS = ("path", "fuel_id") + stoich.INPUT_NAMES + ("residual", "error")
+
+
+def collect(files, reac_cache=None):
+    """Собирает записанные значения всех реакций файлов.
+
+    Возвращает кортеж (rows, fractions, molar_mass, nu_air, errors): rows -
+    тройки (путь, ID топлива, теплота сгорания или None), fractions формы
+    (N, 6) с NaN для отсутствующих компонентов, molar_mass и nu_air с NaN
+    для отсутствующих значений, errors - пары (путь, сообщение) для файлов
+    без реакций. Значения реакций с замкнутым балансом атомов приводятся к
+    прежней записи: NITROGEN - без азота топлива, NU - по массе
+    реагентов, а WATER VAPOR (подобранная по балансу атомов) не
+    используется.
+    """
+    rows, fractions, molar_mass, nu_air, errors = [], [], [], [], []
+    for path, summary in scan.scan_files(files, reac_cache):
+        reactions = summary.get("reactions") or []
+        if not reactions:
+            errors.append((path, summary.get("error") or "Не найдена группа REAC"))
+            continue
+        for reaction in reactions:
+            products = reaction.get("products") or {}
+            row = [products.get(spec_id, np.nan) for spec_id in stoich.PRODUCT_IDS]
+            if products and 'HYDROGEN CHLORIDE' not in products:
+                # Отсутствие HCl в PRODUCTS означает нулевой выход
+                row[stoich.PRODUCT_IDS.index('HYDROGEN CHLORIDE')] = 0.0
+            nu = np.nan if reaction.get("nu_air") is None else reaction["nu_air"]
+            if reaction.get("balanced"):
+                atoms = stoich.parse_formula(reaction["formula"])
+                row[stoich.PRODUCT_IDS.index('NITROGEN')] -= atoms[stoich.ELEMENTS.index("N")] / 2
+                row[stoich.PRODUCT_IDS.index('WATER VAPOR')] = np.nan
+                V_O2 = -nu / (1 + stoich.N2_O2_RATIO)
+                nu = -(1 + V_O2 * (1 + stoich.N2_O2_RATIO * (stoich.W_N2 / stoich.W_O2)))
+            params = reaction.get("params") or {}
+            rows.append((path, reaction["fuel_id"], params.get("heat_release")))
+            fractions.append(row)
+            molar_mass.append(params.get("molar_mass", np.nan))
+            nu_air.append(nu)
+    return (rows, np.array(fractions, dtype=float).reshape(-1, len(stoich.PRODUCT_IDS)),
+            np.array(molar_mass, dtype=float), np.array(nu_air, dtype=float), errors)
+
+
+def fit_files(files, reac_cache=None):
+    """Подбирает параметры топлива всех реакций файлов.
+
+    Возвращает список словарей по COLUMNS: параметры формы (None, если
+    наблюдений для них недостаточно), residual - среднеквадратичная
+    относительная погрешность записанных значений и error.
+    """
+    rows, fractions, molar_mass, nu_air, errors = collect(files, reac_cache)
+    fitted = stoich.fit_inverse(fractions, molar_mass, nu_air)
+    results = []
+    for i, (path, fuel_id, heat_release) in enumerate(rows):
+        result = {"path": path, "fuel_id": fuel_id, "heat_release": heat_release}
+        for name in stoich.FIT_YIELDS + ("molar_mass", "residual"):
+            value = float(fitted[name][i])
+            result[name] = None if np.isnan(value) else value
+        missing = [name for name in stoich.INPUT_NAMES if result[name] is None]
+        result["error"] = f"Недостаточно данных для {', '.join(missing)}" if missing else None
+        results.append(result)
+    for path, message in errors:
+        results.append(dict(dict.fromkeys(COLUMNS), path=path, error=message))
+    return results
+
+
+def format_row(result):
+    """Строка TSV для результата подбора"""
+    return "\t".join("" if result[name] is None else str(result[name]) if name in ("path", "fuel_id", "error")
+                     else repr(result[name]) for name in COLUMNS)
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду fit"""
+    parser = subparsers.add_parser("fit", help="Восстановить параметры топлива по PRODUCTS, NU и MW файлов FDS")
+    parser.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    files = batch.collect_files(args.paths)
+    if not files:
+        print("Ошибка: Не найдено ни одного файла FDS.", file=sys.stderr)
+        return 1
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    start = time.perf_counter()
+    try:
+        results = fit_files(files, reac_cache)
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print("\t".join(COLUMNS))
+        for result in results:
+            print(format_row(result))
+    incomplete = sum(result["error"] is not None for result in results)
+    print(f"Файлов: {len(files)}, реакций: {len(results)}, не восстановлено полностью: {incomplete}, "
+          f"время: {elapsed:.2f} с", file=sys.stderr)
+    return 0
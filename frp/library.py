@@ -0,0 +1,298 @@
+"""Библиотека топлив: именованные наборы параметров формы в базе SQLite.
+
+Для каждого топлива вместе с семью параметрами хранится заранее
+рассчитанный блок SPEC/REAC (объемные доли PRODUCTS и NU воздуха), так что
+при применении топлива из библиотеки пересчет не нужен. Поиск идет по
+индексам имени (без учета регистра) и категории. Библиотека пополняется
+вручную, из CSV или из существующих файлов FDS (подкоманда library).
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+from . import batch, fdsio, stoich
+
+LIBRARY_VERSION = 1
+DEFAULT_SEARCH_LIMIT = 50
+# Столбцы CSV для импорта и экспорта
+CSV_COLUMNS = ("name", "category") + stoich.INPUT_NAMES
+
+
+def default_library_path():
+    """Путь к библиотеке: $FRP_LIBRARY, $XDG_DATA_HOME/frp или ~/.local/share/frp"""
+    path = os.environ.get("FRP_LIBRARY")
+    if path:
+        return path
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "frp", "fuels.sqlite3")
+
+
+def _key(text):
+    # SQLite сравнивает без учета регистра только латиницу, поэтому имена и
+    # категории хранятся еще и в приведенном к одному регистру виде
+    return (text or "").strip().casefold()
+
+
+class FuelLibrary:
+    """Библиотека топлив в базе SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or default_library_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Соединение может использоваться из рабочего потока GUI, но не
+        # из нескольких потоков одновременно
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._db:
+            columns = "".join(f" {name} REAL NOT NULL," for name in stoich.INPUT_NAMES)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS fuels ("
+                " key TEXT PRIMARY KEY, name TEXT NOT NULL, category_key TEXT NOT NULL, category TEXT NOT NULL,"
+                + columns +
+                " products TEXT NOT NULL, mass_reactants REAL NOT NULL, block TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS fuels_category ON fuels (category_key, key)")
+            self._db.execute(f"PRAGMA user_version = {LIBRARY_VERSION}")
+
+    def add_many(self, entries):
+        """Добавляет или заменяет топлива; entries - пары (имя, категория, параметры).
+
+        Параметры проверяются, а блоки SPEC/REAC всех топлив рассчитываются
+        одним векторным вызовом и записываются одной транзакцией. Возвращает
+        число добавленных топлив; при ошибке в параметрах выбрасывает
+        ValueError с именем топлива, ничего не записав.
+        """
+        names, categories, params_list = [], [], []
+        for name, category, params in entries:
+            name = name.strip()
+            if not name:
+                raise ValueError("Не задано имя топлива")
+            try:
+                params_list.append(stoich.validate_params(params))
+            except ValueError as e:
+                raise ValueError(f"{name}: {e}") from None
+            names.append(name)
+            categories.append((category or "").strip())
+        if not names:
+            return 0
+        computed = fdsio.compute_reactions(params_list)
+        blocks = fdsio.format_reac_blocks(names, params_list, computed)
+        rows = []
+        for name, category, params, (spec_ids, fractions, mass_reactants), block in zip(
+                names, categories, params_list, computed, blocks):
+            products = json.dumps(dict(zip(spec_ids, fractions)))
+            rows.append((_key(name), name, _key(category), category, *(params[key] for key in stoich.INPUT_NAMES),
+                         products, mass_reactants, block))
+        placeholders = ", ".join("?" * len(rows[0]))
+        with self._db:
+            self._db.executemany(f"INSERT OR REPLACE INTO fuels VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def add(self, name, params, category=""):
+        """Добавляет или заменяет одно топливо"""
+        self.add_many([(name, category, params)])
+
+    def get(self, name):
+        """Топливо по имени (без учета регистра) или None.
+
+        Возвращает словарь с ключами name, category, params, products
+        (ID -> объемная доля), mass_reactants и block - готовый блок
+        SPEC/REAC с именем топлива в качестве ID.
+        """
+        row = self._db.execute("SELECT * FROM fuels WHERE key = ?", (_key(name),)).fetchone()
+        if row is None:
+            return None
+        return {
+            "name": row["name"],
+            "category": row["category"],
+            "params": {key: row[key] for key in stoich.INPUT_NAMES},
+            "products": json.loads(row["products"]),
+            "mass_reactants": row["mass_reactants"],
+            "block": row["block"],
+        }
+
+    def _select(self, where, args, category, limit):
+        if category:
+            where = where + ["category_key = ?"]
+            args = args + [_key(category)]
+        sql = "SELECT name, category FROM fuels"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY key"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [tuple(row) for row in self._db.execute(sql, args)]
+
+    def search(self, query="", category=None, limit=DEFAULT_SEARCH_LIMIT):
+        """Список пар (имя, категория), упорядоченный по имени.
+
+        Сначала идут имена, начинающиеся с query (поиск по индексу имени),
+        затем, если лимит не исчерпан, - содержащие query в середине.
+        limit=0 снимает ограничение.
+        """
+        query = _key(query)
+        if not query:
+            return self._select([], [], category, limit)
+        # Префикс ищется диапазоном по первичному ключу
+        prefix = ["key >= ?", "key < ?"]
+        found = self._select(prefix, [query, query + "\U0010ffff"], category, limit)
+        if limit and len(found) >= limit:
+            return found
+        found += self._select(["instr(key, ?) > 1"], [query], category, limit and limit - len(found))
+        return found
+
+    def categories(self):
+        """Список категорий библиотеки"""
+        return [row[0] for row in self._db.execute(
+            "SELECT category FROM fuels WHERE category_key != '' GROUP BY category_key ORDER BY category_key")]
+
+    def remove(self, name):
+        """Удаляет топливо; возвращает True, если оно было в библиотеке"""
+        with self._db:
+            return self._db.execute("DELETE FROM fuels WHERE key = ?", (_key(name),)).rowcount > 0
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM fuels").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_default_library():
+    """Открывает библиотеку по умолчанию или возвращает None, если это невозможно"""
+    try:
+        return FuelLibrary()
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def load_fuel(name):
+    """Топливо из библиотеки по умолчанию (см. FuelLibrary.get).
+
+    Выбрасывает ValueError, если библиотека недоступна или топлива в ней нет.
+    """
+    fuel_library = open_default_library()
+    if fuel_library is None:
+        raise ValueError("Не удалось открыть библиотеку топлив.")
+    with fuel_library:
+        fuel = fuel_library.get(name)
+    if fuel is None:
+        raise ValueError(f"Топливо '{name}' не найдено в библиотеке.")
+    return fuel
+
+
+def read_csv(file_path):
+    """Читает топлива из CSV со столбцами CSV_COLUMNS (category и hcl_yield необязательны)"""
+    with open(file_path, newline="", encoding="utf-8-sig") as file:
+        for row in csv.DictReader(file):
+            yield row.get("name") or "", row.get("category") or "", row
+
+
+def entries_from_fds(files, category=""):
+    """Топлива всех реакций файлов FDS; реакции без полного набора параметров пропускаются"""
+    for path in files:
+        try:
+            summary = fdsio.summarize_fds(path)
+        except OSError:
+            continue
+        for reaction in summary["reactions"]:
+            try:
+                params = stoich.validate_params(reaction["params"])
+            except ValueError:
+                continue
+            yield reaction["fuel_id"], category, params
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду library"""
+    parser = subparsers.add_parser("library", help="Работа с библиотекой топлив")
+    parser.add_argument("--library", help="Файл библиотеки (по умолчанию $FRP_LIBRARY или ~/.local/share/frp)")
+    commands = parser.add_subparsers(dest="library_command", required=True)
+
+    search = commands.add_parser("list", help="Найти топлива по имени и категории")
+    search.add_argument("query", nargs="?", default="", help="Часть имени топлива")
+    search.add_argument("--category", help="Категория")
+    search.add_argument("--limit", type=int, default=0, help="Наибольшее число строк (по умолчанию все)")
+
+    show = commands.add_parser("show", help="Показать параметры и блок SPEC/REAC топлива")
+    show.add_argument("name", help="Имя топлива")
+
+    add = commands.add_parser("add", help="Добавить или заменить топливо")
+    add.add_argument("name", help="Имя топлива (используется как ID в FDS)")
+    add.add_argument("--fuel", nargs=7, type=float, required=True, metavar=tuple(stoich.INPUT_NAMES),
+                     help="Параметры топлива в порядке полей формы")
+    add.add_argument("--category", default="", help="Категория")
+
+    import_csv = commands.add_parser("import-csv", help="Загрузить топлива из CSV")
+    import_csv.add_argument("file", help="CSV со столбцами " + ",".join(CSV_COLUMNS))
+
+    import_fds = commands.add_parser("import-fds", help="Загрузить топлива из файлов FDS")
+    import_fds.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    import_fds.add_argument("--category", default="", help="Категория для всех загруженных топлив")
+
+    export_csv = commands.add_parser("export-csv", help="Выгрузить библиотеку в CSV")
+    export_csv.add_argument("file", help="Файл CSV")
+
+    remove = commands.add_parser("remove", help="Удалить топливо")
+    remove.add_argument("name", help="Имя топлива")
+
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    try:
+        library = FuelLibrary(args.library)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Ошибка: Не удалось открыть библиотеку топлив: {e}", file=sys.stderr)
+        return 1
+    with library:
+        command = args.library_command
+        try:
+            if command == "list":
+                for name, category in library.search(args.query, args.category, args.limit):
+                    print(f"{name}\t{category}")
+            elif command == "show":
+                fuel = library.get(args.name)
+                if fuel is None:
+                    print(f"Ошибка: Топливо '{args.name}' не найдено в библиотеке.", file=sys.stderr)
+                    return 1
+                for key in stoich.INPUT_NAMES:
+                    print(f"{key}\t{fuel['params'][key]!r}")
+                print()
+                print(fuel["block"], end="")
+            elif command == "add":
+                library.add(args.name, dict(zip(stoich.INPUT_NAMES, args.fuel)), args.category)
+            elif command == "import-csv":
+                count = library.add_many(read_csv(args.file))
+                print(f"Загружено топлив: {count}")
+            elif command == "import-fds":
+                count = library.add_many(entries_from_fds(batch.collect_files(args.paths), args.category))
+                print(f"Загружено топлив: {count}")
+            elif command == "export-csv":
+                with open(args.file, "w", newline="", encoding="utf-8") as file:
+                    writer = csv.writer(file)
+                    writer.writerow(CSV_COLUMNS)
+                    for name, category in library.search(limit=0):
+                        params = library.get(name)["params"]
+                        writer.writerow([name, category] + [repr(params[key]) for key in stoich.INPUT_NAMES])
+            elif command == "remove":
+                if not library.remove(args.name):
+                    print(f"Ошибка: Топливо '{args.name}' не найдено в библиотеке.", file=sys.stderr)
+                    return 1
+        except (OSError, ValueError) as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return 1
+    return 0
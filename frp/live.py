@@ -0,0 +1,104 @@
+"""Пошаговый пересчет блока SPEC/REAC при редактировании параметров формы.
+
+При изменении параметра пересчитываются только зависящие от него величины
+(см. stoich.QUANTITIES) и только строки блока, в которые они входят:
+новые значения записываются в группы модели (model.Reaction), и заново
+форматируются только затронутые группы. Текст блока совпадает с
+fdsio.format_reac_block для тех же параметров.
+"""
+
+import math
+
+from . import model, stoich, trace
+
+# Номера строк блока (см. model.Reaction.block_text), зависящих от
+# параметров, и параметры или величины, входящие в каждую из них
+FUEL_LINE = len(model.SHARED_SPEC_LINES) - 1
+PRODUCTS_LINE = FUEL_LINE + 2
+REAC_LINE = FUEL_LINE + 3
+LINE_DEPENDENCIES = {
+    FUEL_LINE: {"fuel_id", "molar_mass"},
+    PRODUCTS_LINE: set(stoich.PRODUCT_KEYS) | {"hcl_yield"},
+    REAC_LINE: {"fuel_id", "heat_release", "mass_reactants"},
+}
+
+
+class LiveBlock:
+    """Блок SPEC/REAC одной реакции с пересчетом только измененных строк"""
+
+    def __init__(self, fuel_id=model.DEFAULT_FUEL_ID, products_id=model.DEFAULT_PRODUCTS_ID):
+        self.products_id = products_id
+        self.reset(fuel_id, {})
+
+    def reset(self, fuel_id, params, text=None):
+        """Задает все параметры заново.
+
+        text - уже показанный текст блока для этих параметров; тогда
+        update() вернет только строки, отличающиеся от него.
+        """
+        self.fuel_id = fuel_id
+        self.reaction = model.Reaction.new(fuel_id, self.products_id)
+        self.params = dict(params)
+        self.result = {}
+        self.lines = text.split("\n")[:-1] if text else None
+        self._changed = set(stoich.INPUT_NAMES) | {"fuel_id"}
+
+    def set_param(self, name, value):
+        """Задает проверенное значение параметра (см. stoich.validate_value)"""
+        if self.params.get(name) != value:
+            self.params[name] = value
+            self._changed.add(name)
+
+    def set_fuel_id(self, fuel_id):
+        if fuel_id != self.fuel_id:
+            self.fuel_id = fuel_id
+            self._changed.add("fuel_id")
+
+    def update(self):
+        """Пересчитывает затронутые величины и строки.
+
+        Требует заданных значений всех параметров. Возвращает словарь номер
+        строки -> новый текст только для изменившихся строк.
+        """
+        changed = set(self._changed)
+        with trace.span("calculate.math", live=True):
+            for name, (depends, formula) in stoich.QUANTITIES.items():
+                if name not in self.result or changed.intersection(depends):
+                    value = float(formula(self.params, self.result))
+                    old = self.result.get(name)
+                    # Знак нуля тоже виден в тексте (-0.000...)
+                    if old is None or old != value or math.copysign(1.0, old) != math.copysign(1.0, value):
+                        self.result[name] = value
+                        changed.add(name)
+        self._changed.clear()
+
+        if self.lines is None:
+            self.lines = list(model.SHARED_SPEC_LINES[:-1]) + ["", model.SHARED_SPEC_LINES[-1], "", ""]
+        updates = {}
+        with trace.span("calculate.format", live=True):
+            for index, depends in LINE_DEPENDENCIES.items():
+                if changed.intersection(depends):
+                    text = self._format_line(index)
+                    if text != self.lines[index]:
+                        self.lines[index] = updates[index] = text
+        return updates
+
+    def _format_line(self, index):
+        reaction = self.reaction
+        if index == FUEL_LINE:
+            reaction.fuel_spec.id = self.fuel_id
+            reaction.fuel_spec.mw = self.params["molar_mass"]
+            return reaction.fuel_spec.to_text() + " "
+        if index == PRODUCTS_LINE:
+            spec_ids, fractions = stoich.products_composition(self.params, self.result)
+            reaction.products_spec.spec_ids = spec_ids
+            reaction.products_spec.fractions = fractions
+            return reaction.products_spec.to_text()
+        reaction.reac.fuel = self.fuel_id
+        reaction.reac.heat_of_combustion = self.params["heat_release"]
+        reaction.reac.nu_air = self.result["mass_reactants"]
+        return reaction.reac.to_text()
+
+    def text(self):
+        """Текст блока после последнего update()"""
+        return "\n".join(self.lines) + "\n"
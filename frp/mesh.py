@@ -0,0 +1,167 @@
+"""Профиль входного файла FDS: группы namelist, расчетные сетки и разбиение по MPI.
+
+Профиль строится по группам, уже полученным при разборе файла (см.
+fdsio.summarize), без повторного чтения: число групп каждого вида, число
+ячеек всех &MESH (с учетом размножения MULT_ID), число ячеек на каждый
+процесс MPI_PROCESS и дисбаланс нагрузки между процессами - насколько
+самый нагруженный процесс превышает средний.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+from operator import attrgetter
+
+from . import batch, cache, namelist, scan
+
+# Дисбаланс, начиная с которого разбиение считается неудачным
+IMBALANCE_WARNING = 0.2
+
+
+def _int(params, name, default=None):
+    values = params.get(name)
+    return int(float(values[0])) if values else default
+
+
+def mult_count(params):
+    """Число копий группы, заданное группой MULT"""
+    n_upper = _int(params, 'N_UPPER')
+    if n_upper is not None:
+        return n_upper - _int(params, 'N_LOWER', 0) + 1
+    count = 1
+    for axis in "IJK":
+        count *= _int(params, f'{axis}_UPPER', 0) - _int(params, f'{axis}_LOWER', 0) + 1
+    return count
+
+
+def profile_records(records, counts=None):
+    """Профиль файла по его группам (словарь, пригодный для JSON).
+
+    Ключи: namelists - число групп каждого вида в порядке первого
+    появления, meshes - число сеток, cells - общее число ячеек, processes
+    - список [процесс, сеток, ячеек] по возрастанию номера процесса,
+    imbalance - отношение наибольшей нагрузки процесса к средней минус 1
+    (None без сеток), warnings - сообщения о неразобранных MESH. Сетка
+    без MPI_PROCESS, как и в FDS, получает отдельный процесс по своему
+    номеру. counts - готовое число групп каждого имени, если records
+    содержит не все группы файла (нужны MESH и MULT).
+    """
+    names = Counter(counts) if counts is not None else Counter(map(attrgetter("name"), records))
+    warnings = []
+    mults = {}
+    mesh_params = []
+    if names['MESH']:
+        for record in [record for record in records if record.name == 'MESH' or record.name == 'MULT']:
+            if record.name == 'MESH':
+                mesh_params.append((record, namelist.parse_params(record.text)))
+            else:
+                params = namelist.parse_params(record.text)
+                if params.get('ID'):
+                    try:
+                        mults[params['ID'][0].upper()] = mult_count(params)
+                    except ValueError:
+                        warnings.append(f"Не удалось разобрать MULT '{params['ID'][0]}'")
+
+    meshes = 0
+    processes = {}
+    for record, params in mesh_params:
+        try:
+            ijk = [int(float(value)) for value in params.get('IJK') or ()]
+            if len(ijk) != 3:
+                raise ValueError
+            process = _int(params, 'MPI_PROCESS')
+        except ValueError:
+            warnings.append(f"Не удалось разобрать MESH: {record.text.strip()[:80]}")
+            continue
+        mult_id = params.get('MULT_ID')
+        copies = mults.get(mult_id[0].upper(), 1) if mult_id else 1
+        for _ in range(copies):
+            rank = meshes if process is None else process
+            entry = processes.setdefault(rank, [rank, 0, 0])
+            entry[1] += 1
+            entry[2] += ijk[0] * ijk[1] * ijk[2]
+            meshes += 1
+
+    loads = [entry[2] for entry in processes.values()]
+    mean = sum(loads) / len(loads) if loads else 0
+    return {
+        "namelists": dict(names),
+        "meshes": meshes,
+        "cells": sum(loads),
+        "processes": sorted(processes.values()),
+        "imbalance": max(loads) / mean - 1 if mean else None,
+        "warnings": warnings,
+    }
+
+
+def _number(value):
+    """Целое с пробелами между разрядами"""
+    return f"{value:,}".replace(",", " ")
+
+
+def format_profile(profile):
+    """Краткое описание профиля одной строкой"""
+    if not profile["meshes"]:
+        return "Сетки MESH не найдены"
+    text = f"Сеток: {profile['meshes']}, ячеек: {_number(profile['cells'])}, процессов MPI: {len(profile['processes'])}"
+    if profile["imbalance"] is not None:
+        text += f", дисбаланс: {profile['imbalance'] * 100:.0f}%"
+    return text
+
+
+def format_report(path, profile):
+    """Подробный отчет: группы namelist и нагрузка процессов MPI"""
+    lines = [f"{path}: {format_profile(profile)}"]
+    lines.append("  Группы: " + ", ".join(f"{name} {count}" for name, count in profile["namelists"].items()))
+    loads = [cells for _, _, cells in profile["processes"]]
+    peak = max(loads) if loads else 0
+    for rank, meshes, cells in profile["processes"]:
+        bar = "#" * round(30 * cells / peak) if peak else ""
+        lines.append(f"  MPI_PROCESS {rank:>4}: сеток {meshes:>3}, ячеек {_number(cells):>12}  {bar}")
+    if profile["imbalance"] is not None and profile["imbalance"] > IMBALANCE_WARNING:
+        lines.append(f"  Внимание: самый нагруженный процесс превышает среднюю нагрузку на "
+                     f"{profile['imbalance'] * 100:.0f}%")
+    lines.extend(f"  {warning}" for warning in profile["warnings"])
+    return "\n".join(lines)
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду profile"""
+    parser = subparsers.add_parser("profile", help="Показать группы, сетки и разбиение по MPI файлов FDS")
+    parser.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    parser.add_argument("--json", action="store_true", help="Вывести профили в JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    files = batch.collect_files(args.paths)
+    if not files:
+        print("Ошибка: Не найдено ни одного файла FDS.", file=sys.stderr)
+        return 1
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    start = time.perf_counter()
+    unbalanced = 0
+    profiles = {}
+    try:
+        for path, summary in scan.scan_files(files, reac_cache):
+            profile = summary.get("profile")
+            if profile is None:
+                print(f"Ошибка: {path}: {summary.get('error', 'нет профиля')}", file=sys.stderr)
+                continue
+            unbalanced += profile["imbalance"] is not None and profile["imbalance"] > IMBALANCE_WARNING
+            if args.json:
+                profiles[path] = profile
+            else:
+                print(format_report(path, profile))
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    if args.json:
+        print(json.dumps(profiles, indent=2, ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+    print(f"Файлов: {len(files)}, с дисбалансом больше {IMBALANCE_WARNING * 100:.0f}%: {unbalanced}, "
+          f"время: {elapsed:.2f} с", file=sys.stderr)
+    return 0
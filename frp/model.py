@@ -0,0 +1,346 @@
+"""Объектная модель реакции FDS: группы SPEC топлива, SPEC смеси продуктов и REAC.
+
+Группы создаются из разобранных параметров namelist один раз (см.
+fdsio.index_records) или по параметрам формы, изменяются на месте и
+записываются обратно в текст namelist напрямую, без повторного разбора
+сгенерированного текста. span - байтовый диапазон [start, end] группы в
+исходном файле или None для новой группы. Модель общая для GUI, пакетного
+режима и сохранения файлов.
+"""
+
+from . import stoich
+
+DEFAULT_FUEL_ID = "Fuel"
+DEFAULT_PRODUCTS_ID = "PRODUCTS"
+
+# Общие для всех реакций строки SPEC: компоненты смесей и фоновый воздух
+SHARED_SPEC_LINES = (
+    "&SPEC ID='OXYGEN' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='NITROGEN' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='CARBON DIOXIDE' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='CARBON MONOXIDE' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='HYDROGEN CHLORIDE' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='WATER VAPOR' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='SOOT' LUMPED_COMPONENT_ONLY=.True./",
+    "&SPEC ID='AIR' BACKGROUND=.True. SPEC_ID(1:2)='OXYGEN','NITROGEN' VOLUME_FRACTION(1:2)=1,3.7619/",
+)
+
+
+def _first(params, name):
+    values = params.get(name)
+    return values[0] if values else None
+
+
+class Spec:
+    """Группа SPEC: топливо (MW или FORMULA) или смесь компонентов (SPEC_ID, VOLUME_FRACTION)"""
+
+    __slots__ = ("id", "mw", "formula", "spec_ids", "fractions", "span")
+
+    def __init__(self, id, mw=None, spec_ids=(), fractions=(), span=None, formula=None):
+        self.id = id
+        self.mw = mw
+        self.formula = formula
+        self.spec_ids = list(spec_ids)
+        self.fractions = list(fractions)
+        self.span = span
+
+    @classmethod
+    def from_params(cls, spec_id, params, span=None, warnings=None):
+        """SPEC из параметров namelist.parse_params.
+
+        Нечисловая MW считается отсутствующей, без MW молярная масса
+        берется по FORMULA; ошибки в формуле и составе смеси добавляются в
+        warnings, а формула или состав остаются пустыми.
+        """
+        spec = cls(spec_id, span=span)
+        mw = _first(params, 'MW')
+        try:
+            spec.mw = float(mw) if mw is not None else None
+        except ValueError:
+            pass
+        formula = _first(params, 'FORMULA')
+        if formula:
+            try:
+                atoms = stoich.parse_formula(formula)
+                spec.formula = formula.strip()
+                if spec.mw is None:
+                    spec.mw = float(stoich.formula_mass(atoms))
+            except ValueError as e:
+                if warnings is not None:
+                    warnings.append(f"Warning: {e}")
+        ids = params.get('SPEC_ID')
+        fractions = params.get('VOLUME_FRACTION')
+        if ids and fractions:
+            if len(ids) != len(fractions):
+                if warnings is not None:
+                    warnings.append("Warning: Mismatch between count, IDs, and VFs in PRODUCTS line.")
+            else:
+                try:
+                    spec.fractions = [float(v) for v in fractions]
+                    spec.spec_ids = [i.strip() for i in ids]
+                except ValueError as e:
+                    if warnings is not None:
+                        warnings.append(f"Warning: Error calculating yields from PRODUCTS - {e}")
+        return spec
+
+    def composition(self):
+        """Состав смеси: ID компонента (верхний регистр) -> объемная доля"""
+        return {spec_id.upper(): fraction for spec_id, fraction in zip(self.spec_ids, self.fractions)}
+
+    def to_text(self):
+        if self.spec_ids:
+            count = len(self.spec_ids)
+            ids = ",".join([f"'{s}'" for s in self.spec_ids])
+            fractions = ",".join([f"{v:.15f}" for v in self.fractions])
+            return f"&SPEC ID='{self.id}' SPEC_ID(1:{count})={ids} VOLUME_FRACTION(1:{count})={fractions}/"
+        if self.formula:
+            return f"&SPEC ID='{self.id}' FORMULA='{self.formula}'/"
+        return f"&SPEC ID='{self.id}' MW={self.mw}/"
+
+    def __repr__(self):
+        return f"Spec({self.to_text()!r}, span={self.span})"
+
+
+class Reac:
+    """Группа REAC: топливо, смесь продуктов, теплота сгорания и NU воздуха.
+
+    nu_products - NU смеси продуктов для реакции с замкнутым балансом
+    атомов (NU в молях смесей, проверка баланса в FDS включена) или None
+    для прежней записи (NU продуктов 1, проверка баланса отключена).
+    """
+
+    __slots__ = ("fuel", "products_id", "heat_of_combustion", "nu_air", "nu_products", "reac_id", "span")
+
+    def __init__(self, fuel=DEFAULT_FUEL_ID, products_id=DEFAULT_PRODUCTS_ID, heat_of_combustion=None,
+                 nu_air=None, reac_id=None, span=None, nu_products=None):
+        self.fuel = fuel
+        self.products_id = products_id
+        self.heat_of_combustion = heat_of_combustion
+        self.nu_air = nu_air
+        self.nu_products = nu_products
+        self.reac_id = reac_id
+        self.span = span
+
+    @classmethod
+    def from_params(cls, params, span=None, warnings=None):
+        """REAC из параметров namelist.parse_params; ошибки чисел добавляются в warnings"""
+        reac = cls(_first(params, 'FUEL') or DEFAULT_FUEL_ID, _products_id(params),
+                   reac_id=_first(params, 'ID'), span=span)
+        heat = _first(params, 'HEAT_OF_COMBUSTION')
+        if heat is not None:
+            try:
+                reac.heat_of_combustion = float(heat)
+            except ValueError:
+                if warnings is not None:
+                    warnings.append(f"Warning: Could not parse HEAT_OF_COMBUSTION '{heat}'")
+        try:
+            reac.nu_air = _air_nu(params)
+            check = _first(params, 'CHECK_ATOM_BALANCE')
+            if check is None or check.strip('.').upper() not in ('FALSE', 'F'):
+                reac.nu_products = _products_nu(params)
+        except ValueError as e:
+            if warnings is not None:
+                warnings.append(f"Warning: Could not parse/calculate O2 from REAC NU values - {e}")
+        return reac
+
+    def to_text(self):
+        id_part = f"ID='{self.reac_id}' " if self.reac_id else ""
+        if self.nu_products is not None:
+            return (f"&REAC {id_part}FUEL='{self.fuel}' HEAT_OF_COMBUSTION={self.heat_of_combustion} "
+                    f"SPEC_ID_NU(1:3)='{self.fuel}','AIR','{self.products_id}' "
+                    f"NU(1:3)=-1,{self.nu_air:.15f},{self.nu_products:.15f}/")
+        return (f"&REAC {id_part}FUEL='{self.fuel}' HEAT_OF_COMBUSTION={self.heat_of_combustion} "
+                f"SPEC_ID_NU(1:3)='{self.fuel}','AIR','{self.products_id}' NU(1:3)=-1,{self.nu_air:.4f},1 "
+                f"REAC_ATOM_ERROR=1E5 REAC_MASS_ERROR=1E4 CHECK_ATOM_BALANCE=.False./")
+
+    def __repr__(self):
+        return f"Reac(fuel={self.fuel!r}, products_id={self.products_id!r}, span={self.span})"
+
+
+def _products_id(reac_params):
+    """ID смеси продуктов: компонент SPEC_ID_NU с положительным NU"""
+    spec_ids = reac_params.get('SPEC_ID_NU') or []
+    nus = reac_params.get('NU') or []
+    for spec_id, nu in zip(spec_ids, nus):
+        try:
+            if float(nu) > 0:
+                return spec_id
+        except ValueError:
+            continue
+    return DEFAULT_PRODUCTS_ID
+
+
+def _products_nu(reac_params):
+    """NU смеси продуктов: первый положительный NU или None"""
+    for nu in reac_params.get('NU') or []:
+        if float(nu) > 0:
+            return float(nu)
+    return None
+
+
+def _air_nu(reac_params):
+    """NU воздуха: по ID 'AIR' в SPEC_ID_NU или второй после NU топлива -1"""
+    nu = reac_params.get('NU') or []
+    spec_ids = [s.upper() for s in reac_params.get('SPEC_ID_NU') or []]
+    if 'AIR' in spec_ids and spec_ids.index('AIR') < len(nu):
+        return float(nu[spec_ids.index('AIR')])
+    if len(nu) >= 2 and float(nu[0]) == -1:
+        return float(nu[1])
+    return None
+
+
+class Reaction:
+    """Реакция: SPEC топлива, SPEC смеси продуктов и REAC"""
+
+    __slots__ = ("fuel_spec", "products_spec", "reac")
+
+    def __init__(self, fuel_spec, products_spec, reac):
+        self.fuel_spec = fuel_spec
+        self.products_spec = products_spec
+        self.reac = reac
+
+    @classmethod
+    def new(cls, fuel_id=DEFAULT_FUEL_ID, products_id=DEFAULT_PRODUCTS_ID, reac_id=None, formula=None):
+        """Новая реакция без значений (см. set_params).
+
+        formula - брутто-формула топлива; с ней set_params замыкает баланс
+        атомов (см. stoich.close_balance).
+        """
+        return cls(Spec(fuel_id, formula=formula), Spec(products_id), Reac(fuel_id, products_id, reac_id=reac_id))
+
+    @classmethod
+    def from_index(cls, reac, specs, warnings=None):
+        """Реакция по группе REAC и индексу SPEC (см. fdsio.index_records).
+
+        reac - пара (record, params) или None (ID по умолчанию). Группы
+        SPEC, которых нет в файле, создаются пустыми, без span.
+        """
+        record, reac_params = reac if reac is not None else (None, {})
+        reaction = cls.new()
+        reaction.reac = Reac.from_params(reac_params, _record_span(record), warnings)
+        for attr, spec_id in (("fuel_spec", reaction.reac.fuel), ("products_spec", reaction.reac.products_id)):
+            spec_record, spec_params = specs.get(spec_id.upper(), (None, {}))
+            setattr(reaction, attr, Spec.from_params(spec_id, spec_params, _record_span(spec_record), warnings))
+        # Без формулы топлива NU записаны в прежнем виде
+        if not reaction.fuel_spec.formula:
+            reaction.reac.nu_products = None
+        return reaction
+
+    @classmethod
+    def from_summary(cls, summary):
+        """Реакция с ID и смещениями групп из сводки разбора (см. fdsio.parse_reaction)"""
+        reaction = cls.new(summary["fuel_id"], summary["products_id"], summary.get("reac_id"), summary.get("formula"))
+        reaction.fuel_spec.span = summary["fuel_spec"]
+        reaction.products_spec.span = summary["products_spec"]
+        reaction.reac.span = summary["reac"]
+        return reaction
+
+    @property
+    def fuel_id(self):
+        return self.reac.fuel
+
+    @property
+    def products_id(self):
+        return self.reac.products_id
+
+    @property
+    def balanced(self):
+        """Записана ли реакция с замкнутым балансом атомов"""
+        return self.reac.nu_products is not None
+
+    def set_params(self, params, computed=None):
+        """Задает проверенные параметры топлива и рассчитывает состав смеси и NU.
+
+        computed - готовый результат расчета (ID компонентов смеси, доли,
+        NU воздуха), см. fdsio.compute_reactions. При заданной формуле
+        топлива computed не используется: баланс атомов замыкается
+        (stoich.close_balance), молярная масса берется по формуле, а при
+        отрицательных долях замкнутого баланса или невязках углерода и хлора
+        (они задаются выходами и не замыкаются), которые не пройдут проверку
+        баланса FDS (stoich.balance_violations), выбрасывается ValueError.
+        Возвращает self.
+        """
+        if self.fuel_spec.formula:
+            return self._set_balanced(params)
+        self.reac.nu_products = None
+        if computed is None:
+            result = stoich.compute_reaction(params)
+            spec_ids, fractions = stoich.products_composition(params, result)
+            computed = spec_ids, fractions, result["mass_reactants"]
+        spec_ids, fractions, nu_air = computed
+        self.fuel_spec.mw = params["molar_mass"]
+        self.products_spec.spec_ids = spec_ids
+        self.products_spec.fractions = fractions
+        self.reac.heat_of_combustion = params["heat_release"]
+        self.reac.nu_air = nu_air
+        return self
+
+    def _set_balanced(self, params):
+        result = stoich.close_balance(params, stoich.parse_formula(self.fuel_spec.formula))
+        violations = stoich.balance_violations(result["residuals"], float(result["molar_mass"]))
+        result = {key: float(value) for key, value in result.items() if key not in ("residuals_before", "residuals")}
+        for spec_id, key in (("WATER VAPOR", "V_H2O"), ("OXYGEN", "V_O2")):
+            if result[key] < 0:
+                raise ValueError(f"Баланс атомов не замыкается: отрицательное количество {spec_id} "
+                                 f"({result[key]:.4g} моль на моль топлива)")
+        if violations:
+            # Реакция без допусков REAC_ATOM_ERROR/REAC_MASS_ERROR не пройдет проверку FDS
+            raise ValueError(f"Баланс атомов не замыкается: невязки (моль на моль топлива) "
+                             f"{', '.join(violations)} больше допуска FDS; выходы сажи, CO2, CO и HCl "
+                             "должны соответствовать формуле")
+        spec_ids, fractions = stoich.products_composition(params, result)
+        self.fuel_spec.mw = result["molar_mass"]
+        self.products_spec.spec_ids = spec_ids
+        self.products_spec.fractions = fractions
+        self.reac.heat_of_combustion = params["heat_release"]
+        self.reac.nu_air = result["nu_air"]
+        self.reac.nu_products = result["nu_products"]
+        return self
+
+    def fuel_params(self, warnings=None):
+        """Параметры формы, восстановленные по значениям групп.
+
+        Возвращает None без молярной массы топлива. Потребление кислорода
+        берется из доли NITROGEN, а при ее отсутствии - из NU воздуха.
+        """
+        params = {}
+        if self.reac.heat_of_combustion is not None:
+            params['heat_release'] = self.reac.heat_of_combustion
+        molar_mass = self.fuel_spec.mw
+        if molar_mass is None:
+            return None
+        params['molar_mass'] = molar_mass
+        if self.products_spec.spec_ids:
+            products = self.products_spec.composition()
+            if self.balanced and 'NITROGEN' in products:
+                # Азот топлива не относится к воздуху
+                products['NITROGEN'] -= stoich.parse_formula(self.fuel_spec.formula)[stoich.ELEMENTS.index("N")] / 2
+            try:
+                params.update(stoich.yields_from_products(products, molar_mass))
+            except (ValueError, TypeError, ZeroDivisionError) as e:
+                if warnings is not None:
+                    warnings.append(f"Warning: Error calculating yields from PRODUCTS - {e}")
+        if 'o2_consumption' not in params and self.reac.nu_air is not None:
+            if self.balanced:
+                V_O2 = -self.reac.nu_air / (1 + stoich.N2_O2_RATIO)
+                params['o2_consumption'] = V_O2 * stoich.W_O2 / molar_mass
+            else:
+                params['o2_consumption'] = float(stoich.o2_from_nu(self.reac.nu_air, molar_mass))
+        params.setdefault('hcl_yield', 0.0)
+        return params
+
+    def lines(self):
+        """Текст групп: SPEC топлива, SPEC смеси продуктов и REAC"""
+        return [self.fuel_spec.to_text(), self.products_spec.to_text(), self.reac.to_text()]
+
+    def block_text(self):
+        """Полный блок SPEC/REAC (с общими SPEC) для одной реакции"""
+        return "\n".join(SHARED_SPEC_LINES[:-1] + (self.fuel_spec.to_text() + " ", SHARED_SPEC_LINES[-1],
+                                                   self.products_spec.to_text(), self.reac.to_text())) + "\n"
+
+    def __repr__(self):
+        return f"Reaction({self.fuel_spec!r}, {self.products_spec!r}, {self.reac!r})"
+
+
+def _record_span(record):
+    return [record.start, record.end] if record is not None else None
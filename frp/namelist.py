@@ -0,0 +1,273 @@
+"""Потоковый разбор групп namelist (&NAME ... /) во входных файлах FDS.
+
+Файл проходится один раз через mmap, поэтому он не загружается в память
+целиком. Каждая группа возвращается как Record с байтовыми смещениями, по
+которым импорт извлекает параметры, а сохранение заменяет участки файла.
+
+Кодировка файла определяется по его началу (см. detect_encoding): файлы
+Fenix+ из Windows бывают в CP1251. Текст групп декодируется по одной
+группе с обработчиком ERRORS, так что байты, не подходящие к кодировке,
+не теряются и при обратном кодировании тем же обработчиком дают
+исходные байты.
+"""
+
+import codecs
+import locale
+import mmap
+import multiprocessing
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Группа начинается с '&' в начале строки и заканчивается '/' вне кавычек.
+# Тело записано развернутым циклом: текст вне кавычек и строки в кавычках
+# чередуются без пересечений, а \b после имени не дает отдавать его
+# символы телу, поэтому неудачная попытка сопоставления остается линейной
+# и на больших файлах (без притяжательных квантификаторов Python 3.11).
+_RECORD_RE = re.compile(
+    rb"""^[ \t]*&(?P<name>[A-Za-z_][A-Za-z0-9_]*)\b[^'"/]*(?:(?:'[^']*'|"[^"]*")[^'"/]*)*/(?P<eol>[ \t]*\r?\n)?""",
+    re.MULTILINE,
+)
+# Начало строки, с которой может начинаться группа (граница участков)
+_LINE_START_RE = re.compile(rb"^[ \t]*&", re.MULTILINE)
+_ASSIGN_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\s*(?:\(([^)]*)\))?\s*=")
+_VALUE_RE = re.compile(r"""'([^']*)'|"([^"]*)"|([^\s,'"=]+)""")
+_SEPARATORS = " \t\r\n,"
+
+# name - имя группы в верхнем регистре, start/end - байтовые смещения
+# '&' и символа после '/', line_end - смещение после перевода строки за
+# группой (равно end, если за '/' на той же строке есть другой текст),
+# text - декодированный текст группы
+Record = namedtuple("Record", "name start end line_end text")
+
+
+# Обработчик ошибок кодировки для текста групп: байты без символа в
+# кодировке переводятся в суррогаты и при кодировании восстанавливаются
+ERRORS = "surrogateescape"
+# Размер начала файла, по которому определяется кодировка
+DETECT_LIMIT = 65536
+# Определенные кодировки: (путь, размер, время изменения) -> кодировка
+_detected = {}
+_DETECTED_MAX = 4096
+# Файлы от этого размера разбираются по участкам пулом процессов
+PARALLEL_MIN_SIZE = 32 << 20
+# Наименьший размер участка и число участков на процесс (для равномерной загрузки)
+CHUNK_MIN_SIZE = 4 << 20
+CHUNKS_PER_WORKER = 4
+
+
+def default_encoding():
+    """Кодировка файлов, не являющихся UTF-8: $FRP_ENCODING, кодировка системы
+    или, если система использует UTF-8, CP1251 (файлы Fenix+ из Windows)
+    """
+    encoding = os.environ.get("FRP_ENCODING") or locale.getpreferredencoding(False)
+    return "cp1251" if codecs.lookup(encoding).name == "utf-8" else encoding
+
+
+def detect_bytes(prefix):
+    """Кодировка по началу данных: UTF-8, если оно допустимо в UTF-8, иначе default_encoding().
+
+    Многобайтовый символ, обрезанный границей prefix, не считается ошибкой.
+    """
+    if os.environ.get("FRP_ENCODING"):
+        return os.environ["FRP_ENCODING"]
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return default_encoding()
+
+
+def detect_encoding(file_path, limit=DETECT_LIMIT):
+    """Кодировка файла по первым limit байтам; результат запоминается до изменения файла"""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    encoding = _detected.get(key)
+    if encoding is None:
+        with open(file_path, "rb") as file:
+            encoding = detect_bytes(file.read(limit))
+        if len(_detected) >= _DETECTED_MAX:
+            _detected.clear()
+        _detected[key] = encoding
+    return encoding
+
+
+def scan(data, encoding=None):
+    """Последовательно выдает группы namelist из bytes или mmap.
+
+    Без encoding кодировка определяется по началу данных (detect_bytes).
+    """
+    encoding = encoding or detect_bytes(data[:DETECT_LIMIT])
+    names = {}
+    for match in _RECORD_RE.finditer(data):
+        raw_name = match.group("name")
+        name = names.get(raw_name)
+        if name is None:
+            name = names[raw_name] = raw_name.decode("ascii").upper()
+        start = match.start("name") - 1
+        line_end = match.end()
+        end = match.start("eol") if match.group("eol") else line_end
+        yield Record(name, start, end, line_end, data[start:end].decode(encoding, errors=ERRORS))
+
+
+def scan_file(file_path, encoding=None):
+    """Последовательно выдает группы namelist файла за один проход.
+
+    Без encoding кодировка определяется по началу файла (detect_encoding).
+    """
+    encoding = encoding or detect_encoding(file_path)
+    with open(file_path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Пустой файл нельзя отобразить в память
+            return
+        with data:
+            yield from scan(data, encoding)
+
+
+def scan_range(data, encoding, start=0, stop=None, names=None):
+    """Разбирает группы, начинающиеся в [start, stop).
+
+    Последняя группа участка может выходить за stop. names - множество
+    имен групп (верхний регистр), для которых строятся Record; остальные
+    только подсчитываются. Возвращает кортеж (records, counts, first,
+    following): counts - число групп каждого имени в порядке первого
+    появления, first - начало первой найденной с start группы и following -
+    начало первой группы с началом не раньше stop (None, если таких нет).
+    Разбор, начатый с following, продолжает последовательный разбор.
+    """
+    stop = len(data) if stop is None else stop
+    records = []
+    counts = {}
+    decoded = {}
+    first = following = None
+    for match in _RECORD_RE.finditer(data, start):
+        if first is None:
+            first = match.start()
+        if match.start() >= stop:
+            following = match.start()
+            break
+        raw_name = match.group("name")
+        name = decoded.get(raw_name)
+        if name is None:
+            name = decoded[raw_name] = raw_name.decode("ascii").upper()
+        counts[name] = counts.get(name, 0) + 1
+        if names is None or name in names:
+            begin = match.start("name") - 1
+            line_end = match.end()
+            end = match.start("eol") if match.group("eol") else line_end
+            records.append(Record(name, begin, end, line_end, data[begin:end].decode(encoding, errors=ERRORS)))
+    return records, counts, first, following
+
+
+def chunk_bounds(data, count):
+    """Границы участков для параллельного разбора: начала строк с '&' около равных долей данных"""
+    bounds = [0]
+    for i in range(1, count):
+        match = _LINE_START_RE.search(data, max(len(data) * i // count, bounds[-1] + 1))
+        if match is None:
+            break
+        if match.start() > bounds[-1]:
+            bounds.append(match.start())
+    bounds.append(len(data))
+    return bounds
+
+
+def _scan_chunk(task):
+    file_path, encoding, start, stop, names = task
+    with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return scan_range(data, encoding, start, stop, names)
+
+
+def scan_index(file_path, encoding=None, names=None, workers=None, progress=None):
+    """Разбирает файл по участкам; возвращает (records, counts) как у scan_range для всего файла.
+
+    Файл делится на участки по началам строк с '&' (chunk_bounds);
+    участки разбираются пулом из workers процессов, каждый из которых
+    отображает файл в память сам, а результаты объединяются по порядку.
+    Если граница попала внутрь группы (например, строки в кавычках с
+    переводом строки и '&'), участок за ней разбирается заново с места,
+    где продолжился бы последовательный разбор, так что результат
+    совпадает с последовательным. По умолчанию пул используется для
+    файлов от PARALLEL_MIN_SIZE и только в главном процессе (не внутри
+    пулов пакетной обработки). progress(done, total) получает число
+    байт разобранных участков; исключение из него прерывает разбор.
+    """
+    encoding = encoding or detect_encoding(file_path)
+    size = os.path.getsize(file_path)
+    if not size:
+        return [], {}
+    if workers is None:
+        parallel = size >= PARALLEL_MIN_SIZE and multiprocessing.parent_process() is None
+        workers = (os.cpu_count() or 1) if parallel else 1
+    count = max(1, min(workers * CHUNKS_PER_WORKER, size // CHUNK_MIN_SIZE))
+    with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = chunk_bounds(data, count)
+        tasks = [(file_path, encoding, start, stop, names) for start, stop in zip(bounds, bounds[1:])]
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(tasks) > 1 else None
+        futures = [pool.submit(_scan_chunk, task) for task in tasks] if pool is not None else []
+        try:
+            results = (future.result() for future in futures) if pool is not None else map(_scan_chunk, tasks)
+            records = []
+            counts = {}
+            expected = None
+            for i, (chunk, chunk_counts, first, following) in enumerate(results):
+                start, stop = bounds[i], bounds[i + 1]
+                if i and first != expected:
+                    # Граница внутри группы: участок разбирается заново
+                    if expected is None:
+                        chunk, chunk_counts, following = [], {}, None
+                    else:
+                        chunk, chunk_counts, _, following = scan_range(data, encoding, expected, stop, names)
+                records.extend(chunk)
+                for name, number in chunk_counts.items():
+                    counts[name] = counts.get(name, 0) + number
+                expected = following
+                if progress is not None:
+                    progress(stop, size)
+        finally:
+            if pool is not None:
+                # Еще не начатые участки при отмене не разбираются
+                for future in futures:
+                    future.cancel()
+                pool.shutdown()
+    return records, counts
+
+
+def parse_params(text):
+    """Разбирает параметры группы в словарь ИМЯ -> список значений.
+
+    Индексы вида SPEC_ID(1:6) отбрасываются, строки возвращаются без
+    кавычек. Значения без имени перед ними игнорируются.
+    """
+    body = text.strip()
+    if body.startswith("&"):
+        body = body[1:]
+    if body.endswith("/"):
+        body = body[:-1]
+    head = re.match(r"[A-Za-z_][A-Za-z0-9_]*", body)
+    pos = head.end() if head else 0
+
+    params = {}
+    current = None
+    length = len(body)
+    while pos < length:
+        if body[pos] in _SEPARATORS:
+            pos += 1
+            continue
+        assign = _ASSIGN_RE.match(body, pos)
+        if assign:
+            current = params.setdefault(assign.group(1).upper(), [])
+            pos = assign.end()
+            continue
+        value = _VALUE_RE.match(body, pos)
+        if not value:
+            pos += 1
+            continue
+        if current is not None:
+            current.append(next(v for v in value.groups() if v is not None))
+        pos = value.end()
+    return params
+
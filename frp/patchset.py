@@ -0,0 +1,173 @@
+"""Набор замен для отложенного пакетного пересчета файлов FDS.
+
+Пробный прогон (batch --dry-run) ничего не записывает: для каждого файла
+строятся участки замены блока SPEC/REAC (см. batch.rewrite_patches) и
+сокращаются до действительно меняющихся байтов (splice.minimize). Файлы,
+блок которых уже совпадает с рассчитанным, в набор не попадают и позже не
+перезаписываются. Набор - файл JSON Lines, по строке на файл:
+
+    {"path": ..., "size": ..., "mtime_ns": ..., "digest": ..., "encoding": ...,
+     "patches": [[start, end, "текст замены"], ...]}
+
+Смещения - байтовые в исходном файле, текст замены записан в кодировке
+encoding (см. namelist.ERRORS). Команда apply применяет набор, если файл
+с тех пор не изменился: совпадают размер и время изменения или, при
+изменении времени, хэш содержимого (как в cache).
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import batch, cache, fdsio, namelist, splice
+
+
+def plan_file(file_path, params=None, fuel_id=None, summary=None, reac_lines=None, formula=None):
+    """Строка набора замен для одного файла.
+
+    Параметры как у batch.rewrite_file. Возвращает кортеж (путь,
+    состояние, строка набора или сообщение об ошибке, сводка), где
+    состояние - 'changed', 'unchanged' или 'failed'; для неизменяемых
+    файлов строка набора None. Сводка возвращается, только если файл
+    пришлось разобрать. Не выбрасывает исключений.
+    """
+    parsed = None
+    try:
+        if summary is None:
+            summary = parsed = fdsio.summarize_fds(file_path)
+        patches = splice.minimize(file_path, batch.rewrite_patches(file_path, summary, params, fuel_id,
+                                                                   reac_lines, formula))
+        if not patches:
+            return file_path, "unchanged", None, parsed
+        encoding = summary.get("encoding") or namelist.detect_encoding(file_path)
+        size, mtime_ns = fdsio.file_stat(file_path)
+        entry = {
+            "path": file_path,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "digest": cache.file_digest(file_path),
+            "encoding": encoding,
+            "patches": [[start, end, replacement.decode(encoding, namelist.ERRORS)]
+                        for start, end, replacement in patches],
+        }
+        return file_path, "changed", entry, parsed
+    except Exception as e:
+        return file_path, "failed", str(e), parsed
+
+
+def _plan_task(task):
+    return plan_file(*task)
+
+
+def _results(function, tasks, workers):
+    if workers == 1 or len(tasks) <= 1:
+        return map(function, tasks)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    chunksize = max(1, len(tasks) // (workers * 8))
+
+    def results():
+        with pool:
+            yield from pool.map(function, tasks, chunksize=chunksize)
+
+    return results()
+
+
+def plan_batch(files, out, params=None, fuel_id=None, workers=None, reac_cache=None, reac_lines=None,
+               formula=None):
+    """Пробный прогон пакета: пишет строки набора замен в out и возвращает статистику.
+
+    Параметры как у batch.run_batch; out - текстовый поток. Строки пишутся
+    по мере обработки в порядке files. Статистика: files, changed,
+    unchanged, failed (пары (путь, сообщение)), bytes - общий объем
+    текста замен, cached, elapsed.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    summaries = [reac_cache.get(path) if reac_cache is not None else None for path in files]
+    tasks = [(path, params, fuel_id, summary, reac_lines, formula) for path, summary in zip(files, summaries)]
+    stats = {"files": len(tasks), "changed": 0, "unchanged": 0, "failed": [], "bytes": 0,
+             "cached": sum(summary is not None for summary in summaries)}
+    for path, status, entry, parsed in _results(_plan_task, tasks, workers):
+        if parsed is not None and reac_cache is not None:
+            reac_cache.put(path, parsed)
+        if status == "failed":
+            stats["failed"].append((path, entry))
+            continue
+        stats[status] += 1
+        if entry is not None:
+            stats["bytes"] += sum(len(text.encode(entry["encoding"], namelist.ERRORS))
+                                  for _, _, text in entry["patches"])
+            out.write(json.dumps(entry) + "\n")
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def apply_entry(entry, output_dir=None):
+    """Применяет строку набора замен; возвращает (путь, успех, сообщение) и не выбрасывает исключений"""
+    path = entry.get("path", "")
+    try:
+        size, mtime_ns = fdsio.file_stat(path)
+        if size != entry["size"] or (mtime_ns != entry["mtime_ns"] and cache.file_digest(path) != entry["digest"]):
+            return path, False, "Файл изменился после пробного прогона"
+        encoding = entry["encoding"]
+        patches = [(start, end, text.encode(encoding, namelist.ERRORS)) for start, end, text in entry["patches"]]
+        target = path if output_dir is None else os.path.join(output_dir, os.path.basename(path))
+        splice.splice_file(path, patches, target)
+        return path, True, target
+    except Exception as e:
+        return path, False, str(e)
+
+
+def _apply_task(task):
+    return apply_entry(*task)
+
+
+def read_patchset(file):
+    """Строки набора замен из текстового потока (пустые строки пропускаются)"""
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ValueError(f"Строка {number} набора замен не является JSON") from None
+
+
+def apply_patchset(entries, output_dir=None, workers=None):
+    """Применяет набор замен пулом процессов и возвращает статистику (files, failed, elapsed)"""
+    workers = workers or os.cpu_count() or 1
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    tasks = [(entry, output_dir) for entry in entries]
+    failed = [(path, message) for path, ok, message in _results(_apply_task, tasks, workers) if not ok]
+    return {"files": len(tasks), "failed": failed, "elapsed": time.perf_counter() - start}
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду apply"""
+    parser = subparsers.add_parser("apply", help="Применить набор замен, построенный batch --dry-run")
+    parser.add_argument("patchset", help="Файл набора замен (JSON Lines) или - для стандартного ввода")
+    parser.add_argument("--output-dir", help="Каталог для результатов (по умолчанию файлы перезаписываются)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Число процессов (по умолчанию число ядер)")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    try:
+        if args.patchset == "-":
+            entries = list(read_patchset(sys.stdin))
+        else:
+            with open(args.patchset, encoding="utf-8") as file:
+                entries = list(read_patchset(file))
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    stats = apply_patchset(entries, args.output_dir, args.workers)
+    for path, message in stats["failed"]:
+        print(f"Ошибка: {path}: {message}", file=sys.stderr)
+    print(f"Применено: {stats['files'] - len(stats['failed'])} из {stats['files']}, "
+          f"время: {stats['elapsed']:.2f} с", file=sys.stderr)
+    return 1 if stats["failed"] else 0
@@ -0,0 +1,70 @@
+"""Сводка параметров REAC по множеству файлов FDS.
+
+Выводит таблицу (TSV) с ID топлива и параметрами формы для каждого файла
+(для файлов с несколькими REAC - для каждой реакции).
+Неизмененные файлы берутся из кэша разбора без повторного чтения.
+"""
+
+import sys
+import time
+
+from . import batch, cache, fdsio, stoich
+
+COLUMNS = ("path", "fuel_id") + stoich.INPUT_NAMES + ("error",)
+
+
+def scan_files(files, reac_cache=None):
+    """Последовательно выдает (путь, сводка) для каждого файла"""
+    for path in files:
+        try:
+            if reac_cache is not None:
+                summary = reac_cache.load(path)
+            else:
+                summary = fdsio.summarize_fds(path)
+        except OSError as e:
+            summary = {"fuel_id": "", "params": {}, "error": str(e)}
+        yield path, summary
+
+
+def summary_rows(summary):
+    """Строки таблицы для сводки: по одной на каждую реакцию файла"""
+    reactions = summary.get("reactions") or []
+    return reactions if len(reactions) > 1 else [summary]
+
+
+def format_row(path, summary):
+    """Строка TSV для сводки файла"""
+    params = summary.get("params", {})
+    values = [path, summary.get("fuel_id", "")]
+    values.extend(repr(params[name]) if name in params else "" for name in stoich.INPUT_NAMES)
+    values.append(summary.get("error", ""))
+    return "\t".join(values)
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду scan"""
+    parser = subparsers.add_parser("scan", help="Вывести параметры REAC множества файлов FDS")
+    parser.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    files = batch.collect_files(args.paths)
+    if not files:
+        print("Ошибка: Не найдено ни одного файла FDS.", file=sys.stderr)
+        return 1
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    start = time.perf_counter()
+    try:
+        print("\t".join(COLUMNS))
+        for path, summary in scan_files(files, reac_cache):
+            for row in summary_rows(summary):
+                print(format_row(path, row))
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    elapsed = time.perf_counter() - start
+    print(f"Файлов: {len(files)}, время: {elapsed:.2f} с", file=sys.stderr)
+    return 0
@@ -0,0 +1,465 @@
+"""Локальная служба HTTP/JSON для расчета REAC, разбора и пересчета файлов FDS.
+
+Служба на asyncio принимает запросы по TCP (по умолчанию только с
+локального адреса) или через сокет Unix:
+
+    POST /compute  {"params": {...}, "fuel_id": ..., "formula": ..., "block": true}
+                   или список таких объектов - доли PRODUCTS, NU и блок SPEC/REAC
+    POST /parse    {"path": ...} - сводка разбора файла (см. fdsio.summarize)
+    POST /rewrite  {"path": ..., "params": ..., "fuel_id": ..., "formula": ...,
+                    "output_dir": ...} - пересчет блока SPEC/REAC (см. batch.rewrite_file)
+    GET  /stats    - счетчики и задержки p50/p99 по видам запросов
+
+Запросы расчета, пришедшие за один проход цикла событий (или за
+--batch-delay), собираются в пакет и рассчитываются одним векторным
+вызовом (fdsio.compute_reactions). Разбор и запись файлов выполняются
+пулом процессов, а обращения к кэшу разбора - отдельным потоком, так
+что цикл событий ими не блокируется. Соединения
+HTTP/1.1 держатся открытыми (keep-alive). Аутентификации нет: служба
+рассчитана на локальные инструменты. Чтобы до нее не могли добраться
+страницы, открытые в браузере, запросы POST принимаются только с
+Content-Type: application/json, а запросы с нелокальным Origin или (по
+TCP) Host отклоняются. Файлы в /parse и /rewrite (path и output_dir)
+должны лежать в каталогах --root; по TCP без --root эти адреса отключены,
+через сокет Unix без --root доступ ограничен правами на сокет.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from . import batch, cache, fdsio, stoich, watch
+from .model import DEFAULT_FUEL_ID, Reaction
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 4096
+# Наибольший размер тела запроса, байт
+MAX_BODY = 16 << 20
+# Число последних запросов каждого вида для расчета процентилей задержки
+LATENCY_WINDOW = 10000
+
+# Имена узлов, с которых принимаются запросы по TCP (Host и Origin)
+LOCAL_HOSTS = frozenset(("127.0.0.1", "localhost", "::1"))
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 415: "Unsupported Media Type", 422: "Unprocessable Entity",
+            500: "Internal Server Error"}
+
+
+class RequestError(ValueError):
+    """Ошибка запроса с кодом ответа HTTP"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ComputeBatcher:
+    """Очередь запросов расчета, обрабатываемая пакетами.
+
+    Первый запрос пакета планирует расчет на следующий проход цикла
+    событий (или через delay секунд); запросы, пришедшие до этого,
+    рассчитываются тем же векторным вызовом. Пакет из max_size запросов
+    рассчитывается сразу.
+    """
+
+    def __init__(self, max_size=DEFAULT_BATCH_SIZE, delay=0.0):
+        self.max_size = max_size
+        self.delay = delay
+        self.pending = []
+        self.batches = 0
+        self.rows = 0
+        self._handle = None
+
+    def submit(self, params, fuel_id=DEFAULT_FUEL_ID, formula=None, block=False):
+        """Ставит проверенные параметры в очередь; возвращает future со словарем результата"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((params, fuel_id, formula, block, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self._handle is None:
+            self._handle = (loop.call_later(self.delay, self.flush) if self.delay > 0
+                            else loop.call_soon(self.flush))
+        return future
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        self.batches += 1
+        self.rows += len(pending)
+        try:
+            computed = fdsio.compute_reactions([params for params, *_ in pending])
+        except Exception as e:
+            for *_, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (params, fuel_id, formula, block, future), result in zip(pending, computed):
+            if future.done():
+                continue
+            try:
+                future.set_result(reaction_result(params, fuel_id, formula, block, result))
+            except ValueError as e:
+                future.set_exception(RequestError(str(e), 422))
+
+
+def reaction_result(params, fuel_id=DEFAULT_FUEL_ID, formula=None, block=False, computed=None):
+    """Ответ на запрос расчета: молярная масса, доли PRODUCTS, NU и, по запросу, блок SPEC/REAC.
+
+    computed - результат fdsio.compute_reactions для params; с формулой
+    топлива баланс атомов замыкается отдельно (см. model.Reaction.set_params).
+    """
+    reaction = Reaction.new(fuel_id, formula=formula).set_params(params, computed)
+    result = {
+        "fuel_id": fuel_id,
+        "molar_mass": reaction.fuel_spec.mw,
+        "products": reaction.products_spec.composition(),
+        "nu_air": float(reaction.reac.nu_air),
+        "nu_products": 1.0 if reaction.reac.nu_products is None else reaction.reac.nu_products,
+        "balanced": reaction.balanced,
+    }
+    if block:
+        result["block"] = reaction.block_text()
+    return result
+
+
+def _field(request, name, types=str):
+    value = request.get(name)
+    if value is not None and not isinstance(value, types):
+        raise RequestError(f"Неверное значение поля '{name}'")
+    return value
+
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise RequestError("Ожидается объект JSON")
+    return body
+
+
+def _host_name(host):
+    """Имя узла из заголовка Host без порта"""
+    if host.startswith("["):
+        return host[1:].split("]", 1)[0]
+    return host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+
+
+class ReacService:
+    """Служба: разбор HTTP, маршрутизация, пакетный расчет и пул процессов для файлов"""
+
+    def __init__(self, workers=None, batch_size=DEFAULT_BATCH_SIZE, batch_delay=0.0, reac_cache=None, roots=None):
+        self.workers = workers or os.cpu_count() or 1
+        # Каталоги, в которых разрешены файлы /parse и /rewrite
+        self.roots = [os.path.realpath(root) for root in roots or ()]
+        self.hosts = set(LOCAL_HOSTS)
+        self.unix = False
+        self.batcher = ComputeBatcher(batch_size, batch_delay)
+        self.cache = reac_cache
+        # Кэш хэширует файлы при проверке записей; обращения к нему идут по
+        # очереди в отдельном потоке, не блокируя цикл событий
+        self.cache_executor = ThreadPoolExecutor(max_workers=1)
+        self.pool = None
+        self.started = time.monotonic()
+        self.counters = {"requests": 0, "errors": 0, "connections": 0}
+        self.latencies = {}
+        self.routes = {
+            "/compute": ("POST", self.compute),
+            "/parse": ("POST", self.parse),
+            "/rewrite": ("POST", self.rewrite),
+            "/stats": ("GET", self.stats_request),
+        }
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """Запускает пул процессов и сервер; возвращает asyncio.Server"""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        if unix_path:
+            self.unix = True
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        self.hosts.add(host)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        self.cache_executor.shutdown(wait=True)
+
+    async def handle_connection(self, reader, writer):
+        self.counters["connections"] += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                keep_alive = False
+                path = None
+                try:
+                    method, path, keep_alive, length, headers = self._parse_head(head)
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise RequestError(f"Тело запроса больше {MAX_BODY} байт", 413)
+                    body = await reader.readexactly(length) if length else b""
+                    self.check_headers(method, headers)
+                    status, payload = await self.dispatch(method, path, body)
+                except asyncio.IncompleteReadError:
+                    break
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                self.counters["requests"] += 1
+                self.counters["errors"] += status != 200
+                if path in self.routes:
+                    self.latencies.setdefault(path, deque(maxlen=LATENCY_WINDOW)).append(
+                        time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            raise RequestError("Неверный запрос HTTP") from None
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+        return method, target.split("?", 1)[0], keep_alive, length, headers
+
+    def check_headers(self, method, headers):
+        """Отклоняет запросы, которые могли быть отправлены страницей в браузере.
+
+        Запрос POST должен иметь Content-Type: application/json (такой
+        запрос браузер не отправит на другой адрес без разрешения службы),
+        Origin, если задан, должен быть локальным, а Host при работе по
+        TCP - локальным или адресом службы (защита от подмены DNS).
+        """
+        origin = headers.get("origin")
+        if origin is not None and urlsplit(origin).hostname not in LOCAL_HOSTS:
+            raise RequestError(f"Запросы с Origin {origin} не принимаются", 403)
+        if not self.unix and _host_name(headers.get("host", "")).lower() not in self.hosts:
+            raise RequestError("Запросы с нелокальным Host не принимаются", 403)
+        if method == "POST" and headers.get("content-type", "").split(";", 1)[0].strip().lower() != "application/json":
+            raise RequestError("Ожидается Content-Type: application/json", 415)
+
+    def _allowed_path(self, path, name):
+        """Путь файла запроса после проверки, что он лежит в одном из каталогов roots"""
+        if not self.roots:
+            if self.unix:
+                return path
+            raise RequestError("Доступ к файлам по TCP отключен; задайте каталоги --root", 403)
+        real = os.path.realpath(path)
+        for root in self.roots:
+            try:
+                if os.path.commonpath([real, root]) == root:
+                    return real
+            except ValueError:  # Разные диски в Windows
+                pass
+        raise RequestError(f"Путь в поле '{name}' вне разрешенных каталогов", 403)
+
+    @staticmethod
+    def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write((f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                      f"Content-Type: application/json\r\n"
+                      f"Content-Length: {len(data)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + data)
+
+    async def dispatch(self, method, path, body):
+        """Выполняет запрос; возвращает пару (код HTTP, ответ JSON)"""
+        route = self.routes.get(path)
+        if route is None:
+            raise RequestError(f"Неизвестный адрес {path}", 404)
+        if method != route[0]:
+            raise RequestError(f"Адрес {path} принимает только {route[0]}", 405)
+        try:
+            request = json.loads(body) if body else {}
+        except (ValueError, UnicodeDecodeError):
+            raise RequestError("Тело запроса не является JSON") from None
+        try:
+            return 200, await route[1](request)
+        except RequestError:
+            raise
+        except FileNotFoundError as e:
+            raise RequestError(f"Файл не найден: {e.filename}", 404) from None
+        except ValueError as e:
+            raise RequestError(str(e), 422) from None
+        except Exception as e:
+            raise RequestError(f"{type(e).__name__}: {e}", 500) from None
+
+    @staticmethod
+    def _compute_task(request):
+        """Проверенные аргументы ComputeBatcher.submit для запроса расчета"""
+        request = _object(request)
+        params = request.get("params")
+        if not isinstance(params, dict):
+            raise RequestError("Поле 'params' должно быть объектом с параметрами топлива")
+        params = stoich.validate_params(params)
+        fuel_id = _field(request, "fuel_id") or DEFAULT_FUEL_ID
+        formula = _field(request, "formula")
+        if formula:
+            stoich.parse_formula(formula)
+        return params, fuel_id, formula, bool(request.get("block"))
+
+    async def compute(self, request):
+        if isinstance(request, list):
+            # Список проверяется целиком до постановки в очередь, чтобы при
+            # ошибке в одном элементе остальные не рассчитывались впустую
+            tasks = []
+            for index, item in enumerate(request):
+                try:
+                    tasks.append(self._compute_task(item))
+                except RequestError as e:
+                    raise RequestError(f"Элемент {index}: {e}", e.status) from None
+                except ValueError as e:
+                    raise RequestError(f"Элемент {index}: {e}", 422) from None
+            return list(await asyncio.gather(*[self.batcher.submit(*task) for task in tasks]))
+        return await self.batcher.submit(*self._compute_task(request))
+
+    async def _cached(self, method, *args):
+        """Вызывает метод кэша в его потоке"""
+        return await asyncio.get_running_loop().run_in_executor(self.cache_executor, method, *args)
+
+    async def _summary(self, path):
+        summary = await self._cached(self.cache.get, path) if self.cache is not None else None
+        if summary is None:
+            summary = await asyncio.get_running_loop().run_in_executor(self.pool, fdsio.summarize_fds, path)
+            if self.cache is not None:
+                await self._cached(self.cache.put, path, summary)
+        return summary
+
+    async def parse(self, request):
+        path = _field(_object(request), "path")
+        if not path:
+            raise RequestError("Не задано поле 'path'")
+        return await self._summary(self._allowed_path(path, "path"))
+
+    async def rewrite(self, request):
+        request = _object(request)
+        path = _field(request, "path")
+        if not path:
+            raise RequestError("Не задано поле 'path'")
+        path = self._allowed_path(path, "path")
+        params = request.get("params")
+        if params is not None:
+            params = stoich.validate_params(_object(params))
+        fuel_id = _field(request, "fuel_id")
+        formula = _field(request, "formula")
+        output_dir = _field(request, "output_dir")
+        if output_dir:
+            output_dir = self._allowed_path(output_dir, "output_dir")
+            os.makedirs(output_dir, exist_ok=True)
+        summary = await self._cached(self.cache.get, path) if self.cache is not None else None
+        _, ok, message, parsed = await asyncio.get_running_loop().run_in_executor(
+            self.pool, batch.rewrite_file, path, params, fuel_id, output_dir, summary, None, formula)
+        if parsed is not None and self.cache is not None and output_dir:
+            await self._cached(self.cache.put, path, parsed)
+        if not ok:
+            raise RequestError(message, 404 if not os.path.exists(path) else 422)
+        return {"path": path, "target": message}
+
+    def stats(self):
+        """Счетчики службы и задержки (с) p50/p99 по видам запросов"""
+        uptime = time.monotonic() - self.started
+        stats = dict(self.counters, uptime=uptime, batches=self.batcher.batches, batched=self.batcher.rows,
+                     mean_batch=self.batcher.rows / self.batcher.batches if self.batcher.batches else None,
+                     requests_per_second=self.counters["requests"] / uptime if uptime > 0 else None)
+        stats["latency"] = {}
+        for path, values in self.latencies.items():
+            p50, p99, _ = watch.percentiles(values)
+            stats["latency"][path] = {"count": len(values), "p50": p50, "p99": p99}
+        return stats
+
+    async def stats_request(self, request):
+        return self.stats()
+
+
+def format_stats(stats):
+    """Строка журнала со счетчиками службы"""
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.2f}"
+
+    mean_batch = "-" if stats["mean_batch"] is None else f"{stats['mean_batch']:.1f}"
+    lines = [f"Запросов: {stats['requests']} (ошибок {stats['errors']}), соединений: {stats['connections']}, "
+             f"пакетов расчета: {stats['batches']} (в среднем {mean_batch} запросов)"]
+    for path, item in stats["latency"].items():
+        lines.append(f"  {path}: {item['count']} запросов, задержка p50/p99: {ms(item['p50'])}/{ms(item['p99'])} мс")
+    return "\n".join(lines)
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, log=None):
+    """Обслуживает запросы до SIGINT или SIGTERM"""
+    log = log or (lambda message: None)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    server = await service.start(host, port, unix_path)
+    try:
+        log(f"Служба запущена: {unix_path or f'http://{host}:{port}'} ({service.workers} проц.)")
+        async with server:
+            await stop.wait()
+    finally:
+        service.close()
+        if unix_path and os.path.exists(unix_path):
+            os.unlink(unix_path)
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду serve"""
+    parser = subparsers.add_parser("serve", help="Запустить локальную службу HTTP/JSON для расчета и пересчета файлов")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Адрес (по умолчанию {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Порт (по умолчанию {DEFAULT_PORT})")
+    parser.add_argument("--unix", metavar="PATH", help="Слушать сокет Unix вместо TCP")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Число процессов для разбора и записи файлов (по умолчанию число ядер)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Наибольший пакет расчета (по умолчанию {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--batch-delay", type=float, default=0.0,
+                        help="Ожидание запросов в пакет расчета, с (по умолчанию до следующего прохода цикла)")
+    parser.add_argument("--root", action="append", default=[], metavar="DIR",
+                        help="Каталог, файлы которого доступны /parse и /rewrite (можно несколько раз; "
+                             "по TCP без него эти адреса отключены)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    service = ReacService(args.workers, args.batch_size, args.batch_delay, reac_cache, args.root)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix, lambda message: print(message, flush=True)))
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    print(format_stats(service.stats()), file=sys.stderr)
+    return 0
@@ -0,0 +1,150 @@
+"""Замена участков файла без загрузки его в память.
+
+Неизменные части исходного файла копируются средствами ядра
+(copy_file_range, где доступен) или через mmap блоками по CHUNK_SIZE,
+поэтому пиковое потребление памяти не зависит от размера файла. Результат пишется во временный файл рядом с целевым и атомарно
+переименовывается, так что при сбое исходный файл остается целым.
+"""
+
+import mmap
+import os
+import shutil
+
+from . import trace
+
+CHUNK_SIZE = 1 << 20
+# Число попыток подобрать свободное имя временного файла
+_TMP_ATTEMPTS = 100
+
+
+def _copy_range(source, out, start, end, progress=None, total=0, src_fd=None):
+    if src_fd is not None and hasattr(os, "copy_file_range"):
+        # Копирование без передачи данных через процесс; при отказе ядра
+        # (другая файловая система, неподдерживаемый тип файла) - через mmap
+        out.flush()
+        try:
+            while start < end:
+                copied = os.copy_file_range(src_fd, out.fileno(), min(CHUNK_SIZE, end - start), start)
+                if not copied:
+                    break
+                start += copied
+                if progress is not None:
+                    progress(start, total)
+        except OSError:
+            pass
+    for pos in range(start, end, CHUNK_SIZE):
+        chunk_end = min(pos + CHUNK_SIZE, end)
+        out.write(source[pos:chunk_end])
+        if progress is not None:
+            progress(chunk_end, total)
+
+
+def atomic_writer(dst_path):
+    """Открывает временный файл в каталоге dst_path для последующей замены.
+
+    Файл создается с правами 0666 за вычетом маски процесса (как обычный
+    новый файл), так что саму маску менять не нужно.
+    """
+    directory = os.path.dirname(os.path.abspath(dst_path))
+    prefix = os.path.join(directory, "." + os.path.basename(dst_path) + ".")
+    for _ in range(_TMP_ATTEMPTS):
+        try:
+            return open(prefix + os.urandom(6).hex() + ".tmp", "xb")
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"Не удалось создать временный файл для {dst_path}")
+
+
+def commit(tmp, dst_path, mode_source=None):
+    """Сбрасывает временный файл на диск и атомарно заменяет им dst_path"""
+    tmp.flush()
+    os.fsync(tmp.fileno())
+    tmp.close()
+    if mode_source and os.path.exists(mode_source):
+        shutil.copymode(mode_source, tmp.name)
+    os.replace(tmp.name, dst_path)
+
+
+def discard(tmp):
+    """Закрывает и удаляет временный файл после ошибки"""
+    tmp.close()
+    try:
+        os.unlink(tmp.name)
+    except FileNotFoundError:
+        pass
+
+
+def unchanged(src_path, patches):
+    """True, если замена участков patches не изменит содержимое src_path"""
+    with open(src_path, "rb") as src:
+        for start, end, replacement in patches:
+            if end - start != len(replacement):
+                return False
+            src.seek(start)
+            if src.read(end - start) != replacement:
+                return False
+    return True
+
+
+def minimize(src_path, patches):
+    """Наименьшие участки замены, дающие тот же результат, что и patches.
+
+    У каждого участка отбрасываются общие с исходным содержимым начало и
+    конец замены; участки, не меняющие файл, опускаются. Пустой
+    результат означает, что файл не изменится (см. unchanged).
+    """
+    minimal = []
+    with open(src_path, "rb") as src:
+        for start, end, replacement in patches:
+            src.seek(start)
+            original = src.read(end - start)
+            if original == replacement:
+                continue
+            limit = min(len(original), len(replacement))
+            head = 0
+            while head < limit and original[head] == replacement[head]:
+                head += 1
+            tail = 0
+            while tail < limit - head and original[-1 - tail] == replacement[-1 - tail]:
+                tail += 1
+            minimal.append((start + head, end - tail, replacement[head:len(replacement) - tail]))
+    return minimal
+
+
+def splice_file(src_path, patches, dst_path=None, progress=None):
+    """Записывает src_path с заменой участков в dst_path (по умолчанию на место).
+
+    patches - последовательность (start, end, replacement) с байтовыми
+    смещениями в исходном файле и байтами замены; участки не должны
+    пересекаться. Пустой участок (start == end) означает вставку.
+    progress(done, total) получает смещение в исходном файле после каждого
+    скопированного блока; исключение из него прерывает запись, и исходный
+    файл остается нетронутым.
+    """
+    dst_path = dst_path or src_path
+    patches = sorted(patches, key=lambda patch: (patch[0], patch[1]))
+    tmp = atomic_writer(dst_path)
+    try:
+        with open(src_path, "rb") as src, trace.span("splice.copy") as copy:
+            size = os.fstat(src.fileno()).st_size
+            source = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            try:
+                pos = 0
+                for start, end, replacement in patches:
+                    if start < pos or end < start or end > size:
+                        raise ValueError(f"Недопустимый участок замены {start}:{end}")
+                    _copy_range(source, tmp, pos, start, progress, size, src.fileno())
+                    tmp.write(replacement)
+                    pos = end
+                _copy_range(source, tmp, pos, size, progress, size, src.fileno())
+            finally:
+                # mmap закрывается до переименования (иначе замена не удастся в Windows)
+                if size:
+                    source.close()
+            copy.set(bytes=size)
+        trace.count("splice.bytes", size)
+        with trace.span("splice.commit"):
+            commit(tmp, dst_path, src_path)
+    except BaseException:
+        discard(tmp)
+        raise
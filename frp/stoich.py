@@ -0,0 +1,446 @@
+"""Стехиометрия реакции FDS без зависимостей от GUI.
+
+Прямой расчет переводит свойства топлива в объемные доли смеси PRODUCTS и
+коэффициент NU для воздуха, обратный восстанавливает выходы по ним. Все
+функции расчета принимают как скаляры, так и массивы NumPy одинаковой
+(или совместимой для broadcasting) формы и считают весь набор за один вызов.
+"""
+
+import re
+
+import numpy as np
+
+# Молярные массы компонентов, г/моль
+W_O2 = 32.0
+W_CO2 = 44.0
+W_CO = 28.0
+W_H2O = 18.0
+W_SOOT = 12.0
+W_HCl = 36.5
+W_N2 = 28.0
+
+# Элементы брутто-формулы топлива и их атомные массы, г/моль (согласованы
+# с молярными массами компонентов выше)
+ELEMENTS = ("C", "H", "O", "N", "Cl")
+ATOMIC_MASSES = np.array([12.0, 1.0, 16.0, 14.0, 35.5])
+
+# Мольное отношение N2/O2 в воздухе
+N2_O2_RATIO = 3.7619
+# Допуски проверки баланса реакции в FDS по умолчанию (REAC_ATOM_ERROR и
+# REAC_MASS_ERROR): невязка атомов, моль на моль топлива, и относительная
+# невязка массы
+FDS_ATOM_ERROR = 1e-5
+FDS_MASS_ERROR = 1e-4
+# Перевод дымообразующей способности (Нп*м²/кг) в массовый выход сажи
+SOOT_FACTOR = 9500.0
+# HCl с меньшим выходом не включается в PRODUCTS
+HCL_EPS = 1e-9
+
+# Входные параметры топлива в порядке полей формы
+INPUT_NAMES = (
+    "heat_release",
+    "soot_yield",
+    "o2_consumption",
+    "co2_yield",
+    "co_yield",
+    "hcl_yield",
+    "molar_mass",
+)
+
+# Компоненты PRODUCTS в порядке столбцов матрицы объемных долей
+PRODUCT_IDS = (
+    'SOOT',
+    'CARBON DIOXIDE',
+    'CARBON MONOXIDE',
+    'HYDROGEN CHLORIDE',
+    'WATER VAPOR',
+    'NITROGEN',
+)
+# Ключи результата compute_reaction для тех же столбцов
+PRODUCT_KEYS = ("V_SOOT", "V_CO2", "V_CO", "V_HCl", "V_H2O", "V_N2")
+# Число атомов ELEMENTS в компонентах PRODUCTS (строки в порядке PRODUCT_IDS)
+PRODUCT_ATOMS = np.array([
+    [1, 0, 0, 0, 0],
+    [1, 0, 2, 0, 0],
+    [1, 0, 1, 0, 0],
+    [0, 1, 0, 0, 1],
+    [0, 2, 1, 0, 0],
+    [0, 0, 0, 2, 0],
+], dtype=float)
+
+_FORMULA_RE = re.compile(r"([A-Z][a-z]?)(\d+(?:\.\d*)?|\.\d+)?")
+
+
+# Величины прямого расчета в порядке вычисления: имя -> (зависимости,
+# формула). Зависимости - входные параметры и ранее рассчитанные величины;
+# формула получает параметры p и уже рассчитанные величины r (скаляры или
+# массивы) и используется и векторным, и пошаговым расчетом (см. live)
+QUANTITIES = {
+    "V_O2": (("molar_mass", "o2_consumption"),
+             lambda p, r: (p["molar_mass"] / W_O2) * p["o2_consumption"]),
+    "V_CO2": (("molar_mass", "co2_yield"),
+              lambda p, r: (p["molar_mass"] / W_CO2) * p["co2_yield"]),
+    "V_CO": (("molar_mass", "co_yield"),
+             lambda p, r: (p["molar_mass"] / W_CO) * p["co_yield"]),
+    "V_SOOT": (("molar_mass", "soot_yield"),
+               lambda p, r: (p["molar_mass"] / W_SOOT) * (p["soot_yield"] / SOOT_FACTOR)),
+    "V_HCl": (("molar_mass", "hcl_yield"),
+              lambda p, r: (p["molar_mass"] / W_HCl) * p["hcl_yield"]),
+    # Выход воды замыкает массовый баланс продуктов
+    "Y_H2O": (("o2_consumption", "co2_yield", "co_yield", "soot_yield", "hcl_yield"),
+              lambda p, r: (1 + p["o2_consumption"] - p["co2_yield"] - p["co_yield"]
+                            - p["soot_yield"] / SOOT_FACTOR - p["hcl_yield"])),
+    "V_H2O": (("molar_mass", "Y_H2O"), lambda p, r: (p["molar_mass"] / W_H2O) * r["Y_H2O"]),
+    "V_N2": (("V_O2",), lambda p, r: N2_O2_RATIO * r["V_O2"]),
+    # Масса реагентов: -(Fuel + O2 + N2)
+    "mass_reactants": (("V_O2",), lambda p, r: -(1 + r["V_O2"] * (1 + N2_O2_RATIO * (W_N2 / W_O2)))),
+}
+
+
+def validate_value(name, value):
+    """Проверяет значение одного параметра топлива и возвращает float"""
+    if value is None or str(value).strip() == "":
+        if name == "hcl_yield":
+            return 0.0
+        raise ValueError(f"Не задано значение для {name}")
+    try:
+        value = float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        raise ValueError(f"Значение для {name} должно быть допустимым числом") from None
+    if value < 0:
+        raise ValueError(f"Значение для {name} должно быть неотрицательным")
+    if name == "molar_mass" and value <= 0:
+        raise ValueError("Значение для молярной массы должно быть положительным")
+    return value
+
+
+def validate_params(params):
+    """Проверяет параметры топлива и возвращает словарь значений float"""
+    return {name: validate_value(name, params.get(name)) for name in INPUT_NAMES}
+
+
+def valid_mask(params):
+    """Возвращает булев массив строк с допустимыми параметрами топлива"""
+    arrays = [np.asarray(params[name], dtype=float) for name in INPUT_NAMES]
+    mask = np.ones(np.broadcast_shapes(*(a.shape for a in arrays)), dtype=bool)
+    for values in arrays:
+        mask &= np.isfinite(values) & (values >= 0)
+    return mask & (np.asarray(params["molar_mass"], dtype=float) > 0)
+
+
+def compute_reaction(params):
+    """Рассчитывает объемные доли PRODUCTS и NU воздуха по параметрам топлива.
+
+    Значения params могут быть скалярами или массивами; результат содержит
+    значения той же формы.
+    """
+    # Теплота сгорания в расчет долей не входит
+    p = {name: np.asarray(params[name], dtype=float) for name in INPUT_NAMES if name != "heat_release"}
+    result = {}
+    for name, (_, formula) in QUANTITIES.items():
+        result[name] = formula(p, result)
+    return result
+
+
+def forward(params):
+    """Прямой расчет для набора топлив.
+
+    Возвращает кортеж (fractions, nu): fractions формы (..., 6) с объемными
+    долями в порядке PRODUCT_IDS и nu формы (..., 3) с коэффициентами
+    Fuel, AIR, PRODUCTS.
+    """
+    result = compute_reaction(params)
+    fractions = np.stack(np.broadcast_arrays(*(result[key] for key in PRODUCT_KEYS)), axis=-1)
+    mass_reactants = result["mass_reactants"]
+    nu = np.stack(np.broadcast_arrays(-np.ones_like(mass_reactants), mass_reactants,
+                                      np.ones_like(mass_reactants)), axis=-1)
+    return fractions, nu
+
+
+def inverse(fractions, molar_mass, nu_air=None):
+    """Обратный расчет для набора топлив.
+
+    fractions имеет форму (..., 6) в порядке PRODUCT_IDS; отсутствующие
+    компоненты задаются NaN (отсутствующий HCl означает нулевой выход).
+    Потребление кислорода берется из доли NITROGEN, а где она NaN, из
+    коэффициента nu_air. Возвращает словарь выходов в именах INPUT_NAMES.
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    molar_mass = np.asarray(molar_mass, dtype=float)
+    V_SOOT, V_CO2, V_CO, V_HCl, _, V_N2 = np.moveaxis(fractions, -1, 0)
+
+    o2_consumption = V_N2 / N2_O2_RATIO * W_O2 / molar_mass
+    if nu_air is not None:
+        o2_consumption = np.where(np.isnan(o2_consumption), o2_from_nu(nu_air, molar_mass), o2_consumption)
+
+    return {
+        "soot_yield": V_SOOT * W_SOOT / molar_mass * SOOT_FACTOR,
+        "o2_consumption": o2_consumption,
+        "co2_yield": V_CO2 * W_CO2 / molar_mass,
+        "co_yield": V_CO * W_CO / molar_mass,
+        "hcl_yield": np.where(np.isnan(V_HCl), 0.0, V_HCl * W_HCl / molar_mass),
+        "molar_mass": np.broadcast_to(molar_mass, V_SOOT.shape),
+    }
+
+
+def round_trip(fractions, molar_mass, nu_air, atoms=None):
+    """Обратный расчет выходов по записанным значениям и прямой расчет по ним.
+
+    Аргументы как у inverse; nu_air может содержать NaN, если NU воздуха
+    не записан. atoms формы (..., 5) - число атомов топлива для реакций с
+    замкнутым балансом (см. close_balance), NaN для остальных. Возвращает
+    кортеж (fractions, nu_air) пересчитанных значений той же формы: при
+    согласованных прямом и обратном расчете они совпадают с исходными до
+    округления записи. Доля WATER VAPOR в обратный расчет не входит и
+    проверяет массовый баланс продуктов (баланс атомов водорода).
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    params = inverse(fractions, molar_mass, nu_air)
+    params["heat_release"] = 0.0
+    recomputed, nu = forward(params)
+    nu = nu[..., 1]
+    if atoms is not None:
+        atoms = np.asarray(atoms, dtype=float)
+        balanced = ~np.isnan(atoms).any(axis=-1)
+        if balanced.any():
+            # Потребление кислорода, H2O и N2 снова подбираются по балансу
+            result = close_balance(params, atoms)
+            closed = np.stack(np.broadcast_arrays(*(result[key] for key in PRODUCT_KEYS)), axis=-1)
+            recomputed = np.where(balanced[..., None], closed, recomputed)
+            nu = np.where(balanced, result["nu_air"], nu)
+    # Отсутствующий в PRODUCTS HCl остается отсутствующим
+    hcl = PRODUCT_IDS.index('HYDROGEN CHLORIDE')
+    recomputed[..., hcl] = np.where(np.isnan(fractions[..., hcl]), np.nan, recomputed[..., hcl])
+    return recomputed, nu
+
+
+# Неизвестные подбора: молярная масса m и произведения m на выходы (сажа -
+# на массовый выход, деленный на SOOT_FACTOR); в них доли PRODUCTS, NU
+# воздуха и MW линейны. Строки - наблюдения: доли в порядке PRODUCT_IDS,
+# NU воздуха + 1 и MW
+_K_AIR = (1 + N2_O2_RATIO * (W_N2 / W_O2)) / W_O2
+FIT_MATRIX = np.array([
+    # m, сажа, O2, CO2, CO, HCl
+    [0, 1 / W_SOOT, 0, 0, 0, 0],
+    [0, 0, 0, 1 / W_CO2, 0, 0],
+    [0, 0, 0, 0, 1 / W_CO, 0],
+    [0, 0, 0, 0, 0, 1 / W_HCl],
+    [1 / W_H2O, -1 / W_H2O, 1 / W_H2O, -1 / W_H2O, -1 / W_H2O, -1 / W_H2O],
+    [0, 0, N2_O2_RATIO / W_O2, 0, 0, 0],
+    [0, 0, -_K_AIR, 0, 0, 0],
+    [1, 0, 0, 0, 0, 0],
+])
+# Выходы в порядке столбцов FIT_MATRIX после m и их множители
+FIT_YIELDS = ("soot_yield", "o2_consumption", "co2_yield", "co_yield", "hcl_yield")
+_FIT_SCALES = np.array([SOOT_FACTOR, 1.0, 1.0, 1.0, 1.0])
+# Наименьшее значение, к которому относится погрешность наблюдения
+FIT_FLOOR = 1e-9
+# Веса относительных погрешностей наблюдений (строк FIT_MATRIX): MW
+# задается напрямую и считается точным, NU записывается с 4 знаками и
+# уступает долям при расхождении. Вес важен только при противоречии
+# наблюдений: единственное наблюдение величины воспроизводится точно
+FIT_WEIGHTS = np.array([1.0] * len(PRODUCT_IDS) + [1e-2, 1e2])
+
+
+def fit_inverse(fractions, molar_mass=np.nan, nu_air=np.nan, weights=FIT_WEIGHTS):
+    """Обратный расчет методом наименьших квадратов по любому набору наблюдений.
+
+    fractions формы (..., 6) в порядке PRODUCT_IDS, molar_mass и nu_air -
+    записанные значения; неизвестные задаются NaN. Подбираются молярная
+    масса и выходы, при которых прямой расчет наилучшим образом (по
+    относительным погрешностям) воспроизводит известные значения, с
+    ограничениями как при вводе: выходы неотрицательны, молярная масса
+    положительна. Так потребление кислорода без NITROGEN и NU
+    восстанавливается по доле WATER VAPOR (массовый баланс продуктов), а
+    молярная масса без MW - по всем долям. Все наборы ограничений
+    (выход на нуле или свободен) перебираются векторно для всех топлив
+    сразу. Возвращает словарь выходов и molar_mass (NaN, где наблюдений
+    недостаточно для однозначного ответа) и residual - среднеквадратичную
+    взвешенную относительную погрешность известных значений. weights - веса
+    наблюдений в порядке строк FIT_MATRIX.
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    shape = fractions.shape[:-1]
+    observed = np.concatenate([
+        fractions.reshape(-1, len(PRODUCT_IDS)),
+        np.broadcast_to(np.asarray(nu_air, dtype=float) + 1, shape).reshape(-1, 1),
+        np.broadcast_to(np.asarray(molar_mass, dtype=float), shape).reshape(-1, 1),
+    ], axis=1)
+    known = ~np.isnan(observed)
+    # Наблюдения нормируются на свои значения (NU - на |NU|)
+    magnitude = np.abs(observed)
+    magnitude[:, -2] = np.abs(observed[:, -2] - 1)
+    weights = np.where(known, np.asarray(weights, dtype=float) / np.maximum(magnitude, FIT_FLOOR), 0.0)
+    matrix = weights[:, :, None] * FIT_MATRIX
+    target = np.where(known, observed * weights, 0.0)
+    # Столбцы нормируются для обусловленности; решение делится на norms
+    norms = np.sqrt((matrix ** 2).sum(axis=1))
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms[:, None, :]
+
+    best = np.full((len(observed), FIT_MATRIX.shape[1]), np.nan)
+    best_residual = np.full(len(observed), np.inf)
+    rows = np.arange(len(observed))
+    count = len(FIT_YIELDS)
+    for active in range(1 << count):
+        # Выходы с установленным битом закреплены на нижней границе (нуле)
+        free = np.array([True] + [not active >> i & 1 for i in range(count)])
+        solution = (np.linalg.pinv(matrix[rows] * free) @ target[rows, :, None])[:, :, 0]
+        residual = (((matrix[rows] @ solution[:, :, None])[:, :, 0] - target[rows]) ** 2).sum(axis=1)
+        feasible = (solution[:, 0] > 0) & (solution[:, 1:] >= -1e-12 * np.abs(solution[:, :1])).all(axis=1)
+        better = feasible & (residual < best_residual[rows] * (1 - 1e-9))
+        best[rows[better]] = np.maximum(solution[better], 0.0)
+        best_residual[rows[better]] = residual[better]
+        if not active:
+            # Допустимое решение без ограничений - оптимум; перебор нужен остальным
+            rows = rows[~feasible]
+        if not len(rows):
+            break
+
+    best = best / norms
+    # Величина определена, если ее единичный вектор лежит в пространстве строк
+    projection = np.linalg.pinv(matrix) @ matrix
+    determined = np.abs(np.diagonal(projection, axis1=1, axis2=2) - 1) < 1e-6
+    mass = np.where(determined[:, 0], best[:, 0], np.nan)
+    result = {}
+    for i, name in enumerate(FIT_YIELDS):
+        values = best[:, i + 1] / mass * _FIT_SCALES[i]
+        result[name] = np.where(determined[:, i + 1], values, np.nan).reshape(shape)
+    result["molar_mass"] = mass.reshape(shape)
+    n_known = known.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        rms = np.sqrt(best_residual / n_known)
+    result["residual"] = np.where(n_known > 0, rms, np.nan).reshape(shape)
+    return result
+
+
+def products_composition(params, result):
+    """Возвращает ID и объемные доли компонентов SPEC PRODUCTS"""
+    spec_ids = ['SOOT', 'CARBON DIOXIDE', 'CARBON MONOXIDE']
+    fractions = [result["V_SOOT"], result["V_CO2"], result["V_CO"]]
+    if params["hcl_yield"] > HCL_EPS:
+        spec_ids.append('HYDROGEN CHLORIDE')
+        fractions.append(result["V_HCl"])
+    spec_ids.extend(['WATER VAPOR', 'NITROGEN'])
+    fractions.extend([result["V_H2O"], result["V_N2"]])
+    return spec_ids, fractions
+
+
+def yields_from_products(products, molar_mass):
+    """Восстанавливает выходы по объемным долям PRODUCTS (словарь ID -> доля)"""
+    yields = {}
+    V_SOOT = products.get('SOOT')
+    V_CO2 = products.get('CARBON DIOXIDE')
+    V_CO = products.get('CARBON MONOXIDE')
+    V_HCl = products.get('HYDROGEN CHLORIDE')
+    V_N2 = products.get('NITROGEN')
+    if V_SOOT is not None:
+        yields['soot_yield'] = V_SOOT * W_SOOT / molar_mass * SOOT_FACTOR
+    if V_CO2 is not None:
+        yields['co2_yield'] = V_CO2 * W_CO2 / molar_mass
+    if V_CO is not None:
+        yields['co_yield'] = V_CO * W_CO / molar_mass
+    # Отсутствие HCl в PRODUCTS означает нулевой выход
+    yields['hcl_yield'] = V_HCl * W_HCl / molar_mass if V_HCl is not None else 0.0
+    if V_N2 is not None:
+        yields['o2_consumption'] = V_N2 / N2_O2_RATIO * W_O2 / molar_mass
+    return yields
+
+
+def o2_from_nu(mass_reactants, molar_mass):
+    """Восстанавливает потребление кислорода по коэффициенту NU воздуха"""
+    mass_reactants = np.asarray(mass_reactants, dtype=float)
+    V_O2 = -1 * (mass_reactants + 1) / (1 + N2_O2_RATIO * (W_N2 / W_O2))
+    return V_O2 * W_O2 / molar_mass
+
+
+def parse_formula(text):
+    """Разбирает брутто-формулу топлива ('C3H8', 'C6.3H7.1O2.1N0.1Cl0.05').
+
+    Возвращает массив числа атомов в порядке ELEMENTS; выбрасывает
+    ValueError при неверной записи или элементе не из ELEMENTS.
+    """
+    formula = text.strip().replace(" ", "")
+    atoms = np.zeros(len(ELEMENTS))
+    position = 0
+    while position < len(formula):
+        match = _FORMULA_RE.match(formula, position)
+        if match is None or match.group(1) not in ELEMENTS:
+            raise ValueError(f"Неверная брутто-формула '{text}' (допустимы элементы: {', '.join(ELEMENTS)})")
+        atoms[ELEMENTS.index(match.group(1))] += float(match.group(2)) if match.group(2) else 1.0
+        position = match.end()
+    if not atoms.any():
+        raise ValueError(f"Неверная брутто-формула '{text}'")
+    return atoms
+
+
+def formula_mass(atoms):
+    """Молярная масса топлива по числу атомов (в порядке ELEMENTS)"""
+    return np.asarray(atoms, dtype=float) @ ATOMIC_MASSES
+
+
+def atom_residuals(atoms, fractions, V_O2):
+    """Невязки баланса атомов на моль топлива: реагенты минус продукты.
+
+    atoms формы (..., 5) в порядке ELEMENTS, fractions формы (..., 6) -
+    моли компонентов PRODUCTS на моль топлива (NaN - компонент
+    отсутствует), V_O2 - моли кислорода воздуха. Невязка массы (г на моль
+    топлива) равна невязкам, умноженным на ATOMIC_MASSES.
+    """
+    V_O2 = np.asarray(V_O2, dtype=float)
+    reactants = np.array(atoms, dtype=float)
+    reactants = reactants + np.stack(np.broadcast_arrays(
+        0 * V_O2, 0 * V_O2, 2 * V_O2, 2 * N2_O2_RATIO * V_O2, 0 * V_O2), axis=-1)
+    return reactants - np.nan_to_num(np.asarray(fractions, dtype=float)) @ PRODUCT_ATOMS
+
+
+def close_balance(params, atoms):
+    """Прямой расчет с замыканием баланса атомов для топлива известного состава.
+
+    Выходы SOOT, CO2, CO и HCl берутся из params, а свободные компоненты
+    подбираются по балансу: WATER VAPOR - по водороду, потребление
+    кислорода - по кислороду, NITROGEN - по азоту воздуха и топлива.
+    Невязки по углероду и хлору определяются заданными выходами и
+    остаются. Молярная масса берется по формуле. Возвращает словарь
+    величин как у compute_reaction (с замкнутыми V_H2O, V_O2, V_N2) и
+    ключами o2_consumption, nu_air и nu_products - коэффициенты NU в молях
+    смесей AIR и PRODUCTS (FDS нормирует их объемные доли), residuals_before
+    - невязки при исходных параметрах и residuals - после замыкания.
+    """
+    atoms = np.asarray(atoms, dtype=float)
+    C, H, O, N, Cl = np.moveaxis(atoms, -1, 0)
+    params = dict(params, molar_mass=formula_mass(atoms))
+    result = compute_reaction(params)
+    fractions = np.stack(np.broadcast_arrays(*(result[key] for key in PRODUCT_KEYS)), axis=-1)
+    result["residuals_before"] = atom_residuals(atoms, fractions, result["V_O2"])
+
+    result["V_H2O"] = (H - result["V_HCl"]) / 2
+    result["V_O2"] = (2 * result["V_CO2"] + result["V_CO"] + result["V_H2O"] - O) / 2
+    result["V_N2"] = N2_O2_RATIO * result["V_O2"] + N / 2
+    result["Y_H2O"] = result["V_H2O"] * W_H2O / params["molar_mass"]
+    result["o2_consumption"] = result["V_O2"] * W_O2 / params["molar_mass"]
+    result["mass_reactants"] = -(1 + result["V_O2"] * (1 + N2_O2_RATIO * (W_N2 / W_O2)))
+    fractions = np.stack(np.broadcast_arrays(*(result[key] for key in PRODUCT_KEYS)), axis=-1)
+    result["residuals"] = atom_residuals(atoms, fractions, result["V_O2"])
+    result["nu_air"] = -result["V_O2"] * (1 + N2_O2_RATIO)
+    result["nu_products"] = fractions.sum(axis=-1)
+    result["molar_mass"] = params["molar_mass"]
+    return result
+
+
+def balance_violations(residuals, molar_mass):
+    """Невязки, с которыми FDS остановится на проверке баланса реакции.
+
+    residuals - невязки атомов одной реакции в порядке ELEMENTS (см.
+    atom_residuals). Возвращает список строк 'элемент невязка' (моль на
+    моль топлива) и 'масса NN%' для невязок, превышающих FDS_ATOM_ERROR и
+    FDS_MASS_ERROR; пустой список - баланс проходит проверку.
+    """
+    residuals = np.asarray(residuals, dtype=float)
+    violations = [f"{element} {value:.4g}" for element, value in zip(ELEMENTS, residuals)
+                  if not abs(value) <= FDS_ATOM_ERROR]
+    mass = float(residuals @ ATOMIC_MASSES) / molar_mass
+    if not abs(mass) <= FDS_MASS_ERROR:
+        violations.append(f"масса {mass:.2%}")
+    return violations
+
@@ -0,0 +1,265 @@
+"""Анализ неопределенности: расчет множества вариантов топлива методом Монте-Карло.
+
+Каждый входной параметр формы задается числом или распределением, варианты
+генерируются и рассчитываются пачками по CHUNK_SIZE одним векторным вызовом.
+Результат сохраняется не текстовыми блоками, а по столбцам в двоичном
+формате NumPy (.npz):
+
+    inputs       (N, 7)  параметры вариантов в порядке stoich.INPUT_NAMES
+    fractions    (N, 6)  объемные доли PRODUCTS в порядке stoich.PRODUCT_IDS
+    nu           (N, 3)  коэффициенты NU (Fuel, AIR, PRODUCTS)
+    valid        (N,)    допустимость параметров варианта (stoich.valid_mask)
+    sensitivity  (7, 7)  коэффициенты корреляции Пирсона входов (строки) и
+                         выходов (столбцы: доли PRODUCTS и NU воздуха) по
+                         допустимым вариантам; NaN для постоянных входов
+                         и выходов
+
+Блок SPEC/REAC любого варианта восстанавливается по его строке inputs
+(fdsio.format_reac_block).
+"""
+
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from . import fdsio, library, splice, stoich
+
+CHUNK_SIZE = 1 << 17
+OUTPUT_NAMES = stoich.PRODUCT_IDS + ("AIR NU",)
+
+# Распределения и число их параметров
+DISTRIBUTIONS = {
+    "uniform": 2,      # нижняя и верхняя границы
+    "normal": 2,       # среднее и стандартное отклонение
+    "lognormal": 2,    # среднее и отклонение логарифма величины
+    "triangular": 3,   # нижняя граница, мода, верхняя граница
+}
+
+
+def parse_distribution(text):
+    """Разбирает распределение вида 'uniform:0.05,0.15' или постоянное значение.
+
+    Возвращает кортеж (вид, параметры); для числа вид равен 'fixed'.
+    Выбрасывает ValueError при неверной записи.
+    """
+    kind, sep, args = text.partition(":")
+    kind = kind.strip().lower()
+    if not sep:
+        try:
+            return "fixed", (float(text),)
+        except ValueError:
+            raise ValueError(f"Неверное значение или распределение '{text}'") from None
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"Неизвестное распределение '{kind}' (допустимы: {', '.join(DISTRIBUTIONS)})")
+    try:
+        values = tuple(float(value) for value in args.split(","))
+    except ValueError:
+        raise ValueError(f"Неверные параметры распределения '{text}'") from None
+    if len(values) != DISTRIBUTIONS[kind]:
+        raise ValueError(f"Распределение {kind} требует параметров: {DISTRIBUTIONS[kind]}")
+    if kind == "uniform" and values[0] > values[1]:
+        raise ValueError(f"Нижняя граница больше верхней в '{text}'")
+    if kind == "triangular" and not values[0] <= values[1] <= values[2]:
+        raise ValueError(f"Мода вне границ в '{text}'")
+    if kind in ("normal", "lognormal") and values[1] < 0:
+        raise ValueError(f"Отрицательное отклонение в '{text}'")
+    return kind, values
+
+
+def draw(rng, distribution, size):
+    """Выборка заданного размера из распределения (см. parse_distribution)"""
+    kind, args = distribution
+    if kind == "fixed":
+        return np.full(size, args[0])
+    return getattr(rng, kind)(*args, size=size)
+
+
+class _Moments:
+    """Накопление ковариаций входов и выходов по пачкам (попарное объединение Чана)"""
+
+    # Величина с отклонением меньше этой доли среднего считается постоянной:
+    # средние пачек постоянной величины различаются ошибками округления
+    CONSTANT_RTOL = 1e-9
+
+    def __init__(self, nx, ny):
+        self.n = 0
+        self.mean_x = np.zeros(nx)
+        self.mean_y = np.zeros(ny)
+        self.sxx = np.zeros(nx)
+        self.syy = np.zeros(ny)
+        self.sxy = np.zeros((nx, ny))
+
+    def update(self, x, y):
+        n = len(x)
+        if not n:
+            return
+        mean_x, mean_y = x.mean(axis=0), y.mean(axis=0)
+        dx, dy = x - mean_x, y - mean_y
+        total = self.n + n
+        delta_x, delta_y = mean_x - self.mean_x, mean_y - self.mean_y
+        weight = self.n * n / total
+        self.sxx += (dx * dx).sum(axis=0) + delta_x * delta_x * weight
+        self.syy += (dy * dy).sum(axis=0) + delta_y * delta_y * weight
+        self.sxy += dx.T @ dy + np.outer(delta_x, delta_y) * weight
+        self.mean_x += delta_x * n / total
+        self.mean_y += delta_y * n / total
+        self.n = total
+
+    def correlation(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = self.sxy / np.sqrt(np.outer(self.sxx, self.syy))
+        # Постоянные входы и выходы не имеют корреляции (вместо деления 0/0)
+        result[self._constant(self.sxx, self.mean_x)] = np.nan
+        result[:, self._constant(self.syy, self.mean_y)] = np.nan
+        return result
+
+    def _constant(self, squares, mean):
+        return squares <= self.n * (self.CONSTANT_RTOL * mean) ** 2
+
+
+def run_sweep(distributions, samples, output_path, seed=None, chunk_size=CHUNK_SIZE, progress=None):
+    """Рассчитывает samples вариантов и сохраняет их в output_path (.npz).
+
+    distributions - словарь имя параметра -> распределение (parse_distribution)
+    для всех INPUT_NAMES. Столбцы заполняются пачками через отображенные в
+    память файлы .npy рядом с результатом, так что память не зависит от
+    числа вариантов; готовый архив атомарно заменяет output_path.
+    progress(done, total) вызывается после каждой пачки. Возвращает
+    статистику расчета.
+    """
+    missing = [name for name in stoich.INPUT_NAMES if name not in distributions]
+    if missing:
+        raise ValueError(f"Не заданы значения параметров: {', '.join(missing)}")
+    if samples <= 0:
+        raise ValueError("Число вариантов должно быть положительным")
+    rng = np.random.default_rng(seed)
+    directory = os.path.dirname(os.path.abspath(output_path))
+    start = time.perf_counter()
+    moments = _Moments(len(stoich.INPUT_NAMES), len(OUTPUT_NAMES))
+    valid_count = 0
+
+    with tempfile.TemporaryDirectory(dir=directory, prefix=".sweep.") as tmp_dir:
+        def column(name, shape, dtype=np.float64):
+            path = os.path.join(tmp_dir, name + ".npy")
+            return path, np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+        columns = {
+            "inputs": column("inputs", (samples, len(stoich.INPUT_NAMES))),
+            "fractions": column("fractions", (samples, len(stoich.PRODUCT_IDS))),
+            "nu": column("nu", (samples, 3)),
+            "valid": column("valid", (samples,), np.bool_),
+        }
+        inputs, fractions_out, nu_out, valid_out = (columns[key][1] for key in ("inputs", "fractions", "nu", "valid"))
+
+        for offset in range(0, samples, chunk_size):
+            size = min(chunk_size, samples - offset)
+            rows = slice(offset, offset + size)
+            params = {name: draw(rng, distributions[name], size) for name in stoich.INPUT_NAMES}
+            fractions, nu = stoich.forward(params)
+            valid = stoich.valid_mask(params)
+
+            chunk_inputs = np.column_stack([params[name] for name in stoich.INPUT_NAMES])
+            inputs[rows] = chunk_inputs
+            fractions_out[rows] = fractions
+            nu_out[rows] = nu
+            valid_out[rows] = valid
+            valid_count += int(valid.sum())
+            moments.update(chunk_inputs[valid], np.column_stack([fractions, nu[:, 1]])[valid])
+            if progress is not None:
+                progress(offset + size, samples)
+
+        sensitivity = moments.correlation()
+        # Отображения закрываются до упаковки (иначе в Windows не удалить каталог)
+        for _, array in columns.values():
+            array.flush()
+        del inputs, fractions_out, nu_out, valid_out, array
+        columns = {key: path for key, (path, _) in columns.items()}
+        for name, value in (
+                ("sensitivity", sensitivity),
+                ("input_names", np.array(stoich.INPUT_NAMES)),
+                ("product_ids", np.array(stoich.PRODUCT_IDS)),
+                ("output_names", np.array(OUTPUT_NAMES))):
+            path = os.path.join(tmp_dir, name + ".npy")
+            np.save(path, value)
+            columns[name] = path
+
+        # Архив .npz - это ZIP с файлами .npy; столбцы переносятся в него потоком
+        tmp = splice.atomic_writer(output_path)
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for key, path in columns.items():
+                    archive.write(path, key + ".npy")
+            splice.commit(tmp, output_path, output_path)
+        except BaseException:
+            splice.discard(tmp)
+            raise
+
+    elapsed = time.perf_counter() - start
+    return {
+        "samples": samples,
+        "valid": valid_count,
+        "sensitivity": sensitivity,
+        "elapsed": elapsed,
+        "samples_per_second": samples / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def base_params(args):
+    """Исходные значения параметров из командной строки (или пустой словарь)"""
+    if args.fuel:
+        return dict(zip(stoich.INPUT_NAMES, args.fuel))
+    if args.library_fuel:
+        return library.load_fuel(args.library_fuel)["params"]
+    if args.from_file:
+        summary = fdsio.summarize_fds(args.from_file)
+        if summary.get("error"):
+            raise fdsio.FDSParseError(summary["error"])
+        return stoich.validate_params(summary["params"])
+    return {}
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду sweep"""
+    parser = subparsers.add_parser("sweep", help="Расчет вариантов топлива методом Монте-Карло")
+    parser.add_argument("output", help="Файл результатов (.npz)")
+    parser.add_argument("-n", "--samples", type=int, required=True, help="Число вариантов")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--fuel", nargs=7, type=float, metavar=tuple(stoich.INPUT_NAMES),
+                        help="Исходные параметры топлива в порядке полей формы")
+    source.add_argument("--library-fuel", metavar="NAME", help="Исходное топливо из библиотеки")
+    source.add_argument("--from-file", metavar="FDS", help="Исходные параметры из файла FDS")
+    parser.add_argument("--vary", action="append", default=[], metavar="NAME=DIST",
+                        help="Распределение параметра, например soot_yield=uniform:0.05,0.15 "
+                             "(normal:mu,sigma, lognormal:mu,sigma, triangular:a,mode,b или число)")
+    parser.add_argument("--seed", type=int, default=None, help="Начальное значение генератора")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Вариантов в одной пачке")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    try:
+        distributions = {name: ("fixed", (float(value),)) for name, value in base_params(args).items()}
+        for item in args.vary:
+            name, sep, text = item.partition("=")
+            if not sep or name.strip() not in stoich.INPUT_NAMES:
+                raise ValueError(f"Неверный параметр '{item}' (ожидается ИМЯ=РАСПРЕДЕЛЕНИЕ, "
+                                 f"ИМЯ из: {', '.join(stoich.INPUT_NAMES)})")
+            distributions[name.strip()] = parse_distribution(text)
+        stats = run_sweep(distributions, args.samples, args.output, args.seed, max(1, args.chunk_size))
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+
+    print(f"Вариантов: {stats['samples']}, допустимых: {stats['valid']}, время: {stats['elapsed']:.2f} с, "
+          f"{stats['samples_per_second']:.0f} вар./с", file=sys.stderr)
+    # Таблица чувствительности для варьируемых параметров
+    print("\t".join(("parameter",) + OUTPUT_NAMES))
+    for name, row in zip(stoich.INPUT_NAMES, stats["sensitivity"]):
+        if distributions[name][0] != "fixed":
+            print("\t".join([name] + [f"{value:.4f}" for value in row]))
+    return 0
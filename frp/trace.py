@@ -0,0 +1,205 @@
+"""Трассировка этапов импорта, расчета и сохранения.
+
+Включается переменной окружения FRP_TRACE с путем к файлу трассы (или
+вызовом enable). Этапы размечаются участками span и счетчиками count; при
+выходе из процесса трасса записывается в формате Chrome Trace Event
+(открывается в chrome://tracing или ui.perfetto.dev), а сводная таблица
+по этапам выводится в stderr. Без трассировки span возвращает общий
+пустой объект, а count ничего не делает, поэтому разметка остается в
+коде постоянно; участки ставятся вокруг этапов, а не отдельных групп
+файла, а число обработанных групп и байтов учитывается счетчиками.
+Записываются только участки основного процесса: работа пула процессов
+видна как ожидание внутри участка, из которого пул запущен.
+"""
+
+import atexit
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "FRP_TRACE"
+
+# Путь к файлу трассы; None - трассировка выключена
+_path = None
+_origin = time.perf_counter_ns()
+# Участки (name, начало, длительность в нс, поток, args) и значения
+# счетчиков (name, время, значение) в порядке завершения
+_spans = []
+_counts = []
+_counters = {}
+_threads = {}
+_lock = threading.Lock()
+_registered = False
+
+
+class _NullSpan:
+    """Участок при выключенной трассировке"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Участок трассы: время от входа в блок with до выхода из него"""
+
+    __slots__ = ("name", "args", "_start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        thread = threading.get_native_id()
+        if thread not in _threads:
+            _threads[thread] = threading.current_thread().name
+        _spans.append((self.name, self._start, end - self._start, thread, self.args))
+        return False
+
+    def set(self, **args):
+        """Добавляет аргументы участка, известные только после входа в него"""
+        self.args.update(args)
+
+
+def enabled():
+    """True, если трассировка включена"""
+    return _path is not None
+
+
+def span(name, **args):
+    """Участок трассы для блока with; args - значения, показываемые в трассе"""
+    if _path is None:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+def count(name, value=1):
+    """Увеличивает счетчик name на value"""
+    if _path is None:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + value
+        _counts.append((name, time.perf_counter_ns(), total))
+
+
+def enable(path):
+    """Включает трассировку с записью в path при выходе из процесса"""
+    global _path, _registered
+    _path = path
+    if not _registered:
+        _registered = True
+        atexit.register(_finish)
+
+
+def events():
+    """События трассы в формате Chrome Trace Event (список словарей)"""
+    pid = os.getpid()
+    result = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": name}}
+              for thread, name in list(_threads.items())]
+    for name, start, duration, thread, args in list(_spans):
+        result.append({"name": name, "cat": "frp", "ph": "X", "ts": (start - _origin) / 1000,
+                       "dur": duration / 1000, "pid": pid, "tid": thread, "args": args})
+    for name, moment, total in list(_counts):
+        result.append({"name": name, "cat": "frp", "ph": "C", "ts": (moment - _origin) / 1000,
+                       "pid": pid, "args": {"value": total}})
+    return result
+
+
+def write(path=None):
+    """Записывает трассу в path (по умолчанию в файл, заданный при включении)"""
+    with open(path or _path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events(), "displayTimeUnit": "ms"}, file, default=str)
+
+
+def summarize(trace_events):
+    """Сводка по событиям трассы: (участки, счетчики).
+
+    Участки - список (имя, вызовов, всего мс, среднее мс, максимум мс)
+    по убыванию общего времени, счетчики - словарь имя -> итоговое
+    значение.
+    """
+    totals = {}
+    counters = {}
+    for event in trace_events:
+        if event.get("ph") == "X":
+            entry = totals.setdefault(event["name"], [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event["dur"] / 1000
+            entry[2] = max(entry[2], event["dur"] / 1000)
+        elif event.get("ph") == "C":
+            counters[event["name"]] = event["args"]["value"]
+    rows = [(name, calls, total, total / calls, peak) for name, (calls, total, peak) in totals.items()]
+    rows.sort(key=lambda row: -row[2])
+    return rows, counters
+
+
+def format_summary(rows, counters):
+    """Таблица сводки (см. summarize)"""
+    width = max([len(row[0]) for row in rows] + [len(name) for name in counters] + [len("Участок")])
+    lines = [f"{'Участок':<{width}}  {'вызовов':>8}  {'всего, мс':>11}  {'среднее, мс':>11}  {'макс., мс':>11}"]
+    for name, calls, total, mean, peak in rows:
+        lines.append(f"{name:<{width}}  {calls:>8}  {total:>11.3f}  {mean:>11.3f}  {peak:>11.3f}")
+    if counters:
+        lines.append("")
+        lines.append(f"{'Счетчик':<{width}}  {'значение':>8}")
+        lines.extend(f"{name:<{width}}  {value:>8}" for name, value in sorted(counters.items()))
+    return "\n".join(lines)
+
+
+def _finish():
+    # Дочерние процессы пула наследуют переменную окружения, но трассу
+    # записывает только основной процесс
+    if _path is None or multiprocessing.parent_process() is not None:
+        return
+    try:
+        write()
+    except OSError as e:
+        print(f"Ошибка: Не удалось записать трассу {_path}: {e}", file=sys.stderr)
+        return
+    print(f"Трасса записана: {_path}", file=sys.stderr)
+    print(format_summary(*summarize(events())), file=sys.stderr)
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду trace"""
+    parser = subparsers.add_parser("trace", help=f"Показать сводку трассы, записанной с {ENV_VAR}")
+    parser.add_argument("path", help="Файл трассы (JSON)")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    try:
+        with open(args.path, encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    trace_events = data.get("traceEvents", []) if isinstance(data, dict) else data
+    print(format_summary(*summarize(trace_events)))
+    return 0
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
@@ -0,0 +1,152 @@
+"""Проверка согласованности прямого и обратного расчета для множества файлов.
+
+Для каждой реакции каждого файла по записанным долям PRODUCTS и NU
+воздуха обратным расчетом восстанавливаются выходы (как при импорте в
+форму), по ним прямым расчетом заново получаются доли и NU, и результат
+сравнивается с записанным. Значения всех файлов собираются в массивы и
+пересчитываются одним векторным вызовом (stoich.round_trip). Выводится
+наибольшая относительная погрешность по каждому компоненту; файлы с
+погрешностью больше допустимой перечисляются, а код возврата позволяет
+использовать проверку как фильтр перед отправкой расчетов.
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from . import batch, cache, scan, stoich
+
+# Проверяемые величины: доли PRODUCTS в порядке stoich.PRODUCT_IDS и NU воздуха
+COLUMNS = stoich.PRODUCT_IDS + ("AIR NU",)
+# NU воздуха записывается с 4 знаками после запятой
+DEFAULT_TOLERANCE = 1e-4
+
+
+def collect(files, reac_cache=None):
+    """Собирает записанные значения всех реакций файлов.
+
+    Возвращает кортеж (rows, fractions, molar_mass, nu_air, atoms, errors):
+    rows - пары (путь, ID топлива) для строк массивов, fractions формы
+    (N, 6) с NaN для отсутствующих компонентов, atoms формы (N, 5) - число
+    атомов топлива для реакций с замкнутым балансом и NaN для остальных,
+    errors - пары (путь, сообщение) для файлов и реакций, которые
+    проверить нельзя.
+    """
+    rows, fractions, molar_mass, nu_air, atoms, errors = [], [], [], [], [], []
+    for path, summary in scan.scan_files(files, reac_cache):
+        reactions = summary.get("reactions") or []
+        if not reactions:
+            errors.append((path, summary.get("error") or "Не найдена группа REAC"))
+            continue
+        for reaction in reactions:
+            label = f"{path} [{reaction['fuel_id']}]" if len(reactions) > 1 else path
+            if reaction.get("error"):
+                errors.append((label, reaction["error"]))
+                continue
+            products = reaction.get("products") or {}
+            if not products:
+                errors.append((label, f"Не найден состав смеси '{reaction['products_id']}'"))
+                continue
+            rows.append((path, reaction["fuel_id"]))
+            fractions.append([products.get(spec_id, np.nan) for spec_id in stoich.PRODUCT_IDS])
+            molar_mass.append(reaction["params"]["molar_mass"])
+            nu_air.append(np.nan if reaction.get("nu_air") is None else reaction["nu_air"])
+            atoms.append(stoich.parse_formula(reaction["formula"]) if reaction.get("balanced")
+                         else np.full(len(stoich.ELEMENTS), np.nan))
+    return (rows, np.array(fractions, dtype=float).reshape(-1, len(stoich.PRODUCT_IDS)),
+            np.array(molar_mass, dtype=float), np.array(nu_air, dtype=float),
+            np.array(atoms, dtype=float).reshape(-1, len(stoich.ELEMENTS)), errors)
+
+
+def relative_errors(fractions, molar_mass, nu_air, atoms=None):
+    """Относительные погрешности пересчета формы (N, 7) в порядке COLUMNS.
+
+    Для отсутствующих в файле величин - NaN; для записанных величин,
+    которые не удалось пересчитать (например, без доли SOOT) - inf. Для
+    нулевых записанных значений берется абсолютная погрешность. Для
+    реакций с замкнутым балансом (atoms, см. stoich.round_trip) WATER
+    VAPOR, NITROGEN и NU воздуха проверяются по балансу атомов.
+    """
+    written = np.column_stack([fractions, nu_air])
+    recomputed, recomputed_nu = stoich.round_trip(fractions, molar_mass, nu_air, atoms)
+    recomputed = np.column_stack([recomputed, recomputed_nu])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error = np.abs(recomputed - written)
+        error = np.where(written != 0, error / np.abs(written), error)
+    error[np.isnan(error) & ~np.isnan(written)] = np.inf
+    return error
+
+
+def verify_files(files, tolerance=DEFAULT_TOLERANCE, reac_cache=None):
+    """Проверяет файлы и возвращает отчет (словарь, пригодный для JSON).
+
+    Отчет содержит число проверенных реакций, для каждой величины
+    наибольшую погрешность и файл, где она достигается, список failed
+    реакций с погрешностью больше tolerance и список errors непроверенных.
+    """
+    rows, fractions, molar_mass, nu_air, atoms, errors = collect(files, reac_cache)
+    error = relative_errors(fractions, molar_mass, nu_air, atoms)
+    report = {"files": len(files), "reactions": len(rows), "tolerance": tolerance, "species": {}, "failed": [],
+              "errors": [{"path": path, "error": message} for path, message in errors]}
+    checked = np.where(np.isnan(error), -1.0, error)
+    for column, name in enumerate(COLUMNS):
+        worst = int(np.argmax(checked[:, column])) if len(rows) else 0
+        if not len(rows) or checked[worst, column] < 0:
+            report["species"][name] = {"max_error": None, "path": None}
+            continue
+        report["species"][name] = {"max_error": float(error[worst, column]), "path": rows[worst][0]}
+    for index in np.flatnonzero((checked > tolerance).any(axis=1)):
+        path, fuel_id = rows[index]
+        bad = {name: float(error[index, column]) for column, name in enumerate(COLUMNS)
+               if checked[index, column] > tolerance}
+        report["failed"].append({"path": path, "fuel_id": fuel_id, "errors": bad})
+    return report
+
+
+def format_report(report):
+    """Текст отчета: непроверенные и несогласованные реакции и таблица погрешностей"""
+    lines = [f"Ошибка: {item['path']}: {item['error']}" for item in report["errors"]]
+    for item in report["failed"]:
+        details = ", ".join(f"{name} {value:.3g}" for name, value in item["errors"].items())
+        lines.append(f"Несогласовано: {item['path']} [{item['fuel_id']}]: {details}")
+    lines.append("\t".join(("species", "max_error", "path")))
+    for name, item in report["species"].items():
+        value = "" if item["max_error"] is None else f"{item['max_error']:.3g}"
+        lines.append("\t".join((name, value, item["path"] or "")))
+    return "\n".join(lines)
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду verify"""
+    parser = subparsers.add_parser("verify", help="Проверить согласованность PRODUCTS и NU в файлах FDS")
+    parser.add_argument("paths", nargs="+", help="Файлы, каталоги или glob-шаблоны (** рекурсивно)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Допустимая относительная погрешность (по умолчанию {DEFAULT_TOLERANCE:g})")
+    parser.add_argument("--json", action="store_true", help="Вывести отчет в JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш разбора файлов")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    files = batch.collect_files(args.paths)
+    if not files:
+        print("Ошибка: Не найдено ни одного файла FDS.", file=sys.stderr)
+        return 1
+    reac_cache = None if args.no_cache else cache.open_default_cache()
+    start = time.perf_counter()
+    try:
+        report = verify_files(files, args.tolerance, reac_cache)
+    finally:
+        if reac_cache is not None:
+            reac_cache.close()
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(format_report(report))
+    print(f"Файлов: {report['files']}, реакций: {report['reactions']}, несогласовано: {len(report['failed'])}, "
+          f"ошибок: {len(report['errors'])}, время: {elapsed:.2f} с", file=sys.stderr)
+    return 1 if report["failed"] or report["errors"] else 0
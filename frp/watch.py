@@ -0,0 +1,476 @@
+"""Наблюдение за каталогом: автоматический пересчет блоков SPEC/REAC.
+
+Новые и измененные файлы FDS в каталоге (и его подкаталогах) пересчитываются
+так же, как в пакетном режиме (см. batch.rewrite_patches), и
+перезаписываются на месте. Изменения отслеживаются через inotify (Linux,
+через ctypes) или, где он недоступен или не видит изменений (сетевые
+ресурсы), периодическим опросом каталога. Файл обрабатывается после паузы в
+записи (debounce) и только если его размер и время изменения за паузу не
+менялись. Файлы, блок которых уже совпадает с рассчитанным, не
+перезаписываются. Обработка идет пулом процессов; глубина очереди и
+задержка от события до записи выводятся периодически в журнал и,
+при необходимости, в файл JSON.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty, SimpleQueue
+
+import numpy as np
+
+from . import batch, fdsio, splice, stoich
+
+DEFAULT_DEBOUNCE = 1.0
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_STATS_INTERVAL = 10.0
+# Число последних обработанных файлов для расчета процентилей задержки
+LATENCY_WINDOW = 1000
+# Наибольшая пауза главного цикла, с
+_TICK = 0.2
+
+# Константы inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+def is_fds_file(path):
+    return path.lower().endswith(batch.FDS_EXTENSIONS) and not os.path.basename(path).startswith(".")
+
+
+class PollingSource:
+    """Источник изменений на основе периодического обхода каталога"""
+
+    name = "polling"
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._states = self._scan()
+        self._next = time.monotonic() + interval
+
+    def _scan(self):
+        states = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if is_fds_file(path):
+                    try:
+                        states[path] = fdsio.file_stat(path)
+                    except OSError:
+                        pass
+        return states
+
+    def changes(self, timeout):
+        """Пути файлов, созданных или измененных с прошлого обхода"""
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, delay))
+        self._next = time.monotonic() + self.interval
+        states = self._scan()
+        changed = [path for path, state in states.items() if self._states.get(path) != state]
+        self._states = states
+        return changed
+
+    def existing(self):
+        return list(self._states)
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """Источник изменений на основе inotify (Linux).
+
+    Выбрасывает OSError, если inotify недоступен. При переполнении очереди
+    событий ядра возвращает все файлы каталога.
+    """
+
+    name = "inotify"
+
+    def __init__(self, directory):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify доступен только в Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.directory = directory
+        self._dirs = {}
+        self._watch_tree(directory)
+
+    def _watch(self, path):
+        wd = self._add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        self._dirs[wd] = path
+
+    def _watch_tree(self, directory):
+        """Наблюдает за каталогом и подкаталогами; возвращает найденные в них файлы FDS"""
+        found = []
+        for root, _, names in os.walk(directory):
+            self._watch(root)
+            found.extend(path for path in (os.path.join(root, name) for name in names) if is_fds_file(path))
+        return found
+
+    def changes(self, timeout):
+        """Пути файлов с событиями записи за время ожидания"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        changed = []
+        while True:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.extend(self.existing())
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Новый подкаталог: файлы могли появиться до начала наблюдения
+                        try:
+                            changed.extend(self._watch_tree(path))
+                        except OSError:
+                            pass
+                elif is_fds_file(path):
+                    changed.append(path)
+        return changed
+
+    def existing(self):
+        found = []
+        for root, _, names in os.walk(self.directory):
+            found.extend(path for path in (os.path.join(root, name) for name in names) if is_fds_file(path))
+        return found
+
+    def close(self):
+        os.close(self._fd)
+
+
+def open_source(directory, poll=False, interval=DEFAULT_POLL_INTERVAL):
+    """Источник изменений: inotify или, если он недоступен либо poll, опрос"""
+    if not poll:
+        try:
+            return InotifySource(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingSource(directory, interval)
+
+
+def update_file(file_path, params=None, fuel_id=None, reac_lines=None):
+    """Пересчитывает блок SPEC/REAC файла на месте, если он изменится.
+
+    Параметры как у batch.rewrite_file. Возвращает кортеж (путь, состояние,
+    сообщение, время обработки, состояние файла после обработки), где
+    состояние - 'updated', 'unchanged' или 'failed'. Не выбрасывает
+    исключений.
+    """
+    start = time.perf_counter()
+    try:
+        summary = fdsio.summarize_fds(file_path)
+        patches = batch.rewrite_patches(file_path, summary, params, fuel_id, reac_lines)
+        if splice.unchanged(file_path, patches):
+            status = "unchanged"
+        else:
+            splice.splice_file(file_path, patches)
+            status = "updated"
+        return file_path, status, "", time.perf_counter() - start, fdsio.file_stat(file_path)
+    except Exception as e:
+        return file_path, "failed", str(e), time.perf_counter() - start, None
+
+
+def percentiles(values):
+    """Медиана, 99-й процентиль и наибольшее из значений (None без значений)"""
+    if not values:
+        return None, None, None
+    p50, p99 = np.percentile(values, [50, 99])
+    return float(p50), float(p99), float(max(values))
+
+
+class FolderWatcher:
+    """Наблюдение за каталогом с очередью и пулом процессов.
+
+    Файл проходит состояния: ожидание паузы в записи (pending), готов к
+    обработке (ready, если все процессы пула заняты) и в обработке
+    (running). Файл, измененный во время обработки, обрабатывается
+    повторно. События от собственной записи отбрасываются по состоянию
+    файла после нее.
+    """
+
+    def __init__(self, directory, params=None, fuel_id=None, reac_lines=None, workers=None,
+                 debounce=DEFAULT_DEBOUNCE, poll=False, poll_interval=DEFAULT_POLL_INTERVAL, log=None):
+        self.directory = os.path.abspath(directory)
+        self.task = (params, fuel_id, reac_lines)
+        self.workers = workers or os.cpu_count() or 1
+        self.debounce = debounce
+        self.source = open_source(self.directory, poll, poll_interval)
+        self.log = log or (lambda message: None)
+        self.stop_event = threading.Event()
+
+        self.pending = {}      # путь -> (срок, состояние файла, время первого события)
+        self.ready = {}        # путь -> время первого события, в порядке готовности
+        self.running = {}      # путь -> время первого события
+        self.rerun = {}        # путь -> время события во время обработки
+        self.written = {}      # путь -> состояние файла после собственной записи
+        self._results = SimpleQueue()
+
+        self.started = time.monotonic()
+        self.counters = {"events": 0, "ignored": 0, "processed": 0, "updated": 0, "unchanged": 0, "failed": 0}
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.service_times = deque(maxlen=LATENCY_WINDOW)
+
+    def queue_depth(self):
+        return len(self.pending) + len(self.ready) + len(self.running)
+
+    def stats(self):
+        """Счетчики и задержки (с) для контроля того, успевает ли обработка"""
+        latency = percentiles(self.latencies)
+        service = percentiles(self.service_times)
+        elapsed = time.monotonic() - self.started
+        return dict(
+            self.counters,
+            source=self.source.name,
+            workers=self.workers,
+            uptime=elapsed,
+            pending=len(self.pending),
+            ready=len(self.ready),
+            running=len(self.running),
+            queue_depth=self.queue_depth(),
+            max_queue_depth=self.max_queue_depth,
+            files_per_second=self.counters["processed"] / elapsed if elapsed > 0 else 0.0,
+            latency_p50=latency[0],
+            latency_p99=latency[1],
+            latency_max=latency[2],
+            service_p50=service[0],
+            service_p99=service[1],
+        )
+
+    def schedule(self, path, now):
+        """Откладывает обработку файла до паузы в записи"""
+        self.counters["events"] += 1
+        self._defer(path, now)
+
+    def _defer(self, path, now):
+        try:
+            state = fdsio.file_stat(path)
+        except OSError:
+            # Файл удален или переименован до обработки
+            self.pending.pop(path, None)
+            return
+        if self.written.get(path) == state:
+            self.counters["ignored"] += 1
+            return
+        self.written.pop(path, None)
+        if path in self.running:
+            self.rerun.setdefault(path, now)
+            return
+        # Файл, ожидавший обработки, снова записывается
+        first_seen = self.ready.pop(path, now)
+        if path in self.pending:
+            first_seen = self.pending[path][2]
+        self.pending[path] = (now + self.debounce, state, first_seen)
+
+    def _promote(self, now):
+        """Переводит файлы, запись которых закончилась, в очередь обработки"""
+        for path, (due, state, first_seen) in list(self.pending.items()):
+            if due > now:
+                continue
+            try:
+                current = fdsio.file_stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if current != state:
+                # Запись еще идет
+                self.pending[path] = (now + self.debounce, current, first_seen)
+                continue
+            del self.pending[path]
+            self.ready[path] = first_seen
+
+    def _submit(self, pool):
+        while self.ready and len(self.running) < self.workers * 2:
+            path = next(iter(self.ready))
+            self.running[path] = self.ready.pop(path)
+            future = pool.submit(update_file, path, *self.task)
+            future.add_done_callback(lambda f, path=path: self._done(f, path))
+
+    def _done(self, future, path):
+        # Вызывается в служебном потоке пула; результат передается в главный цикл
+        try:
+            result = future.result()
+        except Exception as e:
+            result = (path, "failed", str(e), 0.0, None)
+        self._results.put((result, time.monotonic()))
+
+    def _collect(self, now):
+        while True:
+            try:
+                (path, status, message, elapsed, state), done_at = self._results.get_nowait()
+            except Empty:
+                break
+            first_seen = self.running.pop(path)
+            self.counters["processed"] += 1
+            self.counters[status] += 1
+            self.latencies.append(done_at - first_seen)
+            self.service_times.append(elapsed)
+            if status == "updated":
+                self.written[path] = state
+                self.log(f"Обновлен: {path}")
+            elif status == "failed":
+                self.log(f"Ошибка: {path}: {message}")
+            if self.rerun.pop(path, None) is not None:
+                self._defer(path, now)
+
+    def run(self, initial=False, stats_interval=DEFAULT_STATS_INTERVAL, stats_file=None, report=None):
+        """Главный цикл; выполняется до установки stop_event.
+
+        initial - обработать и файлы, уже лежащие в каталоге. report(stats)
+        вызывается каждые stats_interval секунд; stats_file перезаписывается
+        теми же счетчиками в JSON.
+        """
+        now = time.monotonic()
+        if initial:
+            for path in self.source.existing():
+                self.schedule(path, now)
+        next_report = now + stats_interval
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                while not self.stop_event.is_set():
+                    for path in self.source.changes(_TICK):
+                        self.schedule(path, time.monotonic())
+                    now = time.monotonic()
+                    self._collect(now)
+                    self._promote(now)
+                    self._submit(pool)
+                    self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+                    if now >= next_report:
+                        next_report = now + stats_interval
+                        self._report(report, stats_file)
+            finally:
+                self.source.close()
+        # Пул дождался запущенных задач
+        self._collect(time.monotonic())
+        self._report(report, stats_file)
+
+    def _report(self, report, stats_file):
+        stats = self.stats()
+        if report is not None:
+            report(stats)
+        if stats_file:
+            tmp = splice.atomic_writer(stats_file)
+            try:
+                tmp.write(json.dumps(stats, indent=2).encode("utf-8"))
+                splice.commit(tmp, stats_file)
+            except BaseException:
+                splice.discard(tmp)
+                raise
+
+
+def format_stats(stats):
+    """Строка журнала со счетчиками наблюдения"""
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    return (f"Очередь: {stats['queue_depth']} (ожидают {stats['pending']}, готовы {stats['ready']}, "
+            f"в работе {stats['running']}, макс. {stats['max_queue_depth']}); "
+            f"обработано: {stats['processed']} (обновлено {stats['updated']}, без изменений {stats['unchanged']}, "
+            f"ошибок {stats['failed']}); задержка p50/p99: {ms(stats['latency_p50'])}/{ms(stats['latency_p99'])} мс")
+
+
+def add_parser(subparsers):
+    """Регистрирует подкоманду watch"""
+    parser = subparsers.add_parser("watch", help="Наблюдать за каталогом и пересчитывать новые файлы FDS")
+    parser.add_argument("directory", help="Каталог с файлами FDS (с подкаталогами)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-file", action="store_true",
+                        help="Пересчитать по собственной строке PRODUCTS каждого файла")
+    source.add_argument("--fuel", nargs=7, type=float, metavar=tuple(stoich.INPUT_NAMES),
+                        help="Параметры топлива в порядке полей формы")
+    source.add_argument("--library-fuel", metavar="NAME", help="Топливо из библиотеки")
+    parser.add_argument("--fuel-id", help="ID топлива (по умолчанию из файла)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Число процессов (по умолчанию число ядер)")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="Пауза в записи перед обработкой файла, с")
+    parser.add_argument("--poll", action="store_true",
+                        help="Опрашивать каталог вместо inotify (для сетевых ресурсов)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Период опроса, с")
+    parser.add_argument("--initial", action="store_true", help="Обработать и уже имеющиеся файлы")
+    parser.add_argument("--stats-interval", type=float, default=DEFAULT_STATS_INTERVAL,
+                        help="Период вывода счетчиков, с")
+    parser.add_argument("--stats-file", help="Файл JSON, перезаписываемый текущими счетчиками")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Не выводить обработанные файлы")
+    parser.set_defaults(func=main)
+    return parser
+
+
+def main(args):
+    params = None
+    fuel_id = args.fuel_id
+    reac_lines = None
+    try:
+        if args.fuel:
+            params = stoich.validate_params(dict(zip(stoich.INPUT_NAMES, args.fuel)))
+        elif args.library_fuel:
+            params, fuel_id, reac_lines = batch.library_fuel(args.library_fuel, fuel_id)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.directory):
+        print(f"Ошибка: Каталог не найден: {args.directory}", file=sys.stderr)
+        return 2
+
+    log = (lambda message: None) if args.quiet else (lambda message: print(message, flush=True))
+    try:
+        watcher = FolderWatcher(args.directory, params, fuel_id, reac_lines, args.workers, args.debounce,
+                                args.poll, args.poll_interval, log)
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+
+    def stop(signum, frame):
+        watcher.stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Наблюдение за {watcher.directory} ({watcher.source.name}, {watcher.workers} проц.)",
+          file=sys.stderr, flush=True)
+    watcher.run(args.initial, args.stats_interval, args.stats_file,
+                report=lambda stats: print(format_stats(stats), file=sys.stderr, flush=True))
+    return 1 if watcher.counters["failed"] else 0
@@ -0,0 +1,69 @@
+"""Общие данные тестов ядра frp: файл-пример и небольшие входные файлы FDS."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Файл-пример рядом с GUI
+SAMPLE_PATH = os.path.join(ROOT, "4e187527.fds.txt")
+
+SHARED_SPECS = """\
+&SPEC ID='OXYGEN' LUMPED_COMPONENT_ONLY=.True./
+&SPEC ID='NITROGEN' LUMPED_COMPONENT_ONLY=.True./
+&SPEC ID='CARBON DIOXIDE' LUMPED_COMPONENT_ONLY=.True./
+&SPEC ID='CARBON MONOXIDE' LUMPED_COMPONENT_ONLY=.True./
+&SPEC ID='WATER VAPOR' LUMPED_COMPONENT_ONLY=.True./
+&SPEC ID='SOOT' LUMPED_COMPONENT_ONLY=.True./
+&SPEC ID='AIR' BACKGROUND=.True. SPEC_ID(1:2)='OXYGEN','NITROGEN' VOLUME_FRACTION(1:2)=1,3.7619/
+"""
+
+# Две реакции со своими SPEC топлива и смеси продуктов, между ними - другие группы
+MULTI_FDS = """\
+&HEAD CHID='multi' /
+&MESH IJK=10,10,10 XB=0,1,0,1,0,1 /
+""" + SHARED_SPECS + """\
+&SPEC ID='WOOD' MW=100.0/
+&SPEC ID='PROD_WOOD' SPEC_ID(1:5)='SOOT','CARBON DIOXIDE','CARBON MONOXIDE','WATER VAPOR','NITROGEN' \
+VOLUME_FRACTION(1:5)=0.1,0.2,0.01,0.3,2.0/
+&REAC ID='R1' FUEL='WOOD' HEAT_OF_COMBUSTION=15000 SPEC_ID_NU(1:3)='WOOD','AIR','PROD_WOOD' NU(1:3)=-1,-5.0,1 /
+&OBST XB=0,0.1,0,0.1,0,0.1 /
+&SPEC ID='PLASTIC' MW=200.0/
+&SPEC ID='PROD_PL' SPEC_ID(1:5)='SOOT','CARBON DIOXIDE','CARBON MONOXIDE','WATER VAPOR','NITROGEN' \
+VOLUME_FRACTION(1:5)=0.2,0.5,0.02,0.4,4.0/
+&REAC ID='R2' FUEL='PLASTIC' HEAT_OF_COMBUSTION=25000 SPEC_ID_NU(1:3)='PLASTIC','AIR','PROD_PL' NU(1:3)=-1,-9.0,1 /
+&TAIL /
+"""
+
+PARAMS = {
+    "heat_release": 31700.0,
+    "soot_yield": 0.0961,
+    "o2_consumption": 1.44,
+    "co2_yield": 1.36,
+    "co_yield": 0.0314,
+    "hcl_yield": 0.0,
+    "molar_mass": 86.34,
+}
+
+# Пропан C3H8 с выходами, при которых баланс атомов замыкается
+PROPANE_PARAMS = dict(PARAMS, soot_yield=0.0, co2_yield=3.0, co_yield=0.0, molar_mass=44.0)
+
+
+@pytest.fixture
+def write_fds(tmp_path):
+    """Записывает байты или текст (UTF-8) во временный файл и возвращает его путь"""
+    def write(content, name="case.fds"):
+        path = tmp_path / name
+        path.write_bytes(content if isinstance(content, bytes) else content.encode("utf-8"))
+        return str(path)
+    return write
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Кэш разбора и библиотека топлив тестов не затрагивают каталоги пользователя"""
+    monkeypatch.setenv("FRP_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("FRP_LIBRARY", str(tmp_path / "fuels.sqlite3"))
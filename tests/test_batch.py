@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from frp import batch, cli, fdsio, stoich
+
+from conftest import PARAMS, PROPANE_PARAMS, SAMPLE_PATH
+
+
+@pytest.fixture
+def sample(write_fds):
+    def write(name="case.fds"):
+        with open(SAMPLE_PATH, "rb") as file:
+            return write_fds(file.read(), name)
+    return write
+
+
+def test_collect_files(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    for name in ("a/one.fds", "a/b/two.FDS", "a/b/notes.txt", "three.fds"):
+        (tmp_path / name).write_text("&HEAD /\n")
+    files = batch.collect_files([str(tmp_path / "a"), str(tmp_path / "*.fds"), str(tmp_path / "a" / "one.fds")])
+    assert files == sorted([str(tmp_path / "a" / "one.fds"), str(tmp_path / "a" / "b" / "two.FDS"),
+                            str(tmp_path / "three.fds")])
+
+
+def test_rewrite_file_from_file_keeps_params(sample):
+    path = sample()
+    before = fdsio.summarize_fds(path)
+    _, ok, target, parsed = batch.rewrite_file(path)
+    assert ok and target == path and parsed is not None
+    after = fdsio.summarize_fds(path)
+    assert after["fuel_id"] == before["fuel_id"]
+    assert after["params"] == pytest.approx(before["params"])
+
+
+def test_rewrite_file_to_output_dir(sample, tmp_path):
+    path = sample()
+    with open(path, "rb") as file:
+        original = file.read()
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    _, ok, target, _ = batch.rewrite_file(path, PARAMS, "Wood", str(output_dir))
+    assert ok and target == str(output_dir / "case.fds")
+    with open(path, "rb") as file:
+        assert file.read() == original
+    summary = fdsio.summarize_fds(target)
+    assert summary["fuel_id"] == "Wood"
+    assert summary["params"] == pytest.approx(PARAMS)
+
+
+def test_rewrite_file_reports_errors(write_fds):
+    path, ok, message, _ = batch.rewrite_file(write_fds("&HEAD CHID='empty' /\n"))
+    assert not ok and message
+
+
+def test_rewrite_file_keeps_formula(write_fds):
+    path = write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("PROPANE", PROPANE_PARAMS, formula="C3H8")
+                     + "&TAIL /\n")
+    _, ok, _, _ = batch.rewrite_file(path, dict(PROPANE_PARAMS, heat_release=46000.0))
+    assert ok
+    summary = fdsio.summarize_fds(path)
+    assert summary["formula"] == "C3H8" and summary["reactions"][0]["balanced"]
+    assert summary["params"]["heat_release"] == 46000.0
+    # Выходы, не согласованные с формулой, не записываются
+    path, ok, message, _ = batch.rewrite_file(path, PARAMS)
+    assert not ok and "Баланс атомов" in message
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_isolates_failures(sample, tmp_path, workers):
+    files = [sample(f"case{i}.fds") for i in range(3)] + [str(tmp_path / "missing.fds")]
+    output_dir = str(tmp_path / "out")
+    stats = batch.run_batch(files, PARAMS, output_dir=output_dir, workers=workers)
+    assert stats["files"] == 4 and stats["workers"] == workers
+    assert [path for path, _ in stats["failed"]] == [files[-1]]
+    assert sorted(os.listdir(output_dir)) == ["case0.fds", "case1.fds", "case2.fds"]
+
+
+def test_cli_batch(sample, capsys):
+    path = sample()
+    args = ["batch", path, "--fuel"] + [str(PARAMS[name]) for name in stoich.INPUT_NAMES] + ["--no-cache", "-j", "1"]
+    assert cli.main(args) == 0
+    assert "Обработано файлов: 1, ошибок: 0" in capsys.readouterr().out
+    assert fdsio.summarize_fds(path)["params"]["heat_release"] == PARAMS["heat_release"]
+    assert cli.main(["batch", path, "--from-file", "--formula", "C3H8", "--no-cache"]) == 2
@@ -0,0 +1,43 @@
+import filecmp
+
+from frp import bench, cli, fdsio
+
+
+def test_synthesize_is_deterministic(tmp_path):
+    first, second = str(tmp_path / "a.fds"), str(tmp_path / "b.fds")
+    bench.synthesize(first, obst=50, meshes=4, reactions=3)
+    bench.synthesize(second, obst=50, meshes=4, reactions=3)
+    assert filecmp.cmp(first, second, shallow=False)
+    records = fdsio.scan_fds(first)
+    assert sum(r.name == "OBST" for r in records) == 50
+    assert sum(r.name == "MESH" for r in records) == 4
+    assert len(fdsio.summarize(records)["reactions"]) == 3
+
+
+def test_bench_file_phases(tmp_path):
+    for reactions in (1, 2):
+        file_path = str(tmp_path / f"case{reactions}.fds")
+        bench.synthesize(file_path, obst=20, meshes=1, reactions=reactions)
+        case = bench.bench_file("case", file_path, str(tmp_path), repeat=1)
+        assert case["obst"] == 20 and case["reactions"] == reactions
+        for phase in ("import", "calculate", "save"):
+            assert case[phase]["seconds"] >= 0 and case[phase]["peak_memory_bytes"] > 0
+        assert case["calculate"]["calls_per_second"] > 0
+        # Результат сохранения удаляется после замера
+        assert not (tmp_path / "case.out.fds").exists()
+
+
+def test_compare_reports_regressions():
+    def report(save_seconds):
+        phases = {phase: {"best_seconds": 1.0} for phase in ("import", "calculate")}
+        return {"cases": [dict(phases, name="small", save={"best_seconds": save_seconds})]}
+
+    assert bench.compare(report(1.1), report(1.0), tolerance=0.2) == []
+    regressions = bench.compare(report(1.5), report(1.0), tolerance=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("small/save")
+    assert bench.compare(report(1.5), {"cases": []}, tolerance=0.2) == []
+
+
+def test_cli_rejects_unknown_scale(capsys):
+    assert cli.main(["bench", "--scales", "small,huge"]) == 2
+    assert "huge" in capsys.readouterr().err
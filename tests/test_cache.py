@@ -0,0 +1,70 @@
+import os
+import sqlite3
+
+from frp import cache, fdsio
+
+from conftest import PARAMS
+
+
+def _write_block(write_fds, params=PARAMS, name="case.fds"):
+    return write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("Wood", params) + "&TAIL /\n", name)
+
+
+def _touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_cache_invalidated_by_content_change(write_fds, tmp_path):
+    path = _write_block(write_fds)
+    with cache.ReacCache(str(tmp_path / "cache.sqlite3")) as reac_cache:
+        summary = reac_cache.load(path)
+        assert reac_cache.get(path) == summary
+        # Касание файла без изменения содержимого запись не сбрасывает
+        _touch(path)
+        assert reac_cache.get(path) == summary
+        _write_block(write_fds, dict(PARAMS, heat_release=16000.0))
+        assert reac_cache.get(path) is None
+        assert reac_cache.load(path)["params"]["heat_release"] == 16000.0
+
+
+def test_cache_persists_between_sessions(write_fds, tmp_path):
+    path = _write_block(write_fds)
+    cache_path = str(tmp_path / "cache.sqlite3")
+    with cache.ReacCache(cache_path) as reac_cache:
+        summary = reac_cache.load(path)
+    with cache.ReacCache(cache_path) as reac_cache:
+        assert reac_cache.get(path) == summary
+        assert fdsio.load_fds(path, cache=reac_cache)["params"] == summary["params"]
+
+
+def test_cache_version_change_clears_entries(write_fds, tmp_path):
+    path = _write_block(write_fds)
+    cache_path = str(tmp_path / "cache.sqlite3")
+    with cache.ReacCache(cache_path) as reac_cache:
+        reac_cache.load(path)
+    with sqlite3.connect(cache_path) as db:
+        db.execute("UPDATE meta SET value = '0' WHERE key = 'version'")
+    db.close()
+    with cache.ReacCache(cache_path) as reac_cache:
+        assert reac_cache.get(path) is None
+
+
+def test_cache_evicts_least_recently_used(write_fds, tmp_path):
+    paths = [_write_block(write_fds, name=f"case{i}.fds") for i in range(4)]
+    with cache.ReacCache(str(tmp_path / "cache.sqlite3"), max_entries=2) as reac_cache:
+        for path in paths[:3]:
+            reac_cache.load(path)
+            reac_cache.flush()
+        reac_cache.get(paths[1])
+        reac_cache.load(paths[3])
+        reac_cache.flush()
+        assert [reac_cache.get(path) is not None for path in paths] == [False, True, False, True]
+
+
+def test_open_default_cache_uses_environment(tmp_path):
+    reac_cache = cache.open_default_cache()
+    try:
+        assert reac_cache.path == str(tmp_path / "cache" / "reac_cache.sqlite3")
+    finally:
+        reac_cache.close()
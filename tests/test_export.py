@@ -0,0 +1,87 @@
+import csv
+import json
+
+import pytest
+
+from frp import cli, export, fdsio, stoich
+
+from conftest import MULTI_FDS, PARAMS, PROPANE_PARAMS
+
+
+@pytest.fixture
+def files(write_fds):
+    return [write_fds(MULTI_FDS, "multi.fds"),
+            write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("PROPANE", PROPANE_PARAMS, formula="C3H8")
+                      + "&TAIL /\n", "propane.fds"),
+            write_fds("&HEAD CHID='empty' /\n&TAIL /\n", "empty.fds")]
+
+
+def test_reaction_rows(files):
+    rows = list(export.reaction_rows(files[0], fdsio.summarize_fds(files[0])))
+    assert [(row["reac_id"], row["fuel_id"], row["products_id"]) for row in rows] == [
+        ("R1", "WOOD", "PROD_WOOD"), ("R2", "PLASTIC", "PROD_PL")]
+    assert all(set(row) == set(export.COLUMNS) for row in rows)
+    assert rows[0]["volume_fraction_soot"] == 0.1 and rows[0]["volume_fraction_hydrogen_chloride"] is None
+    assert (rows[0]["nu_air"], rows[0]["nu_products"], rows[0]["balanced"]) == (-5.0, 1.0, False)
+    balanced, = export.reaction_rows(files[1], fdsio.summarize_fds(files[1]))
+    assert balanced["balanced"] and balanced["formula"] == "C3H8"
+    assert balanced["nu_products"] == pytest.approx(sum(
+        balanced[column] for column in export.FRACTION_COLUMNS if balanced[column] is not None))
+    assert balanced["co2_yield"] == pytest.approx(PROPANE_PARAMS["co2_yield"])
+    missing, = export.reaction_rows(files[2], fdsio.summarize_fds(files[2]))
+    assert missing["error"] and missing["molar_mass"] is None
+
+
+def test_export_csv(files, tmp_path):
+    output = str(tmp_path / "out.csv")
+    stats = export.export_files(files, output)
+    assert (stats["files"], stats["rows"], stats["errors"]) == (3, 4, 1)
+    with open(output, newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert list(rows[0]) == list(export.COLUMNS)
+    assert [row["fuel_id"] for row in rows] == ["WOOD", "PLASTIC", "PROPANE", "Fuel"]
+    assert float(rows[1]["heat_release"]) == 25000.0 and rows[1]["formula"] == ""
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl"])
+def test_export_json(files, tmp_path, fmt):
+    output = str(tmp_path / f"out.{fmt}")
+    export.export_files(files, output)
+    with open(output, encoding="utf-8") as file:
+        text = file.read()
+    rows = json.loads(text) if fmt == "json" else [json.loads(line) for line in text.splitlines()]
+    assert [row["fuel_id"] for row in rows] == ["WOOD", "PLASTIC", "PROPANE", "Fuel"]
+    assert rows[2]["balanced"] is True and rows[0]["hcl_yield"] == 0.0
+
+
+def test_export_json_empty(tmp_path):
+    output = str(tmp_path / "out.json")
+    assert export.export_files([], output)["rows"] == 0
+    with open(output, encoding="utf-8") as file:
+        assert json.load(file) == []
+
+
+@pytest.mark.parametrize("path, fmt, expected", [
+    ("out.CSV", None, "csv"), ("out.jsonl", None, "jsonl"), ("out.pq", None, "parquet"),
+    ("out.txt", None, "csv"), (None, None, "csv"), ("out.csv", "json", "json"),
+])
+def test_detect_format(path, fmt, expected):
+    assert export.detect_format(path, fmt) == expected
+
+
+def test_parquet_requires_output_file(files):
+    with pytest.raises(ValueError, match="-o"):
+        export.export_files(files, fmt="parquet")
+
+
+@pytest.mark.skipif(export.pyarrow is not None, reason="pyarrow установлен")
+def test_parquet_requires_pyarrow(files, tmp_path, capsys):
+    assert cli.main(["export", *files, "-o", str(tmp_path / "out.parquet"), "--no-cache"]) == 2
+    assert "pyarrow" in capsys.readouterr().err
+
+
+def test_cli_export_stdout(write_fds, capsys):
+    path = write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("Wood", PARAMS) + "&TAIL /\n")
+    assert cli.main(["export", path, "--format", "jsonl"]) == 0
+    row = json.loads(capsys.readouterr().out)
+    assert {name: row[name] for name in stoich.INPUT_NAMES} == pytest.approx(PARAMS)
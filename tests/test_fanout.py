@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from frp import cli, fanout, fdsio, namelist, stoich, sweep
+
+from conftest import MULTI_FDS, PARAMS, PROPANE_PARAMS, SAMPLE_PATH
+
+
+def _table(tmp_path, rows, name="variants.csv"):
+    path = tmp_path / name
+    lines = ["name,chid,fuel_id," + ",".join(stoich.INPUT_NAMES)]
+    for label, chid, fuel_id, params in rows:
+        lines.append(f"{label},{chid},{fuel_id}," + ",".join(str(params[key]) for key in stoich.INPUT_NAMES))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _chid(path):
+    head = next(record for record in namelist.scan_file(path) if record.name == "HEAD")
+    return namelist.parse_params(head.text)["CHID"][0]
+
+
+def test_chid_helpers():
+    assert fanout.safe_chid(" case 1.v2 ") == "case_1_v2"
+    assert fanout.safe_chid("...") == "case"
+    assert fanout.set_chid("&HEAD CHID='old' TITLE='t' /", "new") == "&HEAD CHID='new' TITLE='t' /"
+    assert fanout.set_chid("&HEAD TITLE='t' /", "new") == "&HEAD CHID='new' TITLE='t' /"
+
+
+def test_fan_out_single_reac(write_fds, tmp_path):
+    with open(SAMPLE_PATH, "rb") as file:
+        base = write_fds(file.read(), "base.fds")
+    rows = [("a", "", "", PARAMS),
+            ("b", "", "Wood", dict(PARAMS, soot_yield=0.2)),
+            ("c", "same", "", PARAMS),
+            ("d", "same", "", PARAMS),
+            ("bad", "", "", dict(PARAMS, molar_mass=-1))]
+    output_dir = str(tmp_path / "out")
+    stats = fanout.fan_out(base, fanout.read_table(_table(tmp_path, rows)), output_dir, workers=2, max_pending=1)
+    assert stats["files"] == 4 and [label for label, _ in stats["failed"]] == ["bad"]
+    base_chid = fanout.BaseFile(base).chid
+    names = sorted(os.listdir(output_dir))
+    assert names == sorted([f"{base_chid}_a.fds", f"{base_chid}_b.fds", "same.fds", "same_2.fds"])
+    for name in names:
+        assert _chid(os.path.join(output_dir, name)) == name[:-4]
+    variant = fdsio.summarize_fds(os.path.join(output_dir, f"{base_chid}_b.fds"))
+    assert variant["fuel_id"] == "Wood"
+    assert variant["params"] == pytest.approx(dict(PARAMS, soot_yield=0.2))
+    # Кроме HEAD и блока SPEC/REAC вариант совпадает с исходным файлом
+    base_summary = fdsio.summarize_fds(base)
+    with open(base, "rb") as file:
+        original = file.read()
+    with open(os.path.join(output_dir, "same.fds"), "rb") as file:
+        written = file.read()
+    assert written.endswith(original[base_summary["span"][1]:])
+
+
+def test_fan_out_multi_reac_changes_one_reaction(write_fds, tmp_path):
+    base = write_fds(MULTI_FDS, "multi.fds")
+    output_dir = str(tmp_path / "out")
+    table = _table(tmp_path, [("v1", "", "", PARAMS)])
+    stats = fanout.fan_out(base, fanout.read_table(table), output_dir, fuel_id="PLASTIC")
+    assert stats["files"] == 1 and not stats["failed"]
+    reactions = fdsio.summarize_fds(os.path.join(output_dir, "multi_v1.fds"))["reactions"]
+    assert reactions[0]["params"] == pytest.approx(fdsio.summarize_fds(base)["reactions"][0]["params"])
+    assert reactions[1]["params"]["heat_release"] == PARAMS["heat_release"]
+
+
+def test_fan_out_keeps_formula(write_fds, tmp_path):
+    base = write_fds("&HEAD CHID='propane' /\n" + fdsio.format_reac_block("PROPANE", PROPANE_PARAMS, formula="C3H8")
+                     + "&TAIL /\n")
+    output_dir = str(tmp_path / "out")
+    table = _table(tmp_path, [("hot", "", "", dict(PROPANE_PARAMS, heat_release=46000.0)), ("bad", "", "", PARAMS)])
+    stats = fanout.fan_out(base, fanout.read_table(table), output_dir)
+    assert stats["files"] == 1 and [label for label, _ in stats["failed"]] == ["bad"]
+    summary = fdsio.summarize_fds(os.path.join(output_dir, "propane_hot.fds"))
+    assert summary["formula"] == "C3H8" and summary["reactions"][0]["balanced"]
+    assert summary["params"]["heat_release"] == 46000.0
+
+
+def test_read_table_from_sweep(tmp_path):
+    output = str(tmp_path / "sweep.npz")
+    distributions = {name: ("fixed", (value,)) for name, value in PARAMS.items()}
+    distributions["co_yield"] = sweep.parse_distribution("normal:0.01,0.02")
+    stats = sweep.run_sweep(distributions, 100, output, seed=2)
+    variants = list(fanout.read_table(output))
+    assert len(variants) == stats["valid"] < 100
+    assert all(params["co_yield"] >= 0 for _, params, _, _ in variants)
+    assert len(list(fanout.read_table(output, limit=5))) == 5
+
+
+def test_cli_fanout(write_fds, tmp_path, capsys):
+    with open(SAMPLE_PATH, "rb") as file:
+        base = write_fds(file.read(), "base.fds")
+    table = _table(tmp_path, [("a", "", "", PARAMS), ("b", "", "", PARAMS)])
+    assert cli.main(["fanout", base, table, "-o", str(tmp_path / "out"), "--limit", "1"]) == 0
+    assert "Создано файлов: 1, ошибок: 0" in capsys.readouterr().out
@@ -0,0 +1,119 @@
+import pytest
+
+from frp import cache, fdsio, namelist, stoich
+
+from conftest import MULTI_FDS, PARAMS, SAMPLE_PATH
+
+
+def _reac_lines(path):
+    with open(path, "rb") as file:
+        return [line for line in file.read().decode("utf-8").splitlines() if line.startswith("&REAC")]
+
+
+def test_load_sample_file():
+    summary = fdsio.load_fds(SAMPLE_PATH)
+    assert summary["fuel_id"]
+    assert summary["params"]["molar_mass"] > 0
+    assert summary["block"].startswith("&SPEC")
+    assert "&REAC" in summary["block"]
+
+
+def test_load_reads_back_formatted_block(write_fds):
+    block = fdsio.format_reac_block("Wood", PARAMS)
+    summary = fdsio.load_fds(write_fds("&HEAD CHID='a' /\n" + block + "&TAIL /\n"))
+    assert summary["fuel_id"] == "Wood"
+    assert summary["params"] == pytest.approx(PARAMS)
+    assert summary["block"] == block.rstrip("\n")
+
+
+def test_load_file_without_reac(write_fds):
+    with pytest.raises(fdsio.FDSParseError):
+        fdsio.load_fds(write_fds("&HEAD CHID='a' /\n&TAIL /\n"))
+
+
+def test_write_reactions_multi_reac(write_fds, tmp_path):
+    path = write_fds(MULTI_FDS)
+    summary = fdsio.summarize_fds(path)
+    assert [reaction["fuel_id"] for reaction in summary["reactions"]] == ["WOOD", "PLASTIC"]
+    params_list = [stoich.validate_params(reaction["params"]) for reaction in summary["reactions"]]
+    params_list[1]["heat_release"] = 26000.0
+    target = str(tmp_path / "out.fds")
+    fdsio.write_reactions(path, params_list, target, summary)
+
+    reacs = _reac_lines(target)
+    assert len(reacs) == 2
+    assert "ID='R1'" in reacs[0] and "HEAT_OF_COMBUSTION=26000.0" in reacs[1]
+    with open(target, encoding="utf-8") as file:
+        text = file.read()
+    # Каждая группа SPEC записана один раз, прочие группы не тронуты
+    for spec_id in ("WOOD", "PROD_WOOD", "PLASTIC", "PROD_PL"):
+        assert text.count(f"&SPEC ID='{spec_id}'") == 1
+    assert "&OBST XB=0,0.1,0,0.1,0,0.1 /\n" in text
+    assert text.startswith("&HEAD CHID='multi' /\n&MESH")
+    rewritten = fdsio.summarize_fds(target)
+    assert rewritten["reactions"][1]["params"]["heat_release"] == 26000.0
+    assert rewritten["reactions"][0]["params"] == pytest.approx(summary["reactions"][0]["params"])
+
+
+def test_write_reac_block_rejects_multi_reac(write_fds, tmp_path):
+    path = write_fds(MULTI_FDS)
+    summary = fdsio.summarize_fds(path)
+    with pytest.raises(fdsio.FDSParseError):
+        fdsio.write_reac_block(path, fdsio.read_span(path, *summary["block_span"]), str(tmp_path / "out.fds"),
+                               summary)
+
+
+def test_select_reaction(write_fds):
+    reactions = fdsio.summarize_fds(write_fds(MULTI_FDS))["reactions"]
+    assert fdsio.select_reaction(reactions, "plastic")["reac_id"] == "R2"
+    assert fdsio.select_reaction(reactions)["reac_id"] == "R1"
+    with pytest.raises(fdsio.FDSParseError):
+        fdsio.select_reaction(reactions, "STEEL")
+    assert len(fdsio.summarize_fds(SAMPLE_PATH)["reactions"]) == 1
+
+
+def test_cp1251_crlf_round_trip_is_byte_exact(write_fds, tmp_path):
+    head = "&HEAD CHID='склад' TITLE='Пожар в складе № 1' /\r\n"
+    tail = "&OBST XB=0,1,0,1,0,1 SURF_ID='Бетон' /\r\n&TAIL /\r\n"
+    raw = head.encode("cp1251") + b"# \x98 undecodable\r\n" + tail.encode("cp1251")
+    path = write_fds(raw)
+    target = str(tmp_path / "out.fds")
+    block = fdsio.format_reac_block("Fuel", PARAMS)
+    fdsio.write_reac_block(path, block, target)
+
+    with open(target, "rb") as file:
+        written = file.read()
+    inserted = block.encode("ascii").replace(b"\n", b"\r\n")
+    # Блок вставлен после HEAD, остальные байты (включая недекодируемые) не изменились
+    offset = len(head.encode("cp1251"))
+    assert written == raw[:offset] + b"\r\n" + inserted + b"\r\n" + raw[offset:]
+    assert b"\n" not in written.replace(b"\r\n", b"")
+
+    # Повторная запись того же блока дает тот же файл
+    again = str(tmp_path / "again.fds")
+    fdsio.write_reac_block(target, block, again)
+    with open(again, "rb") as file:
+        assert file.read() == written
+    assert fdsio.summarize_fds(target)["encoding"] == namelist.detect_encoding(path)
+
+
+def test_cached_summary_keeps_encoding(write_fds, tmp_path):
+    text = "&HEAD CHID='склад' /\r\n" + fdsio.format_reac_block("Древесина", PARAMS).replace("\n", "\r\n")
+    path = write_fds(text.encode("cp1251"))
+    with cache.ReacCache(str(tmp_path / "cache.sqlite3")) as reac_cache:
+        reac_cache.load(path)
+        summary = reac_cache.get(path)
+    assert summary["encoding"] == "cp1251" and summary["fuel_id"] == "Древесина"
+    target = str(tmp_path / "out.fds")
+    fdsio.write_reac_block(path, fdsio.format_reac_block("Древесина", PARAMS), target, summary)
+    with open(target, "rb") as file:
+        assert file.read() == text.encode("cp1251")
+
+
+def test_write_reac_block_unchanged_file_not_rewritten(write_fds):
+    path = write_fds(MULTI_FDS.replace("&REAC ID='R2'", "! &REAC ID='R2'"))
+    summary = fdsio.summarize_fds(path)
+    block = fdsio.read_span(path, *summary["span"])
+    before = fdsio.file_stat(path)
+    fdsio.write_reac_block(path, block, summary=summary)
+    assert fdsio.file_stat(path) == before
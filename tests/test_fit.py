@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from frp import cli, fdsio, fit, stoich
+
+from conftest import PARAMS, PROPANE_PARAMS
+
+
+def _random_params(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "heat_release": rng.uniform(1e4, 5e4, count),
+        "soot_yield": rng.uniform(0, 0.3, count),
+        "o2_consumption": rng.uniform(0.5, 3.5, count),
+        "co2_yield": rng.uniform(0.1, 2.5, count),
+        "co_yield": rng.uniform(0, 0.2, count),
+        "hcl_yield": np.where(rng.random(count) < 0.5, 0.0, rng.uniform(0, 0.3, count)),
+        "molar_mass": rng.uniform(10, 300, count),
+    }
+
+
+def test_fit_inverse_recovers_yields():
+    params = _random_params(50, seed=2)
+    fractions, nu = stoich.forward(params)
+    fitted = stoich.fit_inverse(fractions, params["molar_mass"], nu[:, 1])
+    for name in stoich.FIT_YIELDS + ("molar_mass",):
+        np.testing.assert_allclose(fitted[name], params[name], rtol=1e-8, atol=1e-9)
+    assert np.all(fitted["residual"] < 1e-8)
+
+
+def test_fit_inverse_partial_observations():
+    params = _random_params(20, seed=5)
+    fractions, nu = stoich.forward(params)
+    # Без MW молярная масса подбирается по долям, без NITROGEN и NU
+    # потребление кислорода - по доле WATER VAPOR
+    fitted = stoich.fit_inverse(fractions, np.nan, nu[:, 1])
+    np.testing.assert_allclose(fitted["molar_mass"], params["molar_mass"], rtol=1e-6)
+    fractions[:, stoich.PRODUCT_IDS.index('NITROGEN')] = np.nan
+    fitted = stoich.fit_inverse(fractions, params["molar_mass"])
+    np.testing.assert_allclose(fitted["o2_consumption"], params["o2_consumption"], rtol=1e-6)
+
+
+def test_fit_inverse_respects_bounds():
+    params = _random_params(1, seed=3)
+    fractions, nu = stoich.forward(params)
+    fractions[:, stoich.PRODUCT_IDS.index('CARBON MONOXIDE')] = -0.01
+    fitted = stoich.fit_inverse(fractions, params["molar_mass"], nu[:, 1])
+    assert fitted["co_yield"][0] == 0.0
+    assert fitted["residual"][0] > 0
+
+
+def test_fit_files(write_fds):
+    files = [write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("Wood", PARAMS) + "&TAIL /\n", "wood.fds"),
+             write_fds("&HEAD CHID='b' /\n" + fdsio.format_reac_block("PROPANE", PROPANE_PARAMS, formula="C3H8")
+                       + "&TAIL /\n", "propane.fds"),
+             write_fds("&HEAD CHID='c' /\n&TAIL /\n", "empty.fds")]
+    results = fit.fit_files(files)
+    assert [result["fuel_id"] for result in results] == ["Wood", "PROPANE", None]
+    # При замкнутом балансе потребление кислорода определяется формулой: C3H8 + 5 O2
+    balanced = dict(PROPANE_PARAMS, o2_consumption=5 * stoich.W_O2 / PROPANE_PARAMS["molar_mass"])
+    for result, params in zip(results, (PARAMS, balanced)):
+        assert result["error"] is None and result["residual"] < 1e-6
+        # NU записан с 4 знаками, поэтому потребление кислорода - с той же точностью
+        assert {name: result[name] for name in stoich.INPUT_NAMES} == pytest.approx(params, rel=1e-4, abs=1e-6)
+    assert results[2]["path"] == files[2] and results[2]["error"]
+    row = fit.format_row(results[2]).split("\t")
+    assert len(row) == len(fit.COLUMNS) and row[0] == files[2] and row[-2] == ""
+
+
+def test_cli_fit_json(write_fds, capsys):
+    path = write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("Wood", PARAMS) + "&TAIL /\n")
+    assert cli.main(["fit", path, "--json", "--no-cache"]) == 0
+    result, = json.loads(capsys.readouterr().out)
+    assert set(result) == set(fit.COLUMNS) and result["molar_mass"] == pytest.approx(PARAMS["molar_mass"])
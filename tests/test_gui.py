@@ -0,0 +1,130 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+import FDS_REAC_Prooner as gui  # noqa: E402
+
+from conftest import SAMPLE_PATH  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def window(app, monkeypatch):
+    """Окно формы; диалоги сообщений не показываются, а запоминаются в window.messages"""
+    messages = []
+    for kind in ("information", "warning", "critical"):
+        monkeypatch.setattr(QtWidgets.QMessageBox, kind,
+                            lambda parent, title, text, *args, kind=kind: messages.append((kind, text)))
+    gui.load_core()
+    win = gui.FDSReacCalculator()
+    win.messages = messages
+    yield win
+    win.close()
+
+
+def settle(app, win):
+    """Дожидается фоновой задачи и доставляет ее сигналы в поток GUI"""
+    win.thread_pool.waitForDone()
+    app.processEvents()
+    app.processEvents()
+
+
+def open_file(monkeypatch, path):
+    monkeypatch.setattr(QtWidgets.QFileDialog, "getOpenFileName", lambda *args, **kwargs: (path, ""))
+
+
+def save_file(monkeypatch, path):
+    monkeypatch.setattr(QtWidgets.QFileDialog, "getSaveFileName", lambda *args, **kwargs: (path, ""))
+
+
+def test_import_and_save_run_in_worker_thread(app, window, monkeypatch, tmp_path):
+    threads = []
+    load_fds, write_reac_block = gui.fdsio.load_fds, gui.fdsio.write_reac_block
+
+    def record(fn):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return fn(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(gui.fdsio, "load_fds", record(load_fds))
+    monkeypatch.setattr(gui.fdsio, "write_reac_block", record(write_reac_block))
+    open_file(monkeypatch, SAMPLE_PATH)
+    window.import_fds_file()
+    assert not window.import_button.isEnabled()
+    settle(app, window)
+    assert window.import_button.isEnabled() and window.save_fds_button.isEnabled()
+    assert window.imported_file_path == SAMPLE_PATH
+    assert float(window.inputs["molar_mass"].text()) > 0
+
+    window.calculate_parameters(silent=True)
+    target = str(tmp_path / "saved.fds")
+    save_file(monkeypatch, target)
+    window.save_to_fds_file()
+    settle(app, window)
+    assert window.statusBar.currentMessage().endswith(target)
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    saved = gui.fdsio.summarize_fds(target)["params"]
+    assert saved["molar_mass"] == pytest.approx(float(window.inputs["molar_mass"].text()))
+
+
+def test_cancel_import(app, window, monkeypatch):
+    started = threading.Event()
+
+    def slow_load(file_path, cache=None, progress=None):
+        started.set()
+        while True:
+            progress(1, 2)
+            time.sleep(0.01)
+
+    monkeypatch.setattr(gui.fdsio, "load_fds", slow_load)
+    open_file(monkeypatch, SAMPLE_PATH)
+    window.import_fds_file()
+    assert started.wait(5)
+    # Вторая операция не запускается, пока идет первая
+    window.import_fds_file()
+    assert "Дождитесь" in window.statusBar.currentMessage()
+    window.cancel_task()
+    settle(app, window)
+    assert window.statusBar.currentMessage() == "Импорт файла FDS отменен."
+    assert window.current_task is None and window.import_button.isEnabled()
+    assert window.imported_file_path is None and not window.messages
+
+
+def test_import_error_reported(app, window, monkeypatch, write_fds):
+    open_file(monkeypatch, write_fds("&HEAD CHID='a' /\n&TAIL /\n"))
+    window.import_fds_file()
+    settle(app, window)
+    assert [kind for kind, _ in window.messages] == ["warning"]
+    assert window.import_button.isEnabled()
+
+
+def test_core_loaded_after_first_paint():
+    # Отдельный процесс: в этом NumPy и frp уже загружены другими тестами
+    script = (
+        "import sys\n"
+        "from PyQt6.QtWidgets import QApplication\n"
+        "import FDS_REAC_Prooner as gui\n"
+        "app = QApplication([])\n"
+        "window = gui.FDSReacCalculator()\n"
+        "assert 'numpy' not in sys.modules and gui.fdsio is None\n"
+        "window.show()\n"
+        "while window.startup_done_time is None:\n"
+        "    app.processEvents()\n"
+        "assert 'numpy' in sys.modules and gui.fdsio is not None\n"
+        "assert window.help_layout.count() > 0\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(gui.__file__))
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
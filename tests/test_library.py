@@ -0,0 +1,74 @@
+import pytest
+
+from frp import batch, cli, fdsio, library, stoich
+
+from conftest import MULTI_FDS, PARAMS
+
+
+@pytest.fixture
+def fuels(tmp_path):
+    with library.FuelLibrary(str(tmp_path / "fuels.sqlite3")) as fuel_library:
+        fuel_library.add_many([
+            ("Древесина", "Мебель", PARAMS),
+            ("Wood pellets", "Solid", dict(PARAMS, heat_release=17000.0)),
+            ("Polystyrene", "Plastic", dict(PARAMS, molar_mass=104.15)),
+            ("Softwood", "Solid", PARAMS),
+        ])
+        yield fuel_library
+
+
+def test_get_is_case_insensitive_and_has_block(fuels):
+    fuel = fuels.get("ДРЕВЕСИНА")
+    assert fuel["name"] == "Древесина" and fuel["category"] == "Мебель"
+    assert fuel["params"] == PARAMS
+    assert fuel["block"] == fdsio.format_reac_block("Древесина", PARAMS)
+    assert sum(fuel["products"].values()) > 0
+    assert fuels.get("Steel") is None
+
+
+def test_search_prefix_before_infix(fuels):
+    assert fuels.search("wood") == [("Wood pellets", "Solid"), ("Softwood", "Solid")]
+    assert fuels.search("wood", limit=1) == [("Wood pellets", "Solid")]
+    assert fuels.search(category="solid") == [("Softwood", "Solid"), ("Wood pellets", "Solid")]
+    assert len(fuels.search(limit=0)) == len(fuels) == 4
+    assert fuels.categories() == ["Plastic", "Solid", "Мебель"]
+
+
+def test_add_many_is_all_or_nothing(fuels):
+    with pytest.raises(ValueError, match="Steel"):
+        fuels.add_many([("Glass", "", PARAMS), ("Steel", "", dict(PARAMS, molar_mass=0))])
+    assert fuels.get("Glass") is None
+    assert fuels.remove("softwood") and not fuels.remove("softwood")
+    assert len(fuels) == 3
+
+
+def test_entries_from_fds(write_fds):
+    entries = list(library.entries_from_fds([write_fds(MULTI_FDS)], "Scenario"))
+    assert [(name, category) for name, category, _ in entries] == [("WOOD", "Scenario"), ("PLASTIC", "Scenario")]
+    assert entries[0][2]["molar_mass"] == 100.0
+
+
+def test_batch_applies_library_fuel(write_fds, tmp_path):
+    with library.FuelLibrary() as fuel_library:
+        fuel_library.add("Polystyrene", PARAMS)
+    params, fuel_id, reac_lines = batch.library_fuel("polystyrene")
+    assert fuel_id == "Polystyrene" and reac_lines == fdsio.format_reac_block("Polystyrene", PARAMS)
+    path = write_fds("&HEAD CHID='a' /\n&TAIL /\n")
+    _, ok, _, _ = batch.rewrite_file(path, params, fuel_id, reac_lines=reac_lines)
+    assert ok and fdsio.summarize_fds(path)["fuel_id"] == "Polystyrene"
+    with pytest.raises(ValueError):
+        batch.library_fuel("Steel")
+
+
+def test_cli_csv_round_trip(tmp_path, capsys):
+    source = tmp_path / "fuels.csv"
+    source.write_text("name,category," + ",".join(stoich.INPUT_NAMES) + "\n"
+                      + "Wood,Solid," + ",".join(str(PARAMS[name]) for name in stoich.INPUT_NAMES) + "\n",
+                      encoding="utf-8")
+    assert cli.main(["library", "import-csv", str(source)]) == 0
+    exported = tmp_path / "export.csv"
+    assert cli.main(["library", "export-csv", str(exported)]) == 0
+    assert exported.read_text(encoding="utf-8").splitlines() == source.read_text(encoding="utf-8").splitlines()
+    capsys.readouterr()
+    assert cli.main(["library", "list", "wo"]) == 0
+    assert capsys.readouterr().out == "Wood\tSolid\n"
@@ -0,0 +1,47 @@
+from frp import fdsio, live
+
+from conftest import PARAMS
+
+
+def _block(fuel_id="Wood", params=PARAMS):
+    block = live.LiveBlock(fuel_id)
+    for name, value in params.items():
+        block.set_param(name, value)
+    block.update()
+    return block
+
+
+def test_text_matches_format_reac_block():
+    block = _block()
+    assert block.text() == fdsio.format_reac_block("Wood", PARAMS)
+    assert block.update() == {}
+
+
+def test_update_returns_only_changed_lines():
+    block = _block()
+    block.set_param("heat_release", 20000.0)
+    assert list(block.update()) == [live.REAC_LINE]
+    block.set_param("soot_yield", 0.2)
+    assert list(block.update()) == [live.PRODUCTS_LINE]
+    # Потребление O2 меняет и состав продуктов, и массу воздуха (NU)
+    block.set_param("o2_consumption", 1.5)
+    assert sorted(block.update()) == [live.PRODUCTS_LINE, live.REAC_LINE]
+    block.set_param("molar_mass", 90.0)
+    assert live.FUEL_LINE in block.update()
+    block.set_fuel_id("Pine")
+    assert sorted(block.update()) == [live.FUEL_LINE, live.REAC_LINE]
+    params = dict(PARAMS, heat_release=20000.0, soot_yield=0.2, o2_consumption=1.5, molar_mass=90.0)
+    assert block.text() == fdsio.format_reac_block("Pine", params)
+    # То же значение строк не пересчитывает
+    block.set_param("soot_yield", 0.2)
+    assert block.update() == {}
+
+
+def test_reset_with_shown_text():
+    text = fdsio.format_reac_block("Wood", PARAMS)
+    block = live.LiveBlock()
+    block.reset("Wood", PARAMS, text)
+    assert block.update() == {}
+    block.reset("Wood", dict(PARAMS, co_yield=0.05), text)
+    assert list(block.update()) == [live.PRODUCTS_LINE]
+    assert block.text() == fdsio.format_reac_block("Wood", dict(PARAMS, co_yield=0.05))
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from frp import cli, fdsio, mesh, namelist
+
+from conftest import MULTI_FDS
+
+# Четыре сетки 10x10x10 размножаются MULT на процессы 0 и 1, еще одна
+# сетка 20x10x10 - на процессе 2
+MPI_FDS = """\
+&HEAD CHID='mpi' /
+&MULT ID='row', DX=1, I_UPPER=3 /
+&MESH IJK=10,10,10, XB=0,1,0,1,0,1, MULT_ID='row', MPI_PROCESS=0 /
+&MESH IJK=10,10,10, XB=0,1,1,2,0,1, MULT_ID='ROW', MPI_PROCESS=1 /
+&MESH IJK=20,10,10, XB=0,2,2,3,0,1, MPI_PROCESS=2 /
+&MESH IJK=10,10 /
+&OBST XB=0,0.1,0,0.1,0,0.1 /
+&OBST XB=0,0.2,0,0.1,0,0.1 /
+&TAIL /
+"""
+
+
+def _profile(text):
+    return mesh.profile_records(list(namelist.scan(text.encode("utf-8"))))
+
+
+@pytest.mark.parametrize("params, expected", [
+    ("&MULT ID='a' I_UPPER=3 /", 4),
+    ("&MULT ID='a' I_LOWER=-1 I_UPPER=1 J_UPPER=2 K_UPPER=1 /", 18),
+    ("&MULT ID='a' N_LOWER=2 N_UPPER=5 I_UPPER=9 /", 4),
+    ("&MULT ID='a' DX=1 /", 1),
+])
+def test_mult_count(params, expected):
+    assert mesh.mult_count(namelist.parse_params(params)) == expected
+
+
+def test_profile_records():
+    profile = _profile(MPI_FDS)
+    assert profile["namelists"] == {"HEAD": 1, "MULT": 1, "MESH": 4, "OBST": 2, "TAIL": 1}
+    assert profile["meshes"] == 9 and profile["cells"] == 10000
+    assert profile["processes"] == [[0, 4, 4000], [1, 4, 4000], [2, 1, 2000]]
+    assert profile["imbalance"] == pytest.approx(0.2)
+    assert len(profile["warnings"]) == 1 and "IJK=10,10" in profile["warnings"][0]
+
+
+def test_meshes_without_mpi_process_get_own_process():
+    profile = _profile(MULTI_FDS + "&MESH IJK=20,10,10 /\n")
+    assert profile["processes"] == [[0, 1, 1000], [1, 1, 2000]]
+    assert profile["imbalance"] == pytest.approx(2000 / 1500 - 1)
+    assert _profile("&HEAD /\n&TAIL /\n")["imbalance"] is None
+
+
+def test_format_report():
+    profile = _profile(MPI_FDS)
+    assert mesh.format_profile(profile) == "Сеток: 9, ячеек: 10 000, процессов MPI: 3, дисбаланс: 20%"
+    report = mesh.format_report("mpi.fds", profile).splitlines()
+    assert report[1] == "  Группы: HEAD 1, MULT 1, MESH 4, OBST 2, TAIL 1"
+    assert report[2].startswith("  MPI_PROCESS    0: сеток   4, ячеек        4 000  " + "#" * 30)
+    # Предупреждение о нагрузке выводится только при дисбалансе больше порога
+    assert not any("Внимание" in line for line in report)
+    assert mesh.format_profile(_profile("&HEAD /\n")) == "Сетки MESH не найдены"
+
+
+def test_summary_profile_and_cli(write_fds, capsys):
+    path = write_fds(MPI_FDS)
+    assert fdsio.summarize_fds(path)["profile"]["cells"] == 10000
+    assert cli.main(["profile", "--json", "--no-cache", path]) == 0
+    assert json.loads(capsys.readouterr().out)[path]["meshes"] == 9
@@ -0,0 +1,52 @@
+import pytest
+
+from frp import fdsio, model, namelist
+
+from conftest import PARAMS
+
+
+def _params(text):
+    return namelist.parse_params(text)
+
+
+def test_spec_round_trip():
+    fuel = model.Spec.from_params("WOOD", _params("&SPEC ID='WOOD' MW=100.5/"), span=[3, 30])
+    assert (fuel.mw, fuel.formula, fuel.span) == (100.5, None, [3, 30])
+    assert fuel.to_text() == "&SPEC ID='WOOD' MW=100.5/"
+    products = model.Spec.from_params("P", _params("&SPEC ID='P' SPEC_ID(1:2)='SOOT','NITROGEN' "
+                                                   "VOLUME_FRACTION(1:2)=0.25,0.75/"))
+    assert products.composition() == {"SOOT": 0.25, "NITROGEN": 0.75}
+    again = model.Spec.from_params("P", _params(products.to_text()))
+    assert again.composition() == products.composition()
+
+
+def test_spec_formula():
+    propane = model.Spec.from_params("PROPANE", _params("&SPEC ID='PROPANE' FORMULA='C3H8'/"))
+    assert propane.formula == "C3H8" and propane.mw == pytest.approx(44.0, abs=0.1)
+    assert propane.to_text() == "&SPEC ID='PROPANE' FORMULA='C3H8'/"
+    warnings = []
+    broken = model.Spec.from_params("X", _params("&SPEC ID='X' FORMULA='C3Q8'/"), warnings=warnings)
+    assert broken.formula is None and broken.mw is None and len(warnings) == 1
+
+
+def test_reac_from_params():
+    legacy = model.Reac.from_params(_params("&REAC FUEL='WOOD' HEAT_OF_COMBUSTION=15000 SPEC_ID_NU(1:3)="
+                                            "'WOOD','AIR','P' NU(1:3)=-1,-5.5,1 CHECK_ATOM_BALANCE=.False./"))
+    assert (legacy.fuel, legacy.products_id, legacy.heat_of_combustion) == ("WOOD", "P", 15000.0)
+    assert legacy.nu_air == -5.5 and legacy.nu_products is None
+    balanced = model.Reac.from_params(_params("&REAC ID='R1' FUEL='F' SPEC_ID_NU(1:3)='F','AIR','P' "
+                                              "NU(1:3)=-1,-23.8,27.6/"))
+    assert (balanced.reac_id, balanced.nu_air, balanced.nu_products) == ("R1", -23.8, 27.6)
+    assert balanced.to_text().startswith("&REAC ID='R1' FUEL='F'")
+    warnings = []
+    model.Reac.from_params(_params("&REAC HEAT_OF_COMBUSTION=abc/"), warnings=warnings)
+    assert len(warnings) == 1
+
+
+def test_reaction_block_and_params():
+    reaction = model.Reaction.new("Wood").set_params(PARAMS)
+    assert reaction.block_text() == fdsio.format_reac_block("Wood", PARAMS)
+    assert not reaction.balanced
+    # Параметры формы восстанавливаются по значениям групп без разбора текста
+    assert reaction.fuel_params() == pytest.approx(PARAMS)
+    assert model.Reaction.new().fuel_params() is None
@@ -0,0 +1,165 @@
+import mmap
+import os
+
+import pytest
+
+from frp import fdsio, namelist
+
+from conftest import MULTI_FDS, SAMPLE_PATH
+
+
+def test_scan_offsets_and_names():
+    data = b"&head CHID='a' /\n  &Obst XB=0,1,0,1,0,1 / comment\nnot a group /\n&TAIL /"
+    records = list(namelist.scan(data, "utf-8"))
+    assert [record.name for record in records] == ["HEAD", "OBST", "TAIL"]
+    head, obst, tail = records
+    assert data[head.start:head.end] == b"&head CHID='a' /" and head.line_end == head.end + 1
+    # Текст после '/' на той же строке остается за группой
+    assert data[obst.start:obst.end] == b"&Obst XB=0,1,0,1,0,1 /" and obst.line_end == obst.end
+    assert tail.text == "&TAIL /" and tail.line_end == len(data)
+
+
+def test_scan_quoted_slashes_and_multiline_groups():
+    data = (b"&DEVC ID='a/b' QUANTITY=\"x/y\"\n"
+            b"      XYZ=0,0,0 /\n"
+            b"&PROP ID='p' TEXT='line\n&OBST XB=1,2,3,4,5,6 /\n' /\n")
+    records = list(namelist.scan(data, "utf-8"))
+    assert [record.name for record in records] == ["DEVC", "PROP"]
+    assert records[0].text.endswith("XYZ=0,0,0 /")
+    assert namelist.parse_params(records[0].text)["ID"] == ["a/b"]
+
+
+def test_scan_unterminated_groups():
+    # Незакрытая кавычка или группа без '/' не дают записи и не мешают
+    # следующим группам; длинная незакрытая группа разбирается без возвратов
+    data = (b"&HEAD CHID='a /\n&OBST_1 XB=1,2,3,4,5,6 /\n"
+            b"&TAIL /\n&MESH IJK=" + b"10," * 200000 + b"\n")
+    records = list(namelist.scan(data, "utf-8"))
+    assert [record.name for record in records] == ["OBST_1", "TAIL"]
+    assert records[0].text == "&OBST_1 XB=1,2,3,4,5,6 /"
+
+
+def test_scan_file_sample():
+    records = list(namelist.scan_file(SAMPLE_PATH))
+    names = [record.name for record in records]
+    assert names[0] == "HEAD" and names[-1] == "TAIL"
+    assert names.count("REAC") == 1
+
+
+def test_scan_file_empty(write_fds):
+    assert list(namelist.scan_file(write_fds(b""), "utf-8")) == []
+
+
+def test_parse_params():
+    params = namelist.parse_params("&SPEC ID='PROD' SPEC_id(1:2)='SOOT','WATER VAPOR' VOLUME_FRACTION(1:2)=0.1,2/")
+    assert params == {"ID": ["PROD"], "SPEC_ID": ["SOOT", "WATER VAPOR"], "VOLUME_FRACTION": ["0.1", "2"]}
+
+
+def test_parse_params_multiline_and_logicals():
+    params = namelist.parse_params("&REAC FUEL = 'WOOD'\n NU(1:3)=-1, -4.5 ,1\n CHECK_ATOM_BALANCE=.FALSE. /")
+    assert params == {"FUEL": ["WOOD"], "NU": ["-1", "-4.5", "1"], "CHECK_ATOM_BALANCE": [".FALSE."]}
+
+
+def test_detect_encoding_cp1251(write_fds):
+    text = "&HEAD CHID='пожар' TITLE='Склад' /\r\n&TAIL /\r\n"
+    path = write_fds(text.encode("cp1251"))
+    assert namelist.detect_encoding(path) == namelist.default_encoding()
+    record = next(namelist.scan_file(path))
+    assert "пожар" in record.text
+    assert record.line_end - record.end == 2
+    # Результат определения сбрасывается при изменении файла
+    write_fds(text.encode("utf-8"))
+    assert namelist.detect_encoding(path) == "utf-8"
+
+
+def test_detect_bytes(monkeypatch):
+    data = "&HEAD TITLE='Склад' /\n".encode("utf-8")
+    # Символ, обрезанный на границе начала файла, не меняет кодировку
+    assert namelist.detect_bytes(data[:data.index(b"'") + 2]) == "utf-8"
+    monkeypatch.setenv("FRP_ENCODING", "koi8-r")
+    assert namelist.detect_bytes(data) == "koi8-r"
+    assert namelist.default_encoding() == "koi8-r"
+
+
+def test_undecodable_bytes_round_trip(write_fds):
+    raw = b"&HEAD CHID='a\x98b' /\n"
+    path = write_fds(raw)
+    encoding = namelist.detect_encoding(path)
+    record = next(namelist.scan_file(path))
+    assert record.text.encode(encoding, namelist.ERRORS) == raw[record.start:record.end]
+
+
+def _sequential(path, encoding, names=None):
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return namelist.scan_range(data, encoding, 0, None, names)[:2]
+
+
+def _tricky_fds(groups=2000):
+    # Строки в кавычках с переводами строк, '&' и '/' в начале строки,
+    # чтобы границы участков попадали внутрь групп
+    lines = ["&HEAD CHID='tricky' /"]
+    for i in range(groups):
+        if i % 7 == 0:
+            lines.append(f"&DEVC ID='d{i}' QUANTITY='TEMPERATURE' XYZ=0,0,0\n"
+                         f" TEXT='line one\n&OBST XB=1,2,3,4,5,6 /\n/ still text' /")
+        elif i % 11 == 0:
+            lines.append(f'&PROP ID="p{i}" NOTE="a/b\n&MESH IJK=1,1,1 /" / trailing comment')
+        else:
+            lines.append(f"&OBST ID='o{i}' XB={i},{i + 1},0,1,0,1 SURF_ID='INERT' /")
+    lines.append("&TAIL /")
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("names", [None, frozenset(("HEAD", "DEVC", "PROP"))])
+def test_scan_index_matches_sequential(write_fds, monkeypatch, names):
+    path = write_fds(_tricky_fds())
+    monkeypatch.setattr(namelist, "CHUNK_MIN_SIZE", 512)
+    expected = _sequential(path, "utf-8", names)
+    for workers in (1, 3):
+        assert namelist.scan_index(path, "utf-8", names, workers=workers) == expected
+
+
+def test_scan_index_chunks_cross_records(write_fds, monkeypatch):
+    path = write_fds(_tricky_fds())
+    monkeypatch.setattr(namelist, "CHUNK_MIN_SIZE", 512)
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = namelist.chunk_bounds(data, 64)
+        records, _ = namelist.scan_range(data, "utf-8")[:2]
+    # Хотя бы одна граница участка приходится на середину группы
+    assert any(record.start < bound < record.end for record in records for bound in bounds)
+
+
+def test_scan_index_counts_all_groups(write_fds):
+    path = write_fds(_tricky_fds(100))
+    records, counts = namelist.scan_index(path, "utf-8", frozenset(("HEAD",)))
+    assert [record.name for record in records] == ["HEAD"]
+    assert counts["HEAD"] == counts["TAIL"] == 1
+    assert sum(counts.values()) == 102
+
+
+def test_scan_index_sample_file():
+    records, counts = namelist.scan_index(SAMPLE_PATH)
+    assert records == list(namelist.scan_file(SAMPLE_PATH))
+    assert counts["REAC"] == 1
+
+
+def test_scan_index_empty_file(write_fds):
+    assert namelist.scan_index(write_fds(b""), "utf-8") == ([], {})
+
+
+def test_chunked_summary_matches_sequential(write_fds, monkeypatch):
+    obst = "".join(f"&OBST ID='o{i}' XB={i},{i + 1},0,1,0,1 /\n" for i in range(300))
+    path = write_fds(MULTI_FDS.replace("&OBST", obst + "&OBST"))
+    expected = fdsio.summarize_fds(path)
+    monkeypatch.setattr(namelist, "PARALLEL_MIN_SIZE", 0)
+    monkeypatch.setattr(namelist, "CHUNK_MIN_SIZE", 512)
+    progress = []
+    assert fdsio.summarize_fds(path, progress=lambda done, total: progress.append((done, total))) == expected
+    size = os.path.getsize(path)
+    assert len(progress) > 1 and progress[-1] == (size, size)
+
+    def cancel(done, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        fdsio.summarize_fds(path, progress=cancel)
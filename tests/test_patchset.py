@@ -0,0 +1,80 @@
+import io
+import json
+import os
+
+from frp import batch, cli, fdsio, patchset, stoich
+
+from conftest import MULTI_FDS, PARAMS, SAMPLE_PATH
+
+
+def _plan(files, **kwargs):
+    out = io.StringIO()
+    stats = patchset.plan_batch(files, out, workers=1, **kwargs)
+    return stats, list(patchset.read_patchset(io.StringIO(out.getvalue())))
+
+
+def test_apply_matches_direct_rewrite(write_fds, tmp_path):
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read())
+    expected_dir, applied_dir = tmp_path / "expected", tmp_path / "applied"
+    os.makedirs(expected_dir)
+    _, ok, _, _ = batch.rewrite_file(path, PARAMS, output_dir=str(expected_dir))
+    assert ok
+
+    stats, entries = _plan([path], params=PARAMS)
+    assert stats["changed"] == 1 and not stats["failed"]
+    result = patchset.apply_patchset(entries, str(applied_dir), workers=1)
+    assert result["failed"] == []
+    name = os.path.basename(path)
+    with open(expected_dir / name, "rb") as a, open(applied_dir / name, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_unchanged_file_not_in_patchset(write_fds):
+    path = write_fds(MULTI_FDS)
+    batch.rewrite_file(path)
+    stats, entries = _plan([path])
+    assert stats["unchanged"] == 1 and entries == []
+
+
+def test_stale_file_is_not_patched(write_fds):
+    path = write_fds(MULTI_FDS)
+    _, entries = _plan([path], params=PARAMS, fuel_id="PLASTIC")
+    assert len(entries) == 1
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("&OBST XB=1,2,1,2,1,2 /\n")
+    with open(path, "rb") as file:
+        modified = file.read()
+
+    _, ok, message = patchset.apply_entry(entries[0])
+    assert not ok and "изменился" in message
+    with open(path, "rb") as file:
+        assert file.read() == modified
+
+
+def test_touched_file_with_same_content_is_patched(write_fds):
+    path = write_fds(MULTI_FDS)
+    _, entries = _plan([path], params=PARAMS, fuel_id="PLASTIC")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    _, ok, _ = patchset.apply_entry(json.loads(json.dumps(entries[0])))
+    assert ok
+    reactions = fdsio.summarize_fds(path)["reactions"]
+    assert reactions[1]["params"]["heat_release"] == PARAMS["heat_release"]
+    assert reactions[0]["params"]["heat_release"] == 15000.0
+
+
+def test_cli_dry_run_and_apply(write_fds, tmp_path):
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read())
+    with open(path, "rb") as file:
+        original = file.read()
+    patches = str(tmp_path / "patches.jsonl")
+    args = ["batch", path, "--fuel"] + [str(PARAMS[name]) for name in stoich.INPUT_NAMES]
+    assert cli.main(args + ["--dry-run", patches, "--no-cache"]) == 0
+    with open(path, "rb") as file:
+        assert file.read() == original
+    assert cli.main(["apply", patches, "-j", "1"]) == 0
+    assert fdsio.summarize_fds(path)["params"]["heat_release"] == PARAMS["heat_release"]
+    # Повторно набор не применяется: файл уже изменен
+    assert cli.main(["apply", patches, "-j", "1"]) == 1
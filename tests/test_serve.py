@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from frp import cache, fdsio, serve
+
+from conftest import PARAMS, PROPANE_PARAMS, SAMPLE_PATH
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _dispatch(service, path, body=None, method="POST"):
+    return await service.dispatch(method, path, json.dumps(body).encode("utf-8") if body is not None else b"")
+
+
+def _status(service, path, body=None, method="POST"):
+    with pytest.raises(serve.RequestError) as error:
+        _run(_dispatch(service, path, body, method))
+    return error.value.status
+
+
+def test_compute_single_and_block():
+    status, result = _run(_dispatch(serve.ReacService(), "/compute",
+                                    {"params": PARAMS, "fuel_id": "Wood", "block": True}))
+    assert status == 200 and result["block"] == fdsio.format_reac_block("Wood", PARAMS)
+    assert result["nu_products"] == 1.0 and not result["balanced"]
+    _, propane = _run(_dispatch(serve.ReacService(), "/compute", {"params": PROPANE_PARAMS, "formula": "C3H8"}))
+    assert propane["balanced"] and propane["molar_mass"] == 44.0
+
+
+def test_compute_list_is_one_batch():
+    service = serve.ReacService()
+    requests = [{"params": dict(PARAMS, molar_mass=50.0 + i)} for i in range(5)]
+    _, results = _run(_dispatch(service, "/compute", requests))
+    assert [result["molar_mass"] for result in results] == [50.0 + i for i in range(5)]
+    assert (service.batcher.batches, service.batcher.rows) == (1, 5)
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"params": dict(PARAMS, molar_mass=0)}, 422),
+    ({"params": "wood"}, 400),
+    ({"params": PARAMS, "formula": "C3Q8"}, 422),
+    ({"params": PARAMS, "formula": "C3H8"}, 422),
+    ([{"params": PARAMS}, {"params": dict(PARAMS, co_yield=-1)}], 422),
+    ("text", 400),
+])
+def test_compute_rejects_invalid_requests(body, status):
+    assert _status(serve.ReacService(), "/compute", body) == status
+
+
+def test_compute_list_validated_before_batching():
+    service = serve.ReacService()
+    requests = [{"params": PARAMS}, {"params": PARAMS, "fuel_id": 5}, {"params": PARAMS}]
+    with pytest.raises(serve.RequestError, match="Элемент 1") as error:
+        _run(_dispatch(service, "/compute", requests))
+    assert error.value.status == 400
+    assert service.batcher.rows == 0 and not service.batcher.pending
+
+
+def test_cache_used_outside_event_loop(write_fds, tmp_path):
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read())
+    threads = []
+
+    async def parse(service):
+        loop_thread = threading.current_thread()
+        try:
+            for _ in range(2):
+                await _dispatch(service, "/parse", {"path": path})
+        finally:
+            service.close()
+        return loop_thread
+
+    with cache.ReacCache(str(tmp_path / "cache.sqlite3")) as reac_cache:
+        for name in ("get", "put"):
+            method = getattr(reac_cache, name)
+            setattr(reac_cache, name, lambda *args, method=method: threads.append(threading.current_thread())
+                    or method(*args))
+        loop_thread = _run(parse(serve.ReacService(roots=[str(tmp_path)], reac_cache=reac_cache)))
+    # Чтение, запись после разбора и повторное чтение из кэша
+    assert len(threads) == 3 and loop_thread not in threads
+
+
+def test_dispatch_routes():
+    service = serve.ReacService()
+    assert _status(service, "/missing", {}) == 404
+    assert _status(service, "/compute", method="GET") == 405
+    with pytest.raises(serve.RequestError):
+        _run(service.dispatch("POST", "/compute", b"{"))
+    _, stats = _run(_dispatch(service, "/stats", method="GET"))
+    assert stats["batches"] == 0
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({"host": "127.0.0.1:8765", "content-type": "text/plain"}, 415),
+    ({"host": "localhost", "content-type": "application/json", "origin": "http://evil.example"}, 403),
+    ({"host": "localhost", "content-type": "application/json", "origin": "null"}, 403),
+    ({"host": "evil.example:8765", "content-type": "application/json"}, 403),
+])
+def test_check_headers_rejects_browser_requests(headers, status):
+    with pytest.raises(serve.RequestError) as error:
+        serve.ReacService().check_headers("POST", headers)
+    assert error.value.status == status
+
+
+def test_check_headers_accepts_local_clients():
+    service = serve.ReacService()
+    service.check_headers("POST", {"host": "[::1]:8765", "content-type": "application/json; charset=utf-8",
+                                   "origin": "http://localhost:3000"})
+    service.check_headers("GET", {"host": "localhost"})
+
+
+def test_file_access_limited_to_roots(write_fds, tmp_path):
+    (tmp_path / "root").mkdir()
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read(), "root/case.fds")
+    service = serve.ReacService(workers=1, roots=[str(tmp_path / "root")])
+
+    async def requests():
+        await service.start(unix_path=str(tmp_path / "s.sock"))
+        try:
+            parsed = await _dispatch(service, "/parse", {"path": path})
+            rewritten = await _dispatch(service, "/rewrite", {"path": path, "params": PARAMS,
+                                                              "output_dir": str(tmp_path / "root" / "out")})
+            return parsed, rewritten
+        finally:
+            service.close()
+
+    (_, summary), (_, rewritten) = _run(requests())
+    assert summary["fuel_id"] == fdsio.summarize_fds(path)["fuel_id"]
+    assert fdsio.summarize_fds(rewritten["target"])["params"] == pytest.approx(PARAMS)
+    for outside in (str(tmp_path / "b.fds"), str(tmp_path / "root" / ".." / "b.fds")):
+        assert _status(service, "/parse", {"path": outside}) == 403
+    assert _status(service, "/rewrite", {"path": path, "output_dir": str(tmp_path)}) == 403
+    # По TCP без --root файлы недоступны
+    assert _status(serve.ReacService(), "/parse", {"path": path}) == 403
+
+
+def test_http_keep_alive_over_unix_socket(write_fds, tmp_path):
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read())
+    socket_path = str(tmp_path / "s.sock")
+
+    async def exchange():
+        with cache.ReacCache(str(tmp_path / "cache.sqlite3")) as reac_cache:
+            service = serve.ReacService(workers=1, reac_cache=reac_cache)
+            server = await service.start(unix_path=socket_path)
+            try:
+                reader, writer = await asyncio.open_unix_connection(socket_path)
+                responses = []
+                for body in ({"params": PARAMS}, {"path": path}, {"path": path}):
+                    data = json.dumps(body).encode("utf-8")
+                    route = "/compute" if "params" in body else "/parse"
+                    writer.write(f"POST {route} HTTP/1.1\r\nContent-Type: application/json\r\n"
+                                 f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+                    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                    length = int(head.split("Content-Length: ")[1].split("\r\n")[0])
+                    responses.append((head.split(" ")[1], json.loads(await reader.readexactly(length))))
+                writer.write(b"POST /compute HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                writer.close()
+                return responses, head, service.stats()
+            finally:
+                server.close()
+                await server.wait_closed()
+                service.close()
+
+    responses, head, stats = _run(exchange())
+    assert [status for status, _ in responses] == ["200"] * 3
+    assert responses[1][1] == responses[2][1] and responses[1][1]["fuel_id"]
+    assert head.startswith("HTTP/1.1 400") and "Connection: close" in head
+    assert stats["requests"] == 4 and stats["errors"] == 1 and stats["connections"] == 1
+    assert stats["latency"]["/parse"]["count"] == 2
+    assert "/compute: 1 запросов" in serve.format_stats(stats)
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from frp import fdsio, splice
+
+from conftest import PARAMS, SAMPLE_PATH
+
+CONTENT = b"0123456789abcdefghij"
+
+
+@pytest.fixture
+def source(write_fds):
+    return write_fds(CONTENT, "source.bin")
+
+
+def test_splice_file_replaces_and_inserts(source, tmp_path):
+    target = str(tmp_path / "target.bin")
+    splice.splice_file(source, [(10, 12, b"XYZ"), (0, 0, b">>"), (20, 20, b"<<")], target)
+    with open(target, "rb") as file:
+        assert file.read() == b">>0123456789XYZcdefghij<<"
+    with open(source, "rb") as file:
+        assert file.read() == CONTENT
+
+
+def test_splice_file_in_place_keeps_mode(source):
+    os.chmod(source, 0o640)
+    splice.splice_file(source, [(0, 1, b"")])
+    with open(source, "rb") as file:
+        assert file.read() == CONTENT[1:]
+    assert os.stat(source).st_mode & 0o777 == 0o640
+
+
+def test_splice_file_rejects_overlap_without_leftovers(source, tmp_path):
+    with pytest.raises(ValueError):
+        splice.splice_file(source, [(2, 6, b"a"), (4, 8, b"b")])
+    with open(source, "rb") as file:
+        assert file.read() == CONTENT
+    assert sorted(os.listdir(tmp_path)) == ["source.bin"]
+
+
+def test_splice_file_reports_progress(source, tmp_path):
+    done = []
+    splice.splice_file(source, [(5, 5, b"-")], str(tmp_path / "target.bin"),
+                       progress=lambda position, total: done.append((position, total)))
+    assert done and done[-1] == (len(CONTENT), len(CONTENT))
+
+
+def test_atomic_writer_applies_umask(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        target = str(tmp_path / "new.txt")
+        tmp = splice.atomic_writer(target)
+        tmp.write(b"data")
+        splice.commit(tmp, target)
+    finally:
+        os.umask(previous)
+    assert os.stat(target).st_mode & 0o777 == 0o640
+
+
+def test_write_reac_block_replaces_only_block_span(write_fds):
+    with open(SAMPLE_PATH, "rb") as file:
+        original = file.read()
+    path = write_fds(original)
+    start, end = fdsio.summarize_fds(path)["span"]
+    block = fdsio.format_reac_block("Wood", PARAMS)
+    fdsio.write_reac_block(path, block)
+    with open(path, "rb") as file:
+        written = file.read()
+    assert written[:start] == original[:start]
+    assert written.endswith(original[end:])
+    assert fdsio.summarize_fds(path)["params"]["heat_release"] == PARAMS["heat_release"]
+
+
+def test_minimize_trims_common_bytes(source):
+    patches = [(0, 10, b"0123XX6789"), (10, 20, CONTENT[10:]), (20, 20, b"")]
+    minimal = splice.minimize(source, patches)
+    assert minimal == [(4, 6, b"XX")]
+    assert not splice.unchanged(source, minimal)
+
+
+def test_minimize_matches_full_patches(source, tmp_path):
+    patches = [(2, 8, b"23A567"), (12, 15, b"cdeef"), (18, 18, b"!")]
+    full, minimal = str(tmp_path / "full.bin"), str(tmp_path / "minimal.bin")
+    splice.splice_file(source, patches, full)
+    splice.splice_file(source, splice.minimize(source, patches), minimal)
+    with open(full, "rb") as a, open(minimal, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_unchanged_patches_leave_nothing(source):
+    assert splice.unchanged(source, [(3, 7, CONTENT[3:7])])
+    assert splice.minimize(source, [(3, 7, CONTENT[3:7])]) == []
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from frp import fdsio, model, stoich
+
+from conftest import PARAMS
+
+
+def _random_params(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "heat_release": rng.uniform(1e4, 5e4, count),
+        "soot_yield": rng.uniform(0, 500, count),
+        "o2_consumption": rng.uniform(0.5, 3.5, count),
+        "co2_yield": rng.uniform(0.1, 2.5, count),
+        "co_yield": rng.uniform(0, 0.2, count),
+        "hcl_yield": np.where(rng.random(count) < 0.5, 0.0, rng.uniform(0, 0.3, count)),
+        "molar_mass": rng.uniform(10, 300, count),
+    }
+
+
+def test_forward_inverse_round_trip():
+    params = _random_params(1000)
+    fractions, nu = stoich.forward(params)
+    assert fractions.shape == (1000, len(stoich.PRODUCT_IDS)) and nu.shape == (1000, 3)
+    recovered = stoich.inverse(fractions, params["molar_mass"])
+    for name in recovered:
+        np.testing.assert_allclose(recovered[name], params[name], rtol=1e-12, atol=1e-12)
+
+
+def test_inverse_from_nu_without_nitrogen():
+    params = _random_params(100, seed=1)
+    fractions, nu = stoich.forward(params)
+    fractions[:, stoich.PRODUCT_IDS.index('NITROGEN')] = np.nan
+    recovered = stoich.inverse(fractions, params["molar_mass"], nu[:, 1])
+    np.testing.assert_allclose(recovered["o2_consumption"], params["o2_consumption"], rtol=1e-12)
+
+
+def test_forward_matches_scalar_calculation():
+    fractions, nu = stoich.forward(PARAMS)
+    result = stoich.compute_reaction(PARAMS)
+    assert fractions[stoich.PRODUCT_IDS.index('CARBON DIOXIDE')] == pytest.approx(float(result["V_CO2"]))
+    assert nu[1] == pytest.approx(float(result["mass_reactants"]))
+
+
+def test_validate_params():
+    assert stoich.validate_params(dict(PARAMS, hcl_yield="")) == dict(PARAMS, hcl_yield=0.0)
+    with pytest.raises(ValueError):
+        stoich.validate_params(dict(PARAMS, molar_mass="0"))
+    with pytest.raises(ValueError):
+        stoich.validate_params(dict(PARAMS, co_yield="-1"))
+
+
+def test_valid_mask():
+    params = _random_params(4, seed=4)
+    params["co_yield"][1] = -0.1
+    params["molar_mass"][2] = 0.0
+    params["soot_yield"][3] = np.nan
+    assert stoich.valid_mask(params).tolist() == [True, False, False, False]
+
+
+def test_closed_balance_with_consistent_yields(write_fds):
+    atoms = stoich.parse_formula("C3H8")
+    molar_mass = float(stoich.formula_mass(atoms))
+    params = dict(PARAMS, soot_yield=0.0, co_yield=0.0, co2_yield=3 * stoich.W_CO2 / molar_mass)
+    reaction = model.Reaction.new("PROPANE", formula="C3H8").set_params(params)
+    assert reaction.balanced
+    assert "CHECK_ATOM_BALANCE" not in reaction.reac.to_text()
+    result = stoich.close_balance(params, atoms)
+    assert stoich.balance_violations(result["residuals"], molar_mass) == []
+    # Записанный блок читается обратно с теми же выходами и формулой;
+    # потребление O2 при замкнутом балансе определяется формулой
+    summary = fdsio.summarize_fds(write_fds("&HEAD CHID='a' /\n" + reaction.block_text() + "&TAIL /\n"))
+    assert summary["formula"] == "C3H8" and summary["reactions"][0]["balanced"]
+    del summary["params"]["o2_consumption"], params["o2_consumption"]
+    assert summary["params"] == pytest.approx(dict(params, molar_mass=molar_mass))
+
+
+def test_closed_balance_rejects_carbon_residual():
+    with pytest.raises(ValueError, match="C 0.5"):
+        model.Reaction.new("PROPANE", formula="C3H8").set_params(dict(PARAMS, soot_yield=0.0, co_yield=0.0,
+                                                                      co2_yield=2.5 * stoich.W_CO2 / 44.0))
+
+
+def test_balance_violations():
+    residuals = np.zeros(len(stoich.ELEMENTS))
+    assert stoich.balance_violations(residuals, 100.0) == []
+    residuals[stoich.ELEMENTS.index("H")] = 2.0
+    violations = stoich.balance_violations(residuals, 100.0)
+    assert violations[0] == "H 2" and violations[-1].startswith("масса")
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+
+from frp import cli, stoich, sweep
+
+from conftest import PARAMS
+
+
+def _distributions(**varied):
+    distributions = {name: ("fixed", (value,)) for name, value in PARAMS.items()}
+    distributions.update({name: sweep.parse_distribution(text) for name, text in varied.items()})
+    return distributions
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("0.5", ("fixed", (0.5,))),
+    ("uniform:0.05,0.15", ("uniform", (0.05, 0.15))),
+    (" Normal:1,0.1", ("normal", (1.0, 0.1))),
+    ("triangular:0,1,2", ("triangular", (0.0, 1.0, 2.0))),
+])
+def test_parse_distribution(text, expected):
+    assert sweep.parse_distribution(text) == expected
+
+
+@pytest.mark.parametrize("text", ["abc", "beta:1,2", "uniform:1", "uniform:2,1", "triangular:0,3,2",
+                                  "normal:1,-1", "uniform:a,b"])
+def test_parse_distribution_rejects(text):
+    with pytest.raises(ValueError):
+        sweep.parse_distribution(text)
+
+
+def test_run_sweep_columns(tmp_path):
+    output = str(tmp_path / "sweep.npz")
+    distributions = _distributions(soot_yield="uniform:0.05,0.15", co_yield="normal:0.03,0.02")
+    stats = sweep.run_sweep(distributions, 1000, output, seed=1, chunk_size=300)
+    assert os.listdir(tmp_path) == ["sweep.npz"]
+    with np.load(output) as data:
+        inputs = data["inputs"]
+        params = dict(zip(stoich.INPUT_NAMES, inputs.T))
+        fractions, nu = stoich.forward(params)
+        np.testing.assert_array_equal(data["fractions"], fractions)
+        np.testing.assert_array_equal(data["nu"], nu)
+        np.testing.assert_array_equal(data["valid"], stoich.valid_mask(params))
+        assert list(data["input_names"]) == list(stoich.INPUT_NAMES)
+        assert list(data["output_names"]) == list(sweep.OUTPUT_NAMES)
+        np.testing.assert_array_equal(data["sensitivity"], stats["sensitivity"])
+    # Отрицательные выходы CO отбрасываются из допустимых
+    assert stats["valid"] == int((params["co_yield"] >= 0).sum()) < 1000
+    assert np.all(params["heat_release"] == PARAMS["heat_release"])
+
+
+def test_sensitivity_merged_across_chunks(tmp_path):
+    output = str(tmp_path / "sweep.npz")
+    distributions = _distributions(soot_yield="uniform:0.05,0.15", co2_yield="triangular:1,1.4,2",
+                                   co_yield="normal:0.03,0.02")
+    sensitivity = sweep.run_sweep(distributions, 5000, output, seed=7, chunk_size=777)["sensitivity"]
+    with np.load(output) as data:
+        valid = data["valid"]
+        inputs = data["inputs"][valid]
+        outputs = np.column_stack([data["fractions"], data["nu"][:, 1]])[valid]
+    # Доли HCl, NITROGEN и NU воздуха зависят только от постоянных входов
+    constant = np.flatnonzero(np.ptp(outputs, axis=0) <= 1e-9 * np.abs(outputs.mean(axis=0)))
+    assert len(constant) == 3
+    for name in ("soot_yield", "co2_yield", "co_yield"):
+        row = stoich.INPUT_NAMES.index(name)
+        for column in range(outputs.shape[1]):
+            if column in constant:
+                assert np.isnan(sensitivity[row, column])
+            else:
+                expected = np.corrcoef(inputs[:, row], outputs[:, column])[0, 1]
+                assert sensitivity[row, column] == pytest.approx(expected, rel=1e-9)
+    # У постоянных входов корреляции нет, в том числе у непредставимых точно
+    for name in ("heat_release", "o2_consumption", "hcl_yield", "molar_mass"):
+        assert np.isnan(sensitivity[stoich.INPUT_NAMES.index(name)]).all()
+
+
+def test_run_sweep_requires_all_inputs(tmp_path):
+    distributions = _distributions()
+    del distributions["molar_mass"]
+    with pytest.raises(ValueError, match="molar_mass"):
+        sweep.run_sweep(distributions, 10, str(tmp_path / "s.npz"))
+
+
+def test_cli_sweep(tmp_path, capsys):
+    output = str(tmp_path / "sweep.npz")
+    args = (["sweep", output, "-n", "200", "--seed", "3", "--fuel"] + [str(PARAMS[name]) for name in stoich.INPUT_NAMES]
+            + ["--vary", "soot_yield=uniform:0.05,0.15"])
+    assert cli.main(args) == 0
+    table = capsys.readouterr().out.splitlines()
+    assert table[0].split("\t") == ["parameter"] + list(sweep.OUTPUT_NAMES)
+    assert [line.split("\t")[0] for line in table[1:]] == ["soot_yield"]
+    assert cli.main(["sweep", output, "-n", "10", "--vary", "soot=uniform:0,1"]) == 2
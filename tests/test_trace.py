@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from frp import cli, fdsio, stoich, trace
+
+from conftest import PARAMS, ROOT, SAMPLE_PATH
+
+
+@pytest.fixture
+def tracing(tmp_path, monkeypatch):
+    """Трассировка включена с пустой трассой; после теста состояние модуля восстанавливается"""
+    path = str(tmp_path / "trace.json")
+    monkeypatch.setattr(trace, "_path", path)
+    for name in ("_spans", "_counts"):
+        monkeypatch.setattr(trace, name, [])
+    for name in ("_counters", "_threads"):
+        monkeypatch.setattr(trace, name, {})
+    return path
+
+
+def test_disabled_trace_records_nothing(monkeypatch):
+    monkeypatch.setattr(trace, "_path", None)
+    with trace.span("parse", path="x") as span:
+        span.set(records=1)
+    trace.count("parse.bytes", 10)
+    assert not trace.enabled()
+    assert not any(event["name"] in ("parse", "parse.bytes") for event in trace.events())
+
+
+def test_spans_and_counters(tracing):
+    with trace.span("save", path="a.fds") as span:
+        with trace.span("save.write"):
+            pass
+        span.set(size=10)
+    with pytest.raises(KeyError):
+        with trace.span("save"):
+            raise KeyError
+    trace.count("save.bytes", 10)
+    trace.count("save.bytes", 5)
+    events = trace.events()
+    spans = [event for event in events if event["ph"] == "X"]
+    assert [event["name"] for event in spans] == ["save.write", "save", "save"]
+    assert spans[1]["args"] == {"path": "a.fds", "size": 10} and spans[2]["args"] == {"error": "KeyError"}
+    assert [event["args"]["value"] for event in events if event["ph"] == "C"] == [10, 15]
+    assert any(event["ph"] == "M" for event in events)
+
+    rows, counters = trace.summarize(events)
+    assert [(name, calls) for name, calls, *_ in rows if name == "save"] == [("save", 2)]
+    assert counters == {"save.bytes": 15}
+    lines = trace.format_summary(rows, counters).splitlines()
+    assert lines[0].startswith("Участок") and lines[-1].split() == ["save.bytes", "15"]
+
+
+def test_import_compute_save_are_traced(tracing, write_fds, tmp_path, capsys):
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read())
+    summary = fdsio.load_fds(path)
+    fdsio.write_reac_block(path, fdsio.format_reac_block("Wood", PARAMS), str(tmp_path / "out.fds"), summary)
+    trace.write()
+    with open(tracing, encoding="utf-8") as file:
+        rows, counters = trace.summarize(json.load(file)["traceEvents"])
+    names = {row[0] for row in rows}
+    assert {"parse", "parse.read", "calculate.math", "calculate.format"} <= names
+    assert counters["parse.bytes"] == os.path.getsize(path) and counters["calculate.reactions"] == 1
+
+    assert cli.main(["trace", tracing]) == 0
+    assert "parse.read" in capsys.readouterr().out
+    assert cli.main(["trace", str(tmp_path / "missing.json")]) == 2
+
+
+def test_trace_written_at_exit(write_fds, tmp_path):
+    with open(SAMPLE_PATH, "rb") as file:
+        path = write_fds(file.read())
+    trace_path = str(tmp_path / "batch.json")
+    env = dict(os.environ, FRP_TRACE=trace_path, PYTHONPATH=ROOT)
+    args = [sys.executable, "-m", "frp", "batch", path, "--no-cache", "-j", "1", "--fuel"]
+    result = subprocess.run(args + [str(PARAMS[name]) for name in stoich.INPUT_NAMES], env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert f"Трасса записана: {trace_path}" in result.stderr
+    with open(trace_path, encoding="utf-8") as file:
+        events = json.load(file)["traceEvents"]
+    assert any(event["name"] == "parse" for event in events)
+
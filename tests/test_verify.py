@@ -0,0 +1,58 @@
+import re
+
+import numpy as np
+
+from frp import cli, fdsio, verify
+
+from conftest import PARAMS
+
+
+def _written(write_fds, params=PARAMS, name="case.fds"):
+    return write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("Wood", params) + "&TAIL /\n", name)
+
+
+def _tampered(write_fds, name="tampered.fds"):
+    """Файл, в котором NU воздуха изменен вручную"""
+    path = _written(write_fds, name=name)
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    text = re.sub(r"NU\(1:3\)=-1,([-0-9.]+)", lambda m: f"NU(1:3)=-1,{float(m.group(1)) * 1.1:.4f}", text)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    return path
+
+
+def test_consistent_files_pass(write_fds):
+    files = [_written(write_fds), _written(write_fds, dict(PARAMS, hcl_yield=0.05), "hcl.fds")]
+    report = verify.verify_files(files)
+    assert report["reactions"] == 2 and not report["failed"] and not report["errors"]
+    assert all(item["max_error"] is None or item["max_error"] <= verify.DEFAULT_TOLERANCE
+               for item in report["species"].values())
+
+
+def test_tampered_nu_fails(write_fds):
+    good, bad = _written(write_fds), _tampered(write_fds)
+    report = verify.verify_files([good, bad])
+    assert [item["path"] for item in report["failed"]] == [bad]
+    assert max(report["species"].values(), key=lambda item: item["max_error"] or 0)["path"] == bad
+    assert list(report["failed"][0]["errors"]) == ["AIR NU"]
+    assert f"Несогласовано: {bad} [Wood]: AIR NU" in verify.format_report(report)
+
+
+def test_unverifiable_files_reported(write_fds):
+    report = verify.verify_files([write_fds("&HEAD CHID='a' /\n&TAIL /\n")])
+    assert report["reactions"] == 0 and len(report["errors"]) == 1
+    assert all(item["max_error"] is None for item in report["species"].values())
+
+
+def test_relative_errors_missing_values():
+    fractions = np.full((1, 6), np.nan)
+    error = verify.relative_errors(fractions, np.array([100.0]), np.array([np.nan]))
+    assert error.shape == (1, len(verify.COLUMNS)) and np.isnan(error).all()
+
+
+def test_cli_exit_code(write_fds, capsys):
+    good = _written(write_fds)
+    assert cli.main(["verify", good]) == 0
+    assert cli.main(["verify", "--json", "--no-cache", good, _tampered(write_fds)]) == 1
+    assert '"failed"' in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from frp import fdsio, watch
+
+from conftest import PARAMS, PROPANE_PARAMS
+
+# Блок, который пересчет по строке PRODUCTS приводит к форме format_reac_block
+HAND_WRITTEN = "&HEAD CHID='a' /\n" + fdsio.format_reac_block("Wood", PARAMS).replace("\n&REAC", "\n\n&REAC") + "&TAIL /\n"
+
+
+def test_update_file(write_fds):
+    path = write_fds(HAND_WRITTEN)
+    result = watch.update_file(path)
+    assert result[1] == "updated" and result[4] == fdsio.file_stat(path)
+    assert watch.update_file(path)[1] == "unchanged"
+    status = watch.update_file(path, dict(PARAMS, soot_yield=0.2))[1]
+    assert status == "updated" and fdsio.summarize_fds(path)["params"]["soot_yield"] == pytest.approx(0.2)
+    path, status, message, _, state = watch.update_file(write_fds("&HEAD CHID='a' /\n&TAIL /\n", "bad.fds"))
+    assert status == "failed" and message and state is None
+
+
+def test_update_file_keeps_formula(write_fds):
+    path = write_fds("&HEAD CHID='a' /\n" + fdsio.format_reac_block("PROPANE", PROPANE_PARAMS, formula="C3H8")
+                     + "&TAIL /\n")
+    assert watch.update_file(path, dict(PROPANE_PARAMS, heat_release=46000.0))[1] == "updated"
+    summary = fdsio.summarize_fds(path)
+    assert summary["formula"] == "C3H8" and summary["params"]["heat_release"] == 46000.0
+
+
+def test_polling_source(tmp_path):
+    (tmp_path / "old.fds").write_text("&HEAD /\n")
+    source = watch.PollingSource(str(tmp_path), interval=0.01)
+    assert source.existing() == [str(tmp_path / "old.fds")]
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "new.fds").write_text("&HEAD /\n")
+    (tmp_path / ".hidden.fds").write_text("&HEAD /\n")
+    (tmp_path / "notes.txt").write_text("")
+    assert source.changes(1.0) == [str(tmp_path / "sub" / "new.fds")]
+    assert source.changes(1.0) == []
+
+
+def _wait(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+@pytest.mark.parametrize("poll", [True, False])
+def test_folder_watcher_updates_new_files(tmp_path, poll):
+    messages = []
+    watcher = watch.FolderWatcher(str(tmp_path), PARAMS, workers=1, debounce=0.05, poll=poll,
+                                  poll_interval=0.05, log=messages.append)
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        (tmp_path / "case.fds").write_text("&HEAD CHID='a' /\n&TAIL /\n")
+        (tmp_path / "notes.txt").write_text("")
+        _wait(lambda: watcher.counters["processed"] >= 1)
+        # Собственная запись не вызывает повторной обработки
+        time.sleep(0.3)
+    finally:
+        watcher.stop_event.set()
+        thread.join()
+    stats = watcher.stats()
+    assert stats["processed"] == stats["updated"] == 1 and stats["queue_depth"] == 0
+    assert messages == [f"Обновлен: {tmp_path / 'case.fds'}"]
+    assert fdsio.summarize_fds(str(tmp_path / "case.fds"))["params"] == pytest.approx(PARAMS)
+    assert stats["latency_p50"] > 0
+    assert "обработано: 1 (обновлено 1" in watch.format_stats(stats)
+
+
+def test_percentiles():
+    assert watch.percentiles([]) == (None, None, None)
+    p50, p99, peak = watch.percentiles([float(value) for value in range(1, 101)])
+    assert p50 == pytest.approx(50.5) and p99 == pytest.approx(99.01) and peak == 100.0